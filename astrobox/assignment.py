@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    Распределение целей между дронами команды: раз в тик на команду строится матрица стоимостей
+    "дрон x цель" и решается задача о назначениях - каждой цели не больше одного дрона,
+    суммарная стоимость минимальна.
+
+        assignment = scene.target_assignment
+        if not assignment.is_assigned(team):
+            assignment.assign(team, hunters, victims)
+        victim = assignment.target_for(hunter)
+"""
+from .bulk import _coords, _distance, numpy
+
+# Меньше этого числа пар дрон-цель матрица расстояний быстрее считается обычным циклом
+NUMPY_MIN_PAIRS = 1024
+
+
+def hungarian(costs):
+    """
+        Венгерский алгоритм, O(n^2 m). costs - матрица (список строк) стоимостей.
+        Возвращает для каждой строки номер назначенного ей столбца или None, если столбцов не хватило.
+    """
+    rows = len(costs)
+    cols = len(costs[0]) if rows else 0
+    if not rows or not cols:
+        return [None] * rows
+    if rows > cols:
+        result = [None] * rows
+        for col, row in enumerate(hungarian([list(column) for column in zip(*costs)])):
+            result[row] = col
+        return result
+    inf = float('inf')
+    # Потенциалы строк и столбцов, p[j] - строка на столбце j (нумерация с 1, 0 - фиктивная)
+    u, v = [0.0] * (rows + 1), [0.0] * (cols + 1)
+    p, way = [0] * (cols + 1), [0] * (cols + 1)
+    for i in range(1, rows + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row, ui0 = costs[i0 - 1], u[i0]
+            delta, j1 = inf, 0
+            for j in range(1, cols + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - ui0 - v[j]
+                if cur < minv[j]:
+                    minv[j], way[j] = cur, j0
+                if minv[j] < delta:
+                    delta, j1 = minv[j], j
+            for j in range(cols + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Чередующаяся цепочка до свободного столбца
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    result = [None] * rows
+    for j in range(1, cols + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    return result
+
+
+class TargetAssignment(object):
+    """
+        Назначения команд на текущий тик. Стоимость по умолчанию - расстояние от дрона до цели.
+    """
+
+    def __init__(self, scene, use_numpy=None):
+        self.scene = scene
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        # команда -> (тик, {дрон: цель})
+        self.__assigned = {}
+
+    def distances(self, units, targets):
+        """
+            Матрица расстояний units x targets списком строк.
+        """
+        if not self.use_numpy or len(units) * len(targets) < NUMPY_MIN_PAIRS:
+            return [[_distance(unit.coord, target.coord) for target in targets] for unit in units]
+        xs, ys = _coords([unit.coord for unit in units])
+        txs, tys = _coords([target.coord for target in targets])
+        return numpy.sqrt((xs[:, None] - txs[None, :]) ** 2 + (ys[:, None] - tys[None, :]) ** 2).tolist()
+
+    def assign(self, team, units, targets, costs=None):
+        """
+            Назначить цели дронам команды на этот тик. costs - своя матрица units x targets
+            (None в ячейке - пару не назначать). Возвращает словарь дрон -> цель.
+        """
+        if costs is None:
+            costs = self.distances(units, targets)
+        forbidden = float('inf')
+        if any(cost is None for row in costs for cost in row):
+            # Запрещенные пары дороже любого допустимого набора назначений - от разброса стоимостей,
+            # чтобы работали и отрицательные (например, выгода со знаком минус)
+            allowed = [cost for row in costs for cost in row if cost is not None]
+            if allowed:
+                highest, lowest = max(allowed), min(allowed)
+                forbidden = (highest - lowest + 1) * (len(units) + 1) + highest
+            else:
+                forbidden = 1
+            costs = [[forbidden if cost is None else cost for cost in row] for row in costs]
+        assigned = {}
+        for unit, row, col in zip(units, costs, hungarian(costs)):
+            if col is not None and row[col] < forbidden:
+                assigned[unit] = targets[col]
+        self.__assigned[team] = (self.scene._step, assigned)
+        return assigned
+
+    def is_assigned(self, team):
+        step, _ = self.__assigned.get(team, (None, None))
+        return step == self.scene._step
+
+    def target_for(self, unit):
+        """
+            Цель, назначенная дрону в этом тике, или None.
+        """
+        step, assigned = self.__assigned.get(unit.team, (None, {}))
+        if step != self.scene._step:
+            return None
+        return assigned.get(unit)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+    Поведение юнитов конечными автоматами. Граф состояний компилируется один раз (StateMachine):
+    узлы общие для всех юнитов и своего состояния не хранят, переходы - номера состояний в таблице.
+    Все, что узлу нужно помнить про юнит, лежит в Behaviour.memory - она создается вместе с поведением,
+    так что шаг поведения новых объектов не создает.
+
+        HARVEST = StateMachine([
+            ('choose', Decide(choose_stock), {'load': 'approach', 'idle': 'pause'}),
+            ('approach', Approach('target', condition=have_elerium), {DONE: 'load'}),
+            ('load', Transfer('target', load=True), {DONE: 'choose', FAIL: 'pause'}),
+            ('pause', Pause(10), {DONE: 'choose'}),
+        ])
+
+        class MyDrone(Drone):
+            def on_born(self):
+                self.behaviour = Behaviour(HARVEST, self)
+
+            def game_step(self):
+                super(MyDrone, self).game_step()
+                self.behaviour.game_step()
+
+    Переход в None заканчивает поведение.
+"""
+from robogame_engine.geometry import Point
+
+from .cargo import CargoException, CargoTransition
+
+DONE = 'done'
+FAIL = 'fail'
+
+_FINISHED = -1
+
+
+class Memory(object):
+    """
+        Состояние поведения одного юнита - атрибуты заводят узлы и функции выбора.
+    """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Node(object):
+    """
+        Узел автомата. В начале шага поведения вызывается check: None - узел еще работает
+        и получает step, иначе - исход, по которому автомат в том же тике переходит к следующему узлу.
+    """
+
+    def enter(self, unit, memory):
+        pass
+
+    def check(self, unit, memory):
+        return None
+
+    def step(self, unit, memory):
+        pass
+
+
+class Decide(Node):
+    """
+        Мгновенный выбор: function(unit, memory) возвращает исход.
+    """
+
+    def __init__(self, function):
+        self.function = function
+
+    def check(self, unit, memory):
+        return self.function(unit, memory)
+
+
+class Pause(Node):
+    """
+        Ждать ticks тиков сцены.
+    """
+
+    def __init__(self, ticks=1):
+        self.ticks = ticks
+
+    def enter(self, unit, memory):
+        memory.pause_until = unit.scene._step + self.ticks
+
+    def check(self, unit, memory):
+        return DONE if unit.scene._step >= memory.pause_until else None
+
+
+class Approach(Node):
+    """
+        Лететь к цели из атрибута памяти target (юнит или точка), пока не окажемся не дальше distance.
+        distance=None - дистанция переноса груза. condition(unit, memory) - пока ложно, лететь незачем.
+        Прибытие отслеживает сцена триггером сближения с ключом key - у юнита он один на все подходы.
+    """
+
+    def __init__(self, target='target', distance=0, condition=None, key='approach'):
+        self.target = target
+        self.distance = distance
+        self.condition = condition
+        self.key = key
+
+    def enter(self, unit, memory):
+        target = getattr(memory, self.target)
+        memory.approach_point = target if isinstance(target, Point) else target.coord
+        distance = self.distance
+        if distance is None:
+            distance = unit.scene.config.CARGO_TRANSITION_DISTANCE - 1
+        memory.approach_distance = distance
+        memory.arrival = unit.when_near(memory.approach_point, distance + 1, key=self.key)
+
+    @staticmethod
+    def is_arrived(unit, memory):
+        arrival = memory.arrival
+        if arrival.is_met is None or arrival.cancelled:
+            # Сцена еще не проверяла триггер (или его заменил другой подход) - считаем сами
+            return int(unit.distance_to(memory.approach_point)) <= memory.approach_distance
+        return arrival.is_met
+
+    def check(self, unit, memory):
+        if self.condition is not None and not self.condition(unit, memory):
+            return DONE
+        if self.is_arrived(unit, memory):
+            return DONE
+        return None
+
+    def step(self, unit, memory):
+        if unit.is_moving:
+            return
+        unit.move_at(memory.approach_point.copy(), speed=unit.scene.config.DRONE_SPEED)
+
+
+class Transfer(Node):
+    """
+        Перенести элериум из трюма цели (load=True) или в трюм цели. Объект переноса у юнита один
+        на все рейсы. Перенос, невозможный по правилам сцены, дает исход FAIL.
+    """
+
+    def __init__(self, target='target', load=True):
+        self.target = target
+        self.load = load
+
+    def enter(self, unit, memory):
+        target = getattr(memory, self.target)
+        cargo_from, cargo_to = (target.cargo, unit.cargo) if self.load else (unit.cargo, target.cargo)
+        memory.transfer_failed = False
+        try:
+            if getattr(memory, 'transition', None) is None:
+                memory.transition = CargoTransition(cargo_from=cargo_from, cargo_to=cargo_to)
+            else:
+                memory.transition.reset(cargo_from=cargo_from, cargo_to=cargo_to)
+        except CargoException:
+            memory.transfer_failed = True
+
+    def check(self, unit, memory):
+        if memory.transfer_failed:
+            return FAIL
+        return DONE if memory.transition.is_finished else None
+
+    def step(self, unit, memory):
+        memory.transition.game_step()
+
+
+class StateMachine(object):
+    """
+        Скомпилированный граф: states - список (имя, узел, {исход: имя следующего состояния или None}).
+    """
+
+    def __init__(self, states, initial=None):
+        names = [name for name, _, _ in states]
+        if not names:
+            raise ValueError('State machine needs at least one state')
+        if len(set(names)) != len(names):
+            raise ValueError('Duplicate state names in {}'.format(names))
+        numbers = dict((name, number) for number, name in enumerate(names))
+        transitions = []
+        for name, _, outcomes in states:
+            table = {}
+            for outcome, target in outcomes.items():
+                if target is not None and target not in numbers:
+                    raise ValueError('State {!r}: unknown target state {!r}'.format(name, target))
+                table[outcome] = _FINISHED if target is None else numbers[target]
+            transitions.append(table)
+        if initial is not None and initial not in numbers:
+            raise ValueError('Unknown initial state {!r}'.format(initial))
+        self.names = tuple(names)
+        self.nodes = tuple(node for _, node, _ in states)
+        self.transitions = tuple(transitions)
+        self.initial = 0 if initial is None else numbers[initial]
+
+
+class Behaviour(object):
+    """
+        Поведение юнита по автомату machine. За тик - не больше len(machine.nodes) мгновенных переходов:
+        цикл из одних решений не подвешивает игру, а продолжается в следующем тике.
+    """
+
+    def __init__(self, machine, unit, **memory):
+        self.machine = machine
+        self.unit = unit
+        self.memory = Memory(**memory)
+        self.__number = machine.initial
+        self.__entered = False
+
+    @property
+    def state(self):
+        """
+            Имя текущего состояния, None - поведение закончено.
+        """
+        if self.__number == _FINISHED:
+            return None
+        return self.machine.names[self.__number]
+
+    @property
+    def is_finished(self):
+        return self.__number == _FINISHED
+
+    def reset(self):
+        """
+            Начать с начального состояния - со следующего шага.
+        """
+        self.__number = self.machine.initial
+        self.__entered = False
+
+    def game_step(self):
+        number = self.__number
+        if number == _FINISHED:
+            return
+        machine, unit, memory = self.machine, self.unit, self.memory
+        nodes, transitions = machine.nodes, machine.transitions
+        if not self.__entered:
+            nodes[number].enter(unit, memory)
+            self.__entered = True
+        for _ in range(len(nodes)):
+            node = nodes[number]
+            outcome = node.check(unit, memory)
+            if outcome is None:
+                node.step(unit, memory)
+                break
+            table = transitions[number]
+            if outcome not in table:
+                raise ValueError('State {!r}: no transition for outcome {!r}'.format(machine.names[number], outcome))
+            number = table[outcome]
+            if number == _FINISHED:
+                break
+            nodes[number].enter(unit, memory)
+        self.__number = number
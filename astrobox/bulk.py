@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+    Пакетные проходы по дронам сцены: расстояния до баз, попадания снарядов и триггеры сближения
+    считаются один раз за тик для всех сразу. Если установлен NumPy и объектов достаточно много - массивами,
+    иначе обычным циклом.
+"""
+import math
+
+from robogame_engine.geometry import Point, Vector
+
+from .core import Drone, MotherShip
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Меньше этого числа дронов в команде накладные расходы на сборку массивов не окупаются
+NUMPY_MIN_DRONES = 256
+# То же для пар снаряд-цель и триггеров сближения
+NUMPY_MIN_HIT_PAIRS = 4096
+NUMPY_MIN_TRIGGERS = 256
+# Перекрытие в движке считается, если круги зашли друг в друга больше чем на 1 (int(...) > 1)
+HIT_DEPTH = 2
+# x ** 2 в питоне (pow из libm) и x * x в NumPy иногда расходятся в последнем бите,
+# поэтому NumPy только отбирает кандидатов, а пограничные случаи пересчитываются как в движке
+_TOLERANCE = 1e-9
+
+
+def _distance(coord, other):
+    # Ровно как Point.distance_to в движке
+    return math.sqrt((coord.x - other.x) ** 2 + (coord.y - other.y) ** 2)
+
+
+def _coords(points):
+    count = len(points)
+    xs = numpy.fromiter((point.x for point in points), dtype=float, count=count)
+    ys = numpy.fromiter((point.y for point in points), dtype=float, count=count)
+    return xs, ys
+
+
+class MothershipPass(object):
+    """
+        Расстояния дронов до баз: признак "дрон рядом со своей базой" для лечения
+        и выталкивание чужих дронов с баз. Результат совпадает с пообъектной логикой.
+    """
+
+    def __init__(self, scene, use_numpy=None):
+        self.scene = scene
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self.__healing = {}
+
+    def _numpy_for(self, drones):
+        return self.use_numpy and len(drones) >= NUMPY_MIN_DRONES
+
+    def update_healing(self, drones_by_team):
+        """
+            Для живых дронов запомнить, находятся ли они в радиусе лечения своей базы.
+            Живы ли базы, проверяется в момент лечения - база может погибнуть посреди тика.
+        """
+        distance = self.scene.config.MOTHERSHIP_HEALING_DISTANCE
+        healing = {}
+        for team, drones in drones_by_team.items():
+            base = self.scene.get_mothership(team)
+            if base is None or not drones:
+                continue
+            bx, by = base.coord.x, base.coord.y
+            if not self._numpy_for(drones):
+                for drone in drones:
+                    coord = drone.coord
+                    healing[drone] = math.sqrt((coord.x - bx) ** 2 + (coord.y - by) ** 2) < distance
+                continue
+            xs, ys = _coords([drone.coord for drone in drones])
+            distances = numpy.sqrt((xs - bx) ** 2 + (ys - by) ** 2)
+            in_range = distances < distance
+            for i in numpy.flatnonzero(numpy.abs(distances - distance) <= distance * _TOLERANCE):
+                in_range[i] = _distance(drones[i].coord, base.coord) < distance
+            healing.update(zip(drones, in_range.tolist()))
+        self.__healing = healing
+
+    def in_healing_range(self, drone):
+        in_range = self.__healing.get(drone)
+        if in_range is None:
+            # Дрон не попал в пакетный расчет (появился посреди тика или тик еще не начался)
+            in_range = drone.distance_to(drone.mothership.coord) < self.scene.config.MOTHERSHIP_HEALING_DISTANCE
+        return in_range
+
+    def reset_healing(self):
+        self.__healing = {}
+
+    def push_back(self, motherships):
+        """
+            Вытолкнуть чужих дронов (и живых, и обломки) за пределы живых баз.
+            Кандидатов отдает пространственный индекс - это дешевле полного перебора и в NumPy.
+            Базы обрабатываются по очереди, как раньше: дрона, вытолкнутого одной базой,
+            следующая видит уже на новом месте. Возвращает сдвинутых дронов.
+        """
+        moved = []
+        query = self.scene.spatial_index.query_radius
+        for base in motherships:
+            if not base.is_alive:
+                continue
+            for drone in query(base.coord, base.radius, cls=Drone, exclude_team=base.team):
+                self._push(base, drone, moved)
+        return moved
+
+    def _push(self, base, drone, moved):
+        dist = base.radius - base.distance_to(drone)
+        if dist < 0:
+            return
+        drone.coord += Vector.from_points(base.coord, drone.coord, module=dist + 3)
+        self.scene.spatial_index.update(drone)
+        moved.append(drone)
+
+
+class TriggerPass(object):
+    """
+        Проверка всех триггеров сближения (core.ProximityTrigger) за тик.
+    """
+
+    def __init__(self, scene, use_numpy=None):
+        self.scene = scene
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+
+    def _distances(self, triggers):
+        if not self.use_numpy or len(triggers) < NUMPY_MIN_TRIGGERS:
+            return [_distance(trigger.unit.coord, trigger.target_coord) for trigger in triggers]
+        xs, ys = _coords([trigger.unit.coord for trigger in triggers])
+        target_xs, target_ys = _coords([trigger.target_coord for trigger in triggers])
+        distances = numpy.sqrt((xs - target_xs) ** 2 + (ys - target_ys) ** 2)
+        limits = numpy.fromiter((trigger.distance for trigger in triggers), dtype=float, count=len(triggers))
+        boundary = numpy.flatnonzero(numpy.abs(distances - limits) <= limits * _TOLERANCE + _TOLERANCE)
+        distances = distances.tolist()
+        for i in boundary:
+            distances[i] = _distance(triggers[i].unit.coord, triggers[i].target_coord)
+        return distances
+
+    def evaluate(self, triggers):
+        """
+            Возвращает триггеры, условие которых стало выполненным с прошлой проверки.
+        """
+        fired = []
+        for trigger, distance in zip(triggers, self._distances(triggers)):
+            is_met = trigger.check(distance)
+            if is_met and trigger.is_met is not True:
+                fired.append(trigger)
+            trigger.is_met = is_met
+        return fired
+
+
+def segment_entry(x0, y0, x1, y1, cx, cy, radius):
+    """
+        Доля отрезка (x0, y0) - (x1, y1), пройденная до входа в круг, или None, если отрезок круг не задел.
+    """
+    fx, fy = x0 - cx, y0 - cy
+    c = fx * fx + fy * fy - radius * radius
+    if c <= 0:
+        return 0.0
+    dx, dy = x1 - x0, y1 - y0
+    a = dx * dx + dy * dy
+    b = fx * dx + fy * dy
+    if a == 0 or b >= 0:
+        return None
+    discriminant = b * b - a * c
+    if discriminant < 0:
+        return None
+    t = (-b - math.sqrt(discriminant)) / a
+    return t if t <= 1 else None
+
+
+class ProjectilePass(object):
+    """
+        Попадания снарядов за тик. Проверяется весь отрезок, пройденный снарядом за шаг, а не только
+        конечная точка - быстрый снаряд не пролетит дрона насквозь. Из целей на отрезке попадание
+        получает первая по ходу полета, правила попадания - Projectile.can_hit.
+    """
+
+    def __init__(self, scene, use_numpy=None):
+        self.scene = scene
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+
+    @staticmethod
+    def _hit_radius(projectile, target):
+        return projectile.radius + target.radius - HIT_DEPTH
+
+    def _candidates_by_index(self, projectile):
+        start, end = projectile._sweep_from, projectile.coord
+        middle = ((start.x + end.x) / 2, (start.y + end.y) / 2)
+        half = math.sqrt((end.x - start.x) ** 2 + (end.y - start.y) ** 2) / 2
+        return self.scene.spatial_index.query_radius(
+            Point(*middle), half + projectile.radius, cls=(Drone, MotherShip), touching=True)
+
+    def _candidates_batched(self, projectiles, targets):
+        """
+            Расстояния от всех целей до всех отрезков одним расчетом массивами (снарядов, целей).
+        """
+        x0 = numpy.array([p._sweep_from.x for p in projectiles])[:, None]
+        y0 = numpy.array([p._sweep_from.y for p in projectiles])[:, None]
+        dx = numpy.array([p.coord.x for p in projectiles])[:, None] - x0
+        dy = numpy.array([p.coord.y for p in projectiles])[:, None] - y0
+        cx = numpy.array([t.coord.x for t in targets])[None, :]
+        cy = numpy.array([t.coord.y for t in targets])[None, :]
+        length = dx * dx + dy * dy
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            t = numpy.where(length > 0, ((cx - x0) * dx + (cy - y0) * dy) / length, 0.0)
+        t = numpy.clip(t, 0.0, 1.0)
+        distance = numpy.hypot(x0 + t * dx - cx, y0 + t * dy - cy)
+        radius = (numpy.array([p.radius for p in projectiles], dtype=float)[:, None]
+                  + numpy.array([t.radius for t in targets], dtype=float)[None, :] - HIT_DEPTH)
+        close = distance <= radius * (1 + _TOLERANCE) + _TOLERANCE
+        return [[targets[j] for j in numpy.flatnonzero(row)] for row in close]
+
+    def _first_hit(self, projectile, candidates):
+        start, end = projectile._sweep_from, projectile.coord
+        best = None
+        for target in candidates:
+            if not projectile.can_hit(target):
+                continue
+            entry = segment_entry(start.x, start.y, end.x, end.y, target.coord.x, target.coord.y,
+                                  self._hit_radius(projectile, target))
+            if entry is not None and (best is None or (entry, target.id) < best[:2]):
+                best = entry, target.id, target
+        return best
+
+    def detect_hits(self, projectiles):
+        """
+            Для снарядов, пролетевших в этом тике, найти первую цель на отрезке полета и нанести урон.
+            Снаряд переносится в точку попадания. Возвращает список пар (снаряд, цель).
+        """
+        flying = [p for p in projectiles if p._sweep_from is not None and p.is_alive and not p.has_hit]
+        if not flying:
+            return []
+        targets = None
+        if self.use_numpy:
+            targets = [obj for obj in self.scene.drones + self.scene.motherships if obj.is_alive]
+            if len(flying) * len(targets) < NUMPY_MIN_HIT_PAIRS:
+                targets = None
+        candidates = (self._candidates_batched(flying, targets) if targets is not None
+                      else [self._candidates_by_index(p) for p in flying])
+        hits = []
+        for projectile, projectile_candidates in zip(flying, candidates):
+            # Цель могла погибнуть от предыдущего снаряда этого же тика
+            best = self._first_hit(projectile, projectile_candidates)
+            if best is None:
+                continue
+            entry, _, target = best
+            start, end = projectile._sweep_from, projectile.coord
+            end.x, end.y = start.x + (end.x - start.x) * entry, start.y + (end.y - start.y) * entry
+            projectile.hit(target)
+            hits.append((projectile, target))
+        return hits
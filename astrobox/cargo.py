@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-from .theme import theme
 
 
 class CargoException(Exception):
@@ -23,12 +22,18 @@ class Cargo(object):
     def _clip_payload(self, batch):
         if self.__payload < batch:
             batch = self.__payload
-        self.__payload -= batch
+        if batch:
+            old_payload = self.__payload
+            self.__payload -= batch
+            self.__owner.scene._payload_changed(self.__owner, old_payload)
         return batch
 
     def _transfer_payload(self, batch, cargo_from):
         batched = cargo_from._clip_payload(batch)
-        self.__payload += batched
+        if batched:
+            old_payload = self.__payload
+            self.__payload += batched
+            self.__owner.scene._payload_changed(self.__owner, old_payload)
         return batched
 
     @property
@@ -61,16 +66,25 @@ class CargoTransition(object):
 
     def __init__(self, cargo_from=None, cargo_to=None):
         super(CargoTransition, self).__init__()
+        self.reset(cargo_from=cargo_from, cargo_to=cargo_to)
+
+    def reset(self, cargo_from=None, cargo_to=None):
+        """
+            Начать перенос заново - между теми же или другими трюмами, без создания нового объекта.
+        """
+        # Пока проверки не пройдены, перенос считается законченным
+        self.__done = True
+        self.__was_transfer = False
         self.cargo_from = cargo_from
         self.cargo_to = cargo_to
-        self.__distance = theme.CARGO_TRANSITION_DISTANCE
+        config = cargo_to.owner.scene.config
+        self.__distance = config.CARGO_TRANSITION_DISTANCE
         self.__batch_processed = 0
         self.__transition_limit = max(min(self.cargo_to.free_space, self.cargo_from.payload), 0)
-        self.__transition_speed = theme.CARGO_TRANSITION_SPEED
+        self.__transition_speed = config.CARGO_TRANSITION_SPEED
         if self.__transition_speed < 1:
             raise CargoException("transition_speed should be greater than 0")
-        self.__done = False
-        if not theme.DRONES_CAN_FIGHT:
+        if not config.DRONES_CAN_FIGHT:
             from_team = cargo_from.owner.team
             to_team = cargo_to.owner.team
             if from_team and to_team and from_team != to_team:
@@ -79,7 +93,7 @@ class CargoTransition(object):
                         cargo_from.owner.__class__.__name__, from_team,
                         cargo_to.owner.__class__.__name__, to_team,
                     ))
-        self.__was_transfer = False
+        self.__done = False
 
     @property
     def is_finished(self):
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from robogame_engine import constants
+
+from .snapshot import copy_state
+
+
+class SceneConfig(object):
+    """
+        Неизменяемый снимок констант темы, захваченный при создании сцены.
+        Объекты astrobox читают константы отсюда, а не из глобальной темы движка -
+        поэтому в одном процессе могут жить сцены с разными настройками.
+    """
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    @classmethod
+    def from_module(cls, theme_module, **overrides):
+        values = {}
+        for module in (constants, theme_module):
+            values.update((name, getattr(module, name)) for name in dir(module) if name.isupper())
+        unknown = set(overrides) - set(values)
+        if unknown:
+            raise ValueError('Unknown theme constants: {}'.format(', '.join(sorted(unknown))))
+        values.update(overrides)
+        return cls(values)
+
+    def replace(self, **overrides):
+        values = self.as_dict()
+        values.update(overrides)
+        return self.__class__(values)
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('SceneConfig is immutable, use replace()')
+
+    def __delattr__(self, name):
+        raise AttributeError('SceneConfig is immutable')
+
+    def __eq__(self, other):
+        return isinstance(other, SceneConfig) and self.__dict__ == other.__dict__
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __copy__(self):
+        # Неизменяема - форки сцены разделяют одну конфигурацию
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return 'SceneConfig({} constants)'.format(len(self.__dict__))
+
+
+class SceneBound(object):
+    """
+        Примесь для игровых объектов: запоминает сцену, в которой объект создан.
+        Движок хранит ссылку на сцену на уровне класса GameObject - без привязки
+        объекты видели бы последнюю созданную сцену.
+    """
+    _bound_scene = None
+
+    @property
+    def scene(self):
+        if self._bound_scene is None:
+            self._bound_scene = super(SceneBound, self).scene
+        return self._bound_scene
+
+    @property
+    def logger(self):
+        # Логгер у всех один ('robogame'), но движок настраивает логирование (dictConfig) заново
+        # для каждого объекта - это дороже всего остального конструктора. Берем уже настроенный логгер сцены
+        return self.scene.logger
+
+    def __deepcopy__(self, memo):
+        # Копия для форка сцены: копия привязывается к сцене-копии из memo
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        clone.__dict__.update(copy_state(self.__dict__, memo))
+        return clone
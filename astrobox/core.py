@@ -1,14 +1,39 @@
 # -*- coding: utf-8 -*-
 import math
-import random
+import operator
+import time
 
 from robogame_engine import GameObject
 from robogame_engine.constants import ROTATE_TURNING
 from robogame_engine.events import GameEvent
+from robogame_engine.geometry import Point, Vector, normalise_angle
 
 from .guns import PlasmaGun
 from .cargo import Cargo, CargoTransition
-from .theme import theme
+from .config import SceneBound
+
+
+# Значения этих типов неизменяемы и сравниваются напрямую
+_SLEEP_PLAIN_TYPES = (int, float, str, bool, type(None))
+# Точки и векторы сравниваются с точностью их str() ('p(1.0,2.0)', 'v(90.0,1.0)') - как прежний строковый снимок:
+# значения умножаются на _SLEEP_SCALE и округляются до целого (round(x, 1) заметно дороже)
+_SLEEP_GEOMETRY_FIELDS = ((Point, ('x', 'y')), (Vector, ('direction', 'module')))
+_SLEEP_SCALE = 10
+
+
+def _sleep_geometry_fields(value):
+    for cls, fields in _SLEEP_GEOMETRY_FIELDS:
+        if isinstance(value, cls):
+            return fields
+    return None
+
+
+def _sleep_shape_matches(raw_state, rounded):
+    # Скомпилированный снимок годится, пока значения тех же видов: числа из точек и векторов и простые значения
+    for value, rounding in zip(raw_state, rounded):
+        if not isinstance(value, (int, float) if rounding else _SLEEP_PLAIN_TYPES):
+            return False
+    return True
 
 
 class EventWakeUp(GameEvent):
@@ -17,16 +42,63 @@ class EventWakeUp(GameEvent):
         obj.on_wake_up()
 
 
-class Unit(GameObject):
+class EventProximity(GameEvent):
+
+    def handle(self, obj):
+        trigger = self._event_objs
+        if not trigger.cancelled:
+            trigger.callback(trigger)
+
+
+class ProximityTrigger(object):
+    """
+        Условие "юнит ближе distance к цели" (near=True) или "не ближе distance" (near=False).
+        Цель - игровой объект или точка. Сцена проверяет все триггеры раз в тик, после шагов объектов,
+        и вызывает callback(trigger) событием юнита на следующем тике - только когда условие
+        стало выполненным (в том числе при первой проверке). once=True - сработать один раз.
+        Без callback триггер только хранит результат последней проверки в is_met.
+    """
+
+    def __init__(self, unit, target, distance, callback, near=True, once=False):
+        self.unit = unit
+        self.target = target
+        self.distance = distance
+        self.callback = callback
+        self.near = near
+        self.once = once
+        self.cancelled = False
+        # Ключ в реестре триггеров сцены
+        self.key = None
+        # Результат последней проверки, None - еще не проверялось
+        self.is_met = None
+
+    @property
+    def target_coord(self):
+        return self.target.coord if isinstance(self.target, GameObject) else self.target
+
+    def check(self, distance):
+        return distance < self.distance if self.near else distance >= self.distance
+
+    def cancel(self):
+        self.cancelled = True
+        self.unit.scene.remove_trigger(self)
+
+
+class Unit(SceneBound, GameObject):
     coord = None  # переопределяется в потомках
     radius = 0
     _cargo = None
 
     def __init__(self, payload=0, max_payload=1, **kwargs):
+        self._config = self.scene.config
+        if kwargs.get('direction') is None:
+            # Движок выбрал бы направление глобальным random - берем генератор сцены
+            kwargs['direction'] = self.scene.random.randint(0, 360)
         super(Unit, self).__init__(**kwargs)
         self._move_target = None
         self._cargo = Cargo(self, payload=payload, max_payload=max_payload)
         self._transition = None
+        self.scene._register_unit(self)
 
     @property
     def cargo(self):
@@ -68,6 +140,36 @@ class Unit(GameObject):
                 self._transition = None
 
         super(Unit, self).game_step()
+        self.scene.spatial_index.update(self)
+
+    def add_event(self, event):
+        super(Unit, self).add_event(event)
+        self.scene.activate_object(self)
+
+    def add_command(self, command):
+        super(Unit, self).add_command(command)
+        self.scene.activate_object(self)
+
+    def _can_go_dormant(self):
+        """
+            Может ли объект уйти в спящий слой сцены: сам он больше ничего не изменит,
+            а разбудит его только внешнее воздействие (событие, команда, перегрузка элериума).
+        """
+        return False
+
+    def _has_pending_work(self):
+        return self._transition is not None or not self._events.empty() or not self._commands.empty()
+
+    def _on_dormant(self):
+        pass
+
+    def _on_activated(self):
+        pass
+
+    def set_team(self, team_name):
+        old_team = self.team
+        super(Unit, self).set_team(team_name)
+        self.scene._unit_team_changed(self, old_team)
 
     def move_at(self, target, speed=None):
         if self._move_target == target:
@@ -92,13 +194,32 @@ class Unit(GameObject):
     def on_unload_complete(self):
         pass
 
+    def when_near(self, target, distance, callback=None, once=False, key=None):
+        """
+            Вызвать callback(trigger), когда юнит окажется ближе distance к цели.
+            Триггер с тем же key заменяет прежний триггер юнита с этим key.
+        """
+        return self.scene.add_trigger(
+            ProximityTrigger(self, target, distance, callback, near=True, once=once), key=key)
+
+    def when_far(self, target, distance, callback=None, once=False, key=None):
+        """
+            Вызвать callback(trigger), когда юнит окажется не ближе distance к цели.
+        """
+        return self.scene.add_trigger(
+            ProximityTrigger(self, target, distance, callback, near=False, once=once), key=key)
+
 
 class Drone(Unit):
     rotate_mode = ROTATE_TURNING
     radius = 44
     auto_team = True
     layer = 2
+    # Атрибуты, изменение которых будит дрона. Точки и векторы сравниваются по координатам,
+    # простые значения - напрямую, прочие объекты - по str()
     sleep_attrs = ('coord', 'vector', 'payload', 'gun_cooldown')
+    # Логика команды (astrobox.team_logic.TeamLogic или путь к ней) - тогда дронами командует она
+    team_logic = None
 
     class __DeathAnimation(object):
         def __init__(self, owner):
@@ -123,19 +244,24 @@ class Drone(Unit):
             return self.__current_sprite
 
     def __init__(self, **kwargs):
+        config = self.scene.config
         self._mothership = None
         self._gun = None
-        if theme.DRONES_CAN_FIGHT:
+        if config.DRONES_CAN_FIGHT:
             self._gun = PlasmaGun(self)
-        self.__health = theme.DRONE_MAX_SHIELD
-        super(Drone, self).__init__(max_payload=theme.MAX_DRONE_ELERIUM, **kwargs)
+        self.__health = config.DRONE_MAX_SHIELD
+        super(Drone, self).__init__(max_payload=config.MAX_DRONE_ELERIUM, **kwargs)
 
-        self.__dead_flight_speed = theme.DRONE_DEAD_SPEED
+        self.__dead_flight_speed = config.DRONE_DEAD_SPEED
         self.__angle_of_death = None
         self.__death_animaion = self.__DeathAnimation(self)
 
         self._sleep_state = None
-        self._sleep_countdown = theme.SLEEP_COUNTDOWN
+        self._sleep_raw_state = None
+        self._sleep_state_getter = (None, None, None)
+        # Тик, с которого отсчитывается засыпание, и таймер пробуждения в планировщике сцены
+        self._sleep_since = None
+        self._wake_up_timer = None
 
     @property
     def have_gun(self):
@@ -156,8 +282,7 @@ class Drone(Unit):
 
     @property
     def teammates(self):
-        return [mate for mate in self.scene.drones
-                if mate != self and mate.team == self.team and mate.is_alive]
+        return [mate for mate in self.scene.alive_team_drones(self.team) if mate is not self]
 
     @property
     def sprite_filename(self):
@@ -171,20 +296,29 @@ class Drone(Unit):
 
     @property
     def meter_2(self):
-        return float(self.__health) / theme.DRONE_MAX_SHIELD
+        return float(self.__health) / self._config.DRONE_MAX_SHIELD
 
     @property
     def is_alive(self):
         return self.__health > 0
 
     def damage_taken(self, damage=0):
+        was_alive = self.is_alive
+        old_health = self.__health
         self.__health = max(self.__health - damage, 0)
+        if self.__health != old_health:
+            self.scene._health_changed(self, old_health)
         if self.__health <= 0:
             self.stop()
+            if was_alive:
+                self.scene._unit_died(self)
 
     def __heal_taken(self, healed_on=0):
         if self.__health > 0:
-            self.__health = min(self.__health + healed_on, theme.DRONE_MAX_SHIELD)
+            old_health = self.__health
+            self.__health = min(self.__health + healed_on, self._config.DRONE_MAX_SHIELD)
+            if self.__health != old_health:
+                self.scene._health_changed(self, old_health)
 
     @property
     def mothership(self):
@@ -193,46 +327,56 @@ class Drone(Unit):
             assert self._mothership is not None
         return self._mothership
 
+    def _can_go_dormant(self):
+        # Обломки долетели - дальше только лут элериума другими дронами
+        return not self.is_alive and self.__dead_flight_speed < 0.0 and not self._has_pending_work()
+
     def __dead_game_step(self):
         if self.__dead_flight_speed < 0.0:
             return
         if self.__angle_of_death is None:
             self.layer = 1
-            self.__angle_of_death = random.randint(0, 359)
+            self.__angle_of_death = self.scene.random.randint(0, 359)
 
         x = self.__dead_flight_speed * math.sin(self.__angle_of_death)
         y = self.__dead_flight_speed * math.cos(self.__angle_of_death)
-        self.coord.x = min(theme.FIELD_WIDTH - self.radius, max(self.radius, self.coord.x + x))
-        self.coord.y = min(theme.FIELD_HEIGHT - self.radius, max(self.radius, self.coord.y + y))
+        config = self._config
+        self.coord.x = min(config.FIELD_WIDTH - self.radius, max(self.radius, self.coord.x + x))
+        self.coord.y = min(config.FIELD_HEIGHT - self.radius, max(self.radius, self.coord.y + y))
 
-        self.__dead_flight_speed -= theme.DRONE_DEAD_SPEED_DECELERATION * self.scene.game_speed
+        self.__dead_flight_speed -= config.DRONE_DEAD_SPEED_DECELERATION * self.scene.game_speed
         super(Drone, self).game_step()
 
     def game_step(self):
+        # Шаг движка не засчитывается во время кода игрока (см. astrobox.cpu_budget)
+        started = time.process_time()
+        self.__engine_step()
+        self.scene._engine_time_spent(time.process_time() - started)
+
+    def __engine_step(self):
         if not self.is_alive:
             self.__dead_game_step()
             return
-        if self.mothership and self.mothership.is_alive and \
-                self.distance_to(self.mothership.coord) < theme.MOTHERSHIP_HEALING_DISTANCE:
-            self.__heal_taken(theme.MOTHERSHIP_HEALING_RATE)
+        config = self._config
+        # Расстояния до баз считаются сценой один раз за тик для всех дронов
+        if self.mothership and self.mothership.is_alive and self.scene._in_healing_range(self):
+            self.__heal_taken(config.MOTHERSHIP_HEALING_RATE)
         else:
-            self.__heal_taken(theme.DRONE_SHIELD_RENEWAL_RATE)
+            self.__heal_taken(config.DRONE_SHIELD_RENEWAL_RATE)
         if self.have_gun:
             self.gun.game_step()
         super(Drone, self).game_step()
         self.update_sleep_state()
-        if self.is_asleep():
-            self.add_event(EventWakeUp())
 
     def move_at(self, target, speed=None):
         if not self.is_alive:
             return
-        super(Drone, self).move_at(target, speed=theme.DRONE_SPEED)
+        super(Drone, self).move_at(target, speed=self._config.DRONE_SPEED)
 
     def turn_to(self, target, speed=None):
         if not self.is_alive:
             return
-        super(Drone, self).turn_to(target, speed=theme.DRONE_TURN_SPEED)
+        super(Drone, self).turn_to(target, speed=self._config.DRONE_TURN_SPEED)
 
     @property
     def my_mothership(self):
@@ -243,15 +387,13 @@ class Drone(Unit):
         return self.scene.asteroids
 
     def on_stop_at_target(self, target):
-        for asteroid in self.asteroids:
-            if asteroid.near(target):
-                self.on_stop_at_asteroid(asteroid)
-                return
-        else:
-            for ship in self.scene.motherships:
-                if ship.near(target):
-                    self.on_stop_at_mothership(ship)
-                    return
+        # Цель внутри радиуса объекта - значит остановились у этого объекта
+        for asteroid in self.scene.spatial_index.query_radius(target, 0, cls=Asteroid, touching=True):
+            self.on_stop_at_asteroid(asteroid)
+            return
+        for ship in self.scene.spatial_index.query_radius(target, 0, cls=MotherShip, touching=True):
+            self.on_stop_at_mothership(ship)
+            return
         self.on_stop_at_point(target)
 
     def on_stop_at_point(self, target):
@@ -263,18 +405,96 @@ class Drone(Unit):
     def on_stop_at_mothership(self, mothership):
         pass
 
+    def _compile_sleep_state(self):
+        # Разворачиваем атрибуты в пути до чисел: ('coord',) -> ('coord.x', 'coord.y'),
+        # и снимаем состояние одним attrgetter без форматирования строк.
+        # Возвращает (getter, для каждого значения - округлять ли его), для обобщенного снимка - (getter, None)
+        paths, rounded = [], []
+        for attr in self.sleep_attrs:
+            value = getattr(self, attr)
+            fields = _sleep_geometry_fields(value)
+            if fields is not None:
+                paths.extend('{}.{}'.format(attr, field) for field in fields)
+                rounded.extend(True for _ in fields)
+            elif isinstance(value, _SLEEP_PLAIN_TYPES):
+                paths.append(attr)
+                rounded.append(False)
+            else:
+                return self.__class__._generic_sleep_state, None
+        if not paths:
+            return (lambda obj: ()), ()
+        getter = operator.attrgetter(*paths)
+        if len(paths) == 1:
+            # attrgetter с одним путем возвращает само значение, а не кортеж
+            return (lambda obj: (getter(obj),)), tuple(rounded)
+        return getter, tuple(rounded)
+
+    def _generic_sleep_state(self):
+        state = []
+        for attr in self.sleep_attrs:
+            value = getattr(self, attr)
+            fields = _sleep_geometry_fields(value)
+            if fields is not None:
+                state.extend(round(getattr(value, field) * _SLEEP_SCALE) for field in fields)
+            elif isinstance(value, _SLEEP_PLAIN_TYPES):
+                state.append(value)
+            else:
+                state.append(str(value))
+        return state
+
+    def _recompile_sleep_state(self):
+        getter, rounded = self._compile_sleep_state()
+        self._sleep_state_getter = (self.sleep_attrs, getter, rounded)
+        self._sleep_raw_state = None
+        return getter, rounded
+
     def update_sleep_state(self):
-        new_state = '-'.join([str(getattr(self, attr)) for attr in self.sleep_attrs])
+        sleep_attrs, getter, rounded = self._sleep_state_getter
+        if sleep_attrs is not self.sleep_attrs:
+            getter, rounded = self._recompile_sleep_state()
+        try:
+            raw_state = getter(self)
+        except AttributeError:
+            # Атрибут сменил тип (точка стала None) - собираем снимок заново по текущим значениям
+            getter, rounded = self._recompile_sleep_state()
+            raw_state = getter(self)
+        # Округление и проверка типов дорогие - если сырые значения не менялись, не изменилось и состояние
+        if raw_state == self._sleep_raw_state:
+            return
+        if rounded is not None and not _sleep_shape_matches(raw_state, rounded):
+            getter, rounded = self._recompile_sleep_state()
+            raw_state = getter(self)
+        self._sleep_raw_state = raw_state
+        if rounded is not None and True in rounded:
+            new_state = [round(value * _SLEEP_SCALE) if rounding else value
+                         for value, rounding in zip(raw_state, rounded)]
+        else:
+            new_state = raw_state
         if self._sleep_state is None or self._sleep_state != new_state:
             self._sleep_state = new_state
-            self._sleep_countdown = theme.SLEEP_COUNTDOWN
-        elif self._sleep_countdown > 0:
-            self._sleep_countdown -= 1
-        else:
-            self._sleep_countdown = theme.SLEEP_COUNTDOWN
+            self._sleep_since = self.scene._step
+            if self._wake_up_timer is None:
+                self._schedule_wake_up()
+
+    def _schedule_wake_up(self):
+        # Пробуждение для тика засыпания T доставляется в начале тика T + 1 - как событие,
+        # добавленное в конце шага дрона. Если дрон с тех пор менялся, таймер просто переставится
+        self._wake_up_timer = self.scene.scheduler.call_at(
+            self._sleep_since + self._config.SLEEP_COUNTDOWN + 1, self._wake_up_due)
+
+    def _wake_up_due(self):
+        self._wake_up_timer = None
+        if not self.is_alive:
+            return
+        step = self.scene._step
+        if step > self._sleep_since + self._config.SLEEP_COUNTDOWN:
+            self.add_event(EventWakeUp())
+            # Следующее пробуждение - через SLEEP_COUNTDOWN тиков после этого
+            self._sleep_since = step
+        self._schedule_wake_up()
 
     def is_asleep(self):
-        return self._sleep_countdown <= 0
+        return self._sleep_since is not None and self.scene._step >= self._sleep_since + self._config.SLEEP_COUNTDOWN
 
     def on_wake_up(self):
         self.info('Wake up, Neo!')
@@ -289,11 +509,34 @@ class Asteroid(Unit):
 
     def __init__(self, elerium=None, **kwargs):
         if "direction" not in kwargs:
-            kwargs["direction"] = random.randint(0, 360)
-        self.__sprite_num = random.randint(1, 5)
-        self._size = (elerium / theme.MIN_ASTEROID_ELERIUM) * .8
+            kwargs["direction"] = self.scene.random.randint(0, 360)
+        self.__sprite_num = self.scene.random.randint(1, 5)
+        self._size = (elerium / self.scene.config.MIN_ASTEROID_ELERIUM) * .8
+        self.__dormant_since = None
         super(Asteroid, self).__init__(payload=elerium, max_payload=elerium, **kwargs)
 
+    @property
+    def direction(self):
+        if self.__dormant_since is None:
+            return self.vector.direction
+        # Спящий астероид вращается "на бумаге" - угол считаем от номера шага
+        step, direction = self.__dormant_since
+        return normalise_angle(direction + self._config.ASTEROID_ROTATION_SPEED * (self.scene._step - step))
+
+    def _can_go_dormant(self):
+        # Астероид только вращается, это можно посчитать без шагов
+        return not self._has_pending_work()
+
+    def _on_dormant(self):
+        self.__dormant_since = (self.scene._step, self.vector.direction)
+
+    def _on_activated(self):
+        direction = self.direction
+        self.__dormant_since = None
+        self.vector = Vector.from_direction(direction, module=1)
+        self.state.stop()
+        self.turn_to(direction + 90, speed=self._config.ASTEROID_ROTATION_SPEED)
+
     @property
     def cargo(self):
         return self._cargo
@@ -316,11 +559,11 @@ class Asteroid(Unit):
 
     def on_born(self):
         # super(Unit, self).on_born()
-        self.turn_to(self.direction + 90, speed=theme.ASTEROID_ROTATION_SPEED)
+        self.turn_to(self.direction + 90, speed=self._config.ASTEROID_ROTATION_SPEED)
 
     def on_stop(self):
         # super(Asteroid, self).on_stop()
-        self.turn_to(self.direction + 90, speed=theme.ASTEROID_ROTATION_SPEED)
+        self.turn_to(self.direction + 90, speed=self._config.ASTEROID_ROTATION_SPEED)
 
     def on_heartbeat(self):
         pass
@@ -357,7 +600,7 @@ class MotherShip(Unit):
 
     def __init__(self, max_payload=0, **kwargs):
         super(MotherShip, self).__init__(max_payload=max_payload, **kwargs)
-        self.__health = theme.MOTHERSHIP_MAX_SHIELD
+        self.__health = self._config.MOTHERSHIP_MAX_SHIELD
         # WARN: на момент создания материнского корабля не известен № комманды
         # поэтому создаем в момент первого обращения
         self.__death_animaion = None
@@ -376,7 +619,7 @@ class MotherShip(Unit):
 
     @property
     def meter_2(self):
-        return self.__health / theme.MOTHERSHIP_MAX_SHIELD
+        return self.__health / self._config.MOTHERSHIP_MAX_SHIELD
 
     @property
     def counter(self):
@@ -392,14 +635,20 @@ class MotherShip(Unit):
         return self.__health > 0
 
     def damage_taken(self, damage=0):
+        was_alive = self.is_alive
         self.__health = max(self.__health - damage, 0)
+        if was_alive and not self.is_alive:
+            self.scene._unit_died(self)
 
     def __heal_taken(self, healed_on=0):
         if self.__health > 0:
-            self.__health = min(self.__health + healed_on, theme.MOTHERSHIP_MAX_SHIELD)
+            self.__health = min(self.__health + healed_on, self._config.MOTHERSHIP_MAX_SHIELD)
+
+    def _can_go_dormant(self):
+        return not self.is_alive and not self._has_pending_work()
 
     def game_step(self):
-        self.__heal_taken(theme.MOTHERSHIP_SHIELD_RENEWAL_RATE)
+        self.__heal_taken(self._config.MOTHERSHIP_SHIELD_RENEWAL_RATE)
 
     def on_heartbeat(self):
         pass
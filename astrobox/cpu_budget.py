@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    Учет процессорного времени кода игроков: обработчиков событий дронов и их game_step
+    (без шага движка внутри Drone.game_step) и логик команд. Итоги по командам попадают
+    в результат игры.
+
+    Если задан бюджет DRONE_CPU_BUDGET (секунд на дрона за тик), превысивший его дрон пропускает
+    свой код в следующих тиках - летит, грузится и лечится как обычно, но не думает:
+        throttle - пропускает столько тиков, сколько нужно, чтобы погасить перерасход бюджетом;
+        skip - пропускает один тик.
+    С бюджетом игра зависит от скорости машины - для турниров с одним seed его лучше не задавать.
+"""
+import time
+from collections import defaultdict
+
+from .core import Drone
+
+OVERRUN_POLICIES = ('throttle', 'skip')
+
+
+class CpuAccounting(object):
+
+    def __init__(self, budget=0.0, overrun='throttle'):
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError('Unknown CPU overrun policy {!r}, use one of {}'.format(overrun, OVERRUN_POLICIES))
+        self.budget = budget
+        self.overrun = overrun
+        self.by_drone = defaultdict(float)
+        self.by_team = defaultdict(float)
+        self.skipped = defaultdict(int)
+        self.__debt = {}
+        self.__engine_time = 0.0
+
+    def engine_time_spent(self, seconds):
+        self.__engine_time += seconds
+
+    def _can_run(self, drone):
+        debt = self.__debt.get(drone.id)
+        if not debt:
+            return True
+        # Пропущенный тик гасит долг бюджетом этого тика
+        debt -= self.budget
+        self.__debt[drone.id] = debt if debt > 0 and self.overrun == 'throttle' else 0.0
+        self.skipped[drone.team] += 1
+        return False
+
+    def step_drone(self, drone):
+        """
+            Шаг дрона как в цикле движка, с учетом времени его кода.
+        """
+        if not self._can_run(drone):
+            drone.proceed_commands()
+            # Шаг движка без переопределений игрока
+            Drone.game_step(drone)
+            return
+        self.__engine_time = 0.0
+        started = time.process_time()
+        drone.proceed_events()
+        events_done = time.process_time()
+        drone.proceed_commands()
+        commands_done = time.process_time()
+        drone.game_step()
+        used = events_done - started + time.process_time() - commands_done - self.__engine_time
+        self.charge(drone.team, used, drone_id=drone.id)
+        if self.budget and used > self.budget:
+            self.__debt[drone.id] = self.__debt.get(drone.id, 0.0) + used - self.budget
+
+    def charge(self, team, seconds, drone_id=None):
+        seconds = max(seconds, 0.0)
+        self.by_team[team] += seconds
+        if drone_id is not None:
+            self.by_drone[drone_id] += seconds
+
+    def result(self):
+        result = {'cpu_time': dict((team, round(seconds, 6)) for team, seconds in self.by_team.items())}
+        if self.budget:
+            result['cpu_skipped'] = dict(self.skipped)
+        return result
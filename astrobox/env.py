@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+    Окружения в стиле Gym для обучения агентов: одна команда дронов управляется
+    пакетом действий снаружи, наблюдения, награды и признаки конца игры - массивы NumPy.
+
+        env = VectorEnv([EnvSpec(drones=5, opponents=['demo.game.GreedyDrone'], seed=seed)
+                         for seed in range(8)], processes=4)
+        obs = env.reset()
+        obs, reward, done, info = env.step(actions)   # actions: (число сред, дронов, 2)
+        env.close()
+
+    Действие дрона - пара (код, цель). Цель - номер объекта в таблице наблюдения
+    (см. AstroboxEnv.entities): базы, затем астероиды, затем дроны всех команд.
+    Пушка, как и в Drone.gun.shot, стреляет по направлению дрона - прицелиться можно действием ACT_TURN.
+"""
+import multiprocessing
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from .cargo import CargoException
+from .core import Drone, MotherShip
+from .tournament import DEFAULT_THEME_MOD_PATH, apply_theme, class_path, import_class
+
+ACT_NOOP = 0
+ACT_MOVE = 1
+ACT_LOAD = 2
+ACT_UNLOAD = 3
+ACT_SHOOT = 4
+ACT_TURN = 5
+ACTIONS_COUNT = 6
+
+KIND_ASTEROID = 0
+KIND_MOTHERSHIP = 1
+KIND_DRONE = 2
+
+# Столбцы таблицы наблюдения
+FEATURES = ('kind', 'owner', 'x', 'y', 'direction', 'payload', 'free_space', 'health', 'is_alive', 'gun_cooldown')
+F_KIND, F_OWNER, F_X, F_Y, F_DIRECTION, F_PAYLOAD, F_FREE_SPACE, F_HEALTH, F_IS_ALIVE, F_GUN_COOLDOWN = range(
+    len(FEATURES))
+
+
+class EnvException(Exception):
+    pass
+
+
+class AgentDrone(Drone):
+    """
+        Дрон без своей стратегии - им управляют действия окружения.
+    """
+
+
+class EnvSpec(object):
+    """
+        Параметры одной среды. Соперники хранятся путями к классам - спецификация
+        дешево передается в рабочие процессы.
+    """
+
+    def __init__(self, drones=5, opponents=(), seed=None, asteroids_count=27, can_fight=False,
+                 field=(1200, 600), max_steps=None, theme_overrides=None, theme_mod_path=DEFAULT_THEME_MOD_PATH):
+        self.drones = drones
+        self.opponents = [class_path(cls) for cls in opponents]
+        if len(self.opponents) > 3:
+            raise EnvException('Up to 3 opponent teams, got {}'.format(len(self.opponents)))
+        self.seed = seed
+        self.asteroids_count = asteroids_count
+        self.can_fight = can_fight
+        self.field = tuple(field)
+        self.max_steps = max_steps
+        self.theme_overrides = dict(theme_overrides or {})
+        self.theme_mod_path = theme_mod_path
+
+
+class AstroboxEnv(object):
+    """
+        Одна безголовая сцена. Награда - прирост элериума на базе команды агента за шаг.
+        Наблюдение - таблица (объектов, len(FEATURES)) float32; owner: 1 - свой, -1 - чужой, 0 - ничей.
+    """
+
+    def __init__(self, spec):
+        if numpy is None:
+            raise EnvException('astrobox.env needs NumPy: pip install astrobox[env]')
+        self.spec = spec
+        self.scene = None
+        self.entities = []
+        self.agent_drones = []
+        self.game_result = None
+        self.__mothership = None
+        self.__prev_collected = 0
+        self.__resets = 0
+
+    @property
+    def observation_shape(self):
+        return len(self.spec.opponents) + 1 + self.spec.asteroids_count + self.spec.drones * (
+            len(self.spec.opponents) + 1), len(FEATURES)
+
+    def reset(self, seed=None):
+        from .space_field import SpaceField
+
+        spec = self.spec
+        if seed is None and spec.seed is not None:
+            # Повторные игры одной среды не должны быть одинаковыми
+            seed = spec.seed + self.__resets
+        self.__resets += 1
+        apply_theme(spec.theme_mod_path, spec.theme_overrides)
+        self.scene = SpaceField(
+            name='Env', field=spec.field, speed=1, asteroids_count=spec.asteroids_count, can_fight=spec.can_fight,
+            max_drones_at_team=spec.drones, theme_mod_path=spec.theme_mod_path,
+            theme_overrides=spec.theme_overrides, seed=seed, headless=True,
+        )
+        # Итоги игры возвращаются в info, печатать их незачем
+        self.scene._game_statistics_printed = True
+        self.agent_drones = [AgentDrone() for _ in range(spec.drones)]
+        for path in spec.opponents:
+            drone_class = import_class(path)
+            for _ in range(spec.drones):
+                drone_class()
+        self.scene.prepare(asteroids_count=spec.asteroids_count)
+        self.entities = self.scene.motherships + self.scene.asteroids + self.scene.drones
+        if len(self.entities) != self.observation_shape[0]:
+            raise EnvException('Scene has {} objects, expected {}'.format(
+                len(self.entities), self.observation_shape[0]))
+        self.__mothership = self.agent_drones[0].my_mothership
+        self.__prev_collected = self.__mothership.payload
+        self.game_result = None
+        return self.observe()
+
+    def observe(self):
+        team = self.agent_drones[0].team
+        rows = []
+        for obj in self.entities:
+            if isinstance(obj, Drone):
+                kind, health, cooldown = KIND_DRONE, obj.health, obj.gun_cooldown if obj.have_gun else 0
+            elif isinstance(obj, MotherShip):
+                kind, health, cooldown = KIND_MOTHERSHIP, obj.health, 0
+            else:
+                kind, health, cooldown = KIND_ASTEROID, 0, 0
+            owner = 0 if obj.team is None else (1 if obj.team == team else -1)
+            rows.append((kind, owner, obj.coord.x, obj.coord.y, obj.direction, obj.payload, obj.free_space,
+                         health, obj.is_alive, cooldown))
+        return numpy.array(rows, dtype=numpy.float32)
+
+    def apply_actions(self, actions):
+        """
+            Возвращает число отклоненных действий - погрузка, запрещенная правилами, пропускается.
+        """
+        entities = self.entities
+        invalid = 0
+        for drone, (action, target) in zip(self.agent_drones, actions):
+            if action == ACT_NOOP or not drone.is_alive:
+                continue
+            if not 0 <= target < len(entities):
+                raise EnvException('Action target {} out of range'.format(target))
+            obj = entities[target]
+            if action == ACT_MOVE:
+                drone.move_at(obj)
+            elif action in (ACT_LOAD, ACT_UNLOAD):
+                try:
+                    if action == ACT_LOAD:
+                        drone.load_from(obj)
+                    else:
+                        drone.unload_to(obj)
+                except CargoException:
+                    invalid += 1
+            elif action == ACT_SHOOT:
+                if drone.have_gun:
+                    drone.gun.shot(obj)
+            elif action == ACT_TURN:
+                drone.turn_to(obj)
+            else:
+                raise EnvException('Unknown action {}'.format(action))
+        return invalid
+
+    def step(self, actions):
+        """
+            actions - массив (дронов агента, 2) пар (код, цель).
+            Возвращает (наблюдение, награда, конец игры, info): info['invalid_actions'] - число отклоненных
+            действий, info['game_result'] - итоги законченной игры.
+        """
+        scene = self.scene
+        with scene.active():
+            invalid = self.apply_actions(numpy.asarray(actions, dtype=numpy.int64))
+        scene._step += 1
+        scene.game_step()
+        is_game_over, game_result = scene.get_game_result()
+        if not is_game_over and self.spec.max_steps is not None and scene._step >= self.spec.max_steps:
+            is_game_over = True
+        collected = self.__mothership.payload
+        reward = collected - self.__prev_collected
+        self.__prev_collected = collected
+        info = {'invalid_actions': invalid}
+        if is_game_over:
+            self.game_result = game_result
+            info['game_result'] = game_result
+        return self.observe(), float(reward), is_game_over, info
+
+    def close(self):
+        self.scene = None
+        self.entities = []
+        self.agent_drones = []
+
+
+class _EnvGroup(object):
+    """
+        Несколько сред, шагающих вместе. Закончившаяся среда сразу начинает новую игру,
+        последнее наблюдение игры уходит в info['final_observation'].
+    """
+
+    def __init__(self, specs):
+        self.envs = [AstroboxEnv(spec) for spec in specs]
+
+    def reset(self, seeds=None):
+        seeds = seeds or [None] * len(self.envs)
+        return [env.reset(seed) for env, seed in zip(self.envs, seeds)]
+
+    def step(self, actions):
+        results = []
+        for env, env_actions in zip(self.envs, actions):
+            obs, reward, done, info = env.step(env_actions)
+            if done:
+                info['final_observation'] = obs
+                obs = env.reset()
+            results.append((obs, reward, done, info))
+        return results
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def _worker(conn, specs):
+    group = _EnvGroup(specs)
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == 'reset':
+                conn.send(group.reset(data))
+            elif command == 'step':
+                conn.send(group.step(data))
+            elif command == 'close':
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        group.close()
+        conn.close()
+
+
+class VectorEnv(object):
+    """
+        N сред в ногу: step получает действия всех сред одним массивом (N, дронов, 2)
+        и возвращает наблюдения (N, объектов, признаков), награды (N,) и признаки конца (N,).
+        processes=0 - все среды в этом процессе, иначе среды делятся между рабочими процессами.
+        Формы наблюдений всех сред должны совпадать.
+    """
+
+    def __init__(self, specs, processes=0):
+        self.specs = list(specs)
+        if not self.specs:
+            raise EnvException('No environments')
+        shapes = set(AstroboxEnv(spec).observation_shape for spec in self.specs)
+        if len(shapes) > 1:
+            raise EnvException('Environments have different observation shapes: {}'.format(sorted(shapes)))
+        self.observation_shape = shapes.pop()
+        self.processes = min(processes, len(self.specs))
+        self.__group = None
+        self.__workers = []
+        if self.processes:
+            self.__slices = []
+            for index in range(self.processes):
+                self.__slices.append(slice(index, len(self.specs), self.processes))
+            for env_slice in self.__slices:
+                parent_conn, child_conn = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=_worker, args=(child_conn, self.specs[env_slice]))
+                process.daemon = True
+                process.start()
+                child_conn.close()
+                self.__workers.append((process, parent_conn))
+        else:
+            self.__group = _EnvGroup(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _call(self, command, data):
+        if self.__group is not None:
+            return getattr(self.__group, command)(data)
+        for (_, conn), env_slice in zip(self.__workers, self.__slices):
+            conn.send((command, None if data is None else data[env_slice]))
+        results = [None] * len(self.specs)
+        for (_, conn), env_slice in zip(self.__workers, self.__slices):
+            results[env_slice] = conn.recv()
+        return results
+
+    def reset(self, seeds=None):
+        return numpy.stack(self._call('reset', seeds))
+
+    def step(self, actions):
+        actions = numpy.asarray(actions, dtype=numpy.int64)
+        if actions.shape[:1] != (len(self.specs),) or actions.shape[-1:] != (2,):
+            raise EnvException('Actions should have shape (envs, drones, 2), got {}'.format(actions.shape))
+        results = self._call('step', actions)
+        obs, rewards, dones, infos = zip(*results)
+        return (numpy.stack(obs), numpy.array(rewards, dtype=numpy.float32),
+                numpy.array(dones, dtype=numpy.bool_), list(infos))
+
+    def close(self):
+        if self.__group is not None:
+            self.__group.close()
+            self.__group = None
+        for process, conn in self.__workers:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, EOFError):
+                pass
+            conn.close()
+            process.join()
+        self.__workers = []
@@ -1,13 +1,37 @@
 # -*- coding: utf-8 -*-
 
+from collections import defaultdict, deque
+
 from robogame_engine import GameObject
 from robogame_engine.constants import ROTATE_TURNING
+from robogame_engine.events import EventBorned
 from robogame_engine.geometry import Vector
-
-from .theme import theme
-
-
-class Projectile(GameObject):
+from robogame_engine.states import StateStopped
+from robogame_engine.theme import theme
+
+from .config import SceneBound
+
+
+def _reinit_game_object(obj, coord, direction):
+    # Повторяет GameObject.__init__ из robogame_engine 1.4.1 (requirements: robogame_engine==1.4.*),
+    # кроме создания очередей. При обновлении движка сверить с его конструктором
+    obj.coord = coord
+    obj.radius = obj.__class__.radius
+    obj.scene.objects.append(obj)
+    GameObject._GameObject__objects_count += 1
+    obj.id = GameObject._GameObject__objects_count
+    obj.vector = Vector.from_direction(direction, module=1)
+    obj.target = None
+    obj.state = StateStopped(obj=obj)
+    obj._heartbeat_tics = theme.HEARTBEAT_INTERVAL
+    obj._events.queue.clear()
+    obj._commands.queue.clear()
+    obj._selected = False
+    obj.add_event(EventBorned(obj))
+    obj.debug('born {coord} {vector}')
+
+
+class Projectile(SceneBound, GameObject):
     """описывает поведение полета снаряда."""
     coord = None
     rotate_mode = ROTATE_TURNING
@@ -19,13 +43,32 @@ class Projectile(GameObject):
     max_distance = 100.0
 
     def __init__(self, owner=None, speed=None, ttl=None, attached_ttl=None, **kwargs):
+        self._config = self.scene.config
         super(Projectile, self).__init__(**kwargs)
+        self.__full_ttl = ttl
+        self.__speed = speed
+        self.__attached_ttl = attached_ttl
+        # Анимация попадания живет вместе со снарядом и переиспользуется при повторных выстрелах из пула
+        self.__animation = None
+        self.__launch(owner)
+
+    def __launch(self, owner):
         self.__initial_coord = owner.coord.copy()
         self._owner = owner
-        self.__ttl = ttl
-        self.__speed = speed
+        self.__ttl = self.__full_ttl
         self.__attached = None
-        self.__attached_ttl = attached_ttl
+        self._in_pool = False
+        # Откуда снаряд начал последний шаг полета - отрезок проверяет проход попаданий сцены
+        self._sweep_from = None
+
+    def _relaunch(self, coord, owner, direction):
+        """
+            Повторный выстрел снарядом из пула. Объект заново проходит инициализацию GameObject,
+            но очереди событий и команд и закешированный логгер остаются прежними: первое обращение
+            к логгеру нового объекта вызывает logging.config.dictConfig - это самое дорогое в выстреле.
+        """
+        _reinit_game_object(self, coord=coord, direction=direction)
+        self.__launch(owner)
 
     @property
     def sprite_filename(self):
@@ -58,7 +101,7 @@ class Projectile(GameObject):
         return self.__ttl > 0
 
     def game_step(self):
-        if not theme.DRONES_CAN_FIGHT:
+        if not self._config.DRONES_CAN_FIGHT:
             return
 
         if self.has_hit:
@@ -67,6 +110,7 @@ class Projectile(GameObject):
 
         if self.is_alive:
             self.__ttl = max(self.__ttl - 1, 0)
+            self._sweep_from = self.coord.copy()
             # Обычный цикл полета пока живы
             super(Projectile, self).game_step()
         else:
@@ -88,41 +132,87 @@ class Projectile(GameObject):
         pass
 
     def on_born(self):
-        if not theme.DRONES_CAN_FIGHT:
+        if not self._config.DRONES_CAN_FIGHT:
             self.scene.remove_object(self)
             return
         vector = Vector.from_direction(self._owner.direction, module=PlasmaProjectile.max_distance)
         point = self._owner.coord.copy() + vector
         super(Projectile, self).move_at(point, speed=self.__speed)
 
-    def on_overlap_with(self, obj_status):
+    def can_hit(self, obj_status):
+        """
+            Правила попадания: по кому снаряд может нанести урон.
+        """
         if not hasattr(obj_status, "damage_taken"):
-            return
+            return False
         # Пролетаем некомандные объекты
         if obj_status.team is None:
-            return
-        if theme.TEAM_DRONES_FRIENDLY_FIRE:
+            return False
+        if self._config.TEAM_DRONES_FRIENDLY_FIRE:
             # Не наносим урон себе
             if obj_status.id == self._owner.id:
-                return
+                return False
         else:
             # Пролетаем свои объекты
             if obj_status.team == self._owner.team:
-                return
+                return False
         # За премя жизни ни в кого не попали
-        if not obj_status.is_alive or not self.is_alive:
-            return
+        return obj_status.is_alive and self.is_alive
+
+    def hit(self, obj_status):
         self.__ttl = 0
         self.stop()
         self.state.stop()
-        obj_status.damage_taken(theme.PROJECTILE_DAMAGE)
+        obj_status.damage_taken(self._config.PROJECTILE_DAMAGE)
         if self.death_animation is not None:
-            self.__attached = self.death_animation(
-                projectile=self, target=obj_status,
+            animation = dict(
+                target=obj_status,
                 distance=int(obj_status.distance_to(self) / 2),
                 direction=Vector.from_points(obj_status.coord, self.coord).direction,
                 ttl=self.__attached_ttl
             )
+            if self.__animation is None:
+                self.__animation = self.death_animation(projectile=self, **animation)
+            else:
+                self.__animation.reset(**animation)
+            self.__attached = self.__animation
+
+    def on_overlap_with(self, obj_status):
+        # Попадания считает сцена (ProjectilePass), здесь - для перекрытий, о которых сообщили напрямую
+        if self.can_hit(obj_status):
+            self.hit(obj_status)
+
+
+class ProjectilePool(object):
+    """
+        Снаряды, удаленные со сцены, для повторных выстрелов. Удаленный снаряд возвращается в игру
+        не раньше чем через тик: события тика удаления (перекрытия) могут еще ссылаться на него.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.__free = defaultdict(deque)
+        self.created = 0
+        self.reused = 0
+
+    def __len__(self):
+        return sum(len(free) for free in self.__free.values())
+
+    def acquire(self, cls, coord, owner, direction):
+        free = self.__free.get(cls)
+        if free and free[0][0] < self.scene._step - 1:
+            _, projectile = free.popleft()
+            projectile._relaunch(coord=coord, owner=owner, direction=direction)
+            self.reused += 1
+            return projectile
+        self.created += 1
+        return cls(coord=coord, owner=owner, direction=direction)
+
+    def release(self, projectile):
+        if projectile._in_pool:
+            return
+        projectile._in_pool = True
+        self.__free[projectile.__class__].append((self.scene._step, projectile))
 
 
 class Gun(object):
@@ -130,6 +220,7 @@ class Gun(object):
 
     def __init__(self, owner=None):
         self._owner = owner
+        self._config = owner.scene.config
         self._cooldown = 0
 
     @property
@@ -147,17 +238,18 @@ class Gun(object):
     def shot(self, target):
         if not self._owner.is_alive:
             return
-        if not theme.DRONES_CAN_FIGHT or not self.can_shot:
+        if not self._config.DRONES_CAN_FIGHT or not self.can_shot:
             return
-        self._cooldown = theme.PLASMAGUN_COOLDOWN_TIME
+        self._cooldown = self._config.PLASMAGUN_COOLDOWN_TIME
         coord = self.owner.coord.copy()
-        prtl = self.projectile(coord=coord.copy(), owner=self.owner, direction=self.owner.direction)
+        prtl = self._owner.scene.projectile_pool.acquire(
+            self.projectile, coord=coord.copy(), owner=self.owner, direction=self.owner.direction)
         prtl.set_team(self.owner.team)
 
     def game_step(self):
         # Восстановление после выстрела
         if self._cooldown > 0:
-            self._cooldown = max(self._cooldown - theme.PLASMAGUN_COOLDOWN_RATE, 0)
+            self._cooldown = max(self._cooldown - self._config.PLASMAGUN_COOLDOWN_RATE, 0)
 
     @property
     def cooldown(self):
@@ -176,6 +268,12 @@ class PlasmaProjectile(Projectile):
         """
         def __init__(self, projectile=None, target=None, distance=None, direction=None, ttl=0):
             self.__projectile = projectile
+            self.reset(target=target, distance=distance, direction=direction, ttl=ttl)
+
+        def reset(self, target, distance, direction, ttl):
+            """
+                Новое попадание того же снаряда - анимация переиспользуется вместе со снарядом из пула
+            """
             self.__target = target
             self.__distance = distance
             self.__direction = direction
@@ -230,10 +328,11 @@ class PlasmaProjectile(Projectile):
     death_animation = __DeathAnimation
 
     def __init__(self, **kwargs):
+        config = self.scene.config
         super(PlasmaProjectile, self).__init__(
-            speed=theme.PROJECTILE_SPEED,
-            ttl=theme.PROJECTILE_TTL,
-            attached_ttl=int(theme.PROJECTILE_TTL / 4), **kwargs
+            speed=config.PROJECTILE_SPEED,
+            ttl=config.PROJECTILE_TTL,
+            attached_ttl=int(config.PROJECTILE_TTL / 4), **kwargs
         )
 
     @property
@@ -250,7 +349,7 @@ class PlasmaProjectile(Projectile):
         else:
             # эффект появления, чтобы снаряд не возникал из ниоткуда
             showTime = 5
-            bornTime = theme.PROJECTILE_TTL - self.ttl
+            bornTime = self._config.PROJECTILE_TTL - self.ttl
             if bornTime < showTime:
                 return 1.0 * (bornTime / showTime)
             # Эффект растворения в космосе в конце дистанции 
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+
+class ObjectRegistry(object):
+    """
+        Упорядоченное (по порядку добавления) множество объектов сцены.
+        items - кешированный кортеж, пересобирается только после изменения состава,
+        поэтому его можно раздавать стратегиям каждый тик без копирования.
+    """
+
+    def __init__(self):
+        self.__objects = {}
+        self.__items = ()
+        self.__dirty = False
+
+    def add(self, obj):
+        if obj not in self.__objects:
+            self.__objects[obj] = None
+            self.__dirty = True
+
+    def discard(self, obj):
+        if obj in self.__objects:
+            del self.__objects[obj]
+            self.__dirty = True
+
+    @property
+    def items(self):
+        if self.__dirty:
+            self.__items = tuple(self.__objects)
+            self.__dirty = False
+        return self.__items
+
+    def __contains__(self, obj):
+        return obj in self.__objects
+
+    def __len__(self):
+        return len(self.__objects)
+
+    def __iter__(self):
+        # Обходим снимок - состав может меняться во время обхода
+        return iter(self.items)
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+    Запись игры в компактный двоичный лог и его чтение.
+
+    Каждый тик пишется кадр: объявления новых объектов, состояния изменившихся объектов
+    и события (появление, гибель, удаление). Каждые keyframe_interval тиков начинается
+    блок с ключевым кадром - полным состоянием сцены; блоки сжимаются zlib по отдельности,
+    поэтому перемотка распаковывает только один блок.
+
+        python -m astrobox.replay game.abr --step 500
+"""
+import argparse
+import bisect
+import json
+import struct
+import zlib
+from collections import namedtuple
+
+from .core import Asteroid, Drone, MotherShip
+from .guns import Projectile
+
+MAGIC = b'ABRP'
+TRAILER_MAGIC = b'ABRE'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBI')  # сигнатура, версия, длина метаданных
+_BLOCK = struct.Struct('<II')  # первый шаг блока, длина сжатых данных
+_FRAME = struct.Struct('<IBIII')  # шаг, ключевой ли кадр, число объявлений, состояний, событий
+_DECLARE = struct.Struct('<IBB')  # id, вид объекта, длина имени команды
+_STATE = struct.Struct('<Ifffff')  # id, x, y, направление, элериум, здоровье
+_EVENT = struct.Struct('<BI')  # событие, id
+_TRAILER = struct.Struct('<Q4s')  # смещение оглавления, сигнатура
+_TRAILER_BLOCK = 0xFFFFFFFF
+
+KIND_OTHER, KIND_ASTEROID, KIND_DRONE, KIND_MOTHERSHIP, KIND_PROJECTILE = range(5)
+KIND_NAMES = {
+    KIND_OTHER: 'other',
+    KIND_ASTEROID: 'asteroid',
+    KIND_DRONE: 'drone',
+    KIND_MOTHERSHIP: 'mothership',
+    KIND_PROJECTILE: 'projectile',
+}
+EVENT_SPAWNED, EVENT_DIED, EVENT_REMOVED = range(1, 4)
+EVENT_NAMES = {
+    EVENT_SPAWNED: 'spawned',
+    EVENT_DIED: 'died',
+    EVENT_REMOVED: 'removed',
+}
+
+ObjectState = namedtuple('ObjectState', 'id kind team x y direction payload health')
+Frame = namedtuple('Frame', 'step objects events')
+
+
+class ReplayException(Exception):
+    pass
+
+
+def object_kind(obj):
+    for cls, kind in ((Drone, KIND_DRONE), (Asteroid, KIND_ASTEROID),
+                      (MotherShip, KIND_MOTHERSHIP), (Projectile, KIND_PROJECTILE)):
+        if isinstance(obj, cls):
+            return kind
+    return KIND_OTHER
+
+
+def _object_state(obj):
+    return (
+        float(obj.coord.x),
+        float(obj.coord.y),
+        float(obj.direction),
+        float(getattr(obj, 'payload', 0) or 0),
+        float(getattr(obj, 'health', 0) or 0),
+    )
+
+
+class ReplayRecorder(object):
+    """
+        Пишет лог игры сцены. Сцена сама вызывает record_step после каждого тика
+        и close при окончании игры (с результатом игры).
+    """
+
+    def __init__(self, scene, path, keyframe_interval=100, compress_level=6):
+        self.scene = scene
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.compress_level = compress_level
+        self.__file = open(path, 'wb')
+        self.__known = {}
+        self.__block = bytearray()
+        self.__block_step = None
+        self.__index = []
+        self.__died = []
+        self.__closed = False
+        meta = json.dumps(dict(
+            seed=scene.seed,
+            field=[scene.config.FIELD_WIDTH, scene.config.FIELD_HEIGHT],
+            keyframe_interval=keyframe_interval,
+            config=scene.config.as_dict(),
+        ), default=repr).encode('utf-8')
+        self.__file.write(_HEADER.pack(MAGIC, VERSION, len(meta)))
+        self.__file.write(meta)
+        scene.replay_recorder = self
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def unit_died(self, obj):
+        self.__died.append(obj.id)
+
+    def record_step(self):
+        if self.__closed:
+            return
+        step = self.scene._step
+        is_keyframe = self.__block_step is None or step - self.__block_step >= self.keyframe_interval
+        if is_keyframe:
+            self._flush_block()
+            self.__block_step = step
+        known = self.__known
+        declares, states, events = [], [], []
+        seen = set()
+        for obj in self.scene.objects:
+            obj_id = obj.id
+            seen.add(obj_id)
+            state = _object_state(obj)
+            if obj_id not in known:
+                events.append(_EVENT.pack(EVENT_SPAWNED, obj_id))
+            if is_keyframe or obj_id not in known:
+                # В ключевом кадре объявляем все объекты - блок читается независимо от предыдущих
+                team = (getattr(obj, 'team', None) or '').encode('utf-8')[:255]
+                declares.append(_DECLARE.pack(obj_id, object_kind(obj), len(team)) + team)
+            if is_keyframe or known.get(obj_id) != state:
+                known[obj_id] = state
+                states.append(_STATE.pack(obj_id, *state))
+        for obj_id in [obj_id for obj_id in known if obj_id not in seen]:
+            del known[obj_id]
+            events.append(_EVENT.pack(EVENT_REMOVED, obj_id))
+        events.extend(_EVENT.pack(EVENT_DIED, obj_id) for obj_id in self.__died)
+        self.__died = []
+        block = self.__block
+        block += _FRAME.pack(step, is_keyframe, len(declares), len(states), len(events))
+        for part in (declares, states, events):
+            block += b''.join(part)
+
+    def _flush_block(self):
+        if self.__block_step is None or not self.__block:
+            return
+        data = zlib.compress(bytes(self.__block), self.compress_level)
+        self.__index.append((self.__block_step, self.__file.tell()))
+        self.__file.write(_BLOCK.pack(self.__block_step, len(data)))
+        self.__file.write(data)
+        # Если игру прервут, все записанные блоки останутся читаемыми
+        self.__file.flush()
+        self.__block = bytearray()
+
+    def close(self, result=None):
+        """
+            Дописать последний блок и оглавление. Без оглавления (игру прервали)
+            лог тоже читается, только перемотка идет последовательным просмотром блоков.
+        """
+        if self.__closed:
+            return
+        self._flush_block()
+        trailer = json.dumps(dict(index=self.__index, result=result), default=repr).encode('utf-8')
+        offset = self.__file.tell()
+        self.__file.write(_BLOCK.pack(_TRAILER_BLOCK, len(trailer)))
+        self.__file.write(trailer)
+        self.__file.write(_TRAILER.pack(offset, TRAILER_MAGIC))
+        self.__file.close()
+        self.__closed = True
+
+
+class Replay(object):
+    """
+        Чтение лога: последовательный просмотр кадров и перемотка к произвольному шагу.
+        Состояния объектов отдаются как ObjectState, координаты - с точностью float32.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as ff:
+            data = ff.read()
+        self.__data = data
+        if len(data) < _HEADER.size:
+            raise ReplayException('{} is not a replay file'.format(path))
+        magic, version, meta_size = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ReplayException('{} is not a replay file'.format(path))
+        if version != VERSION:
+            raise ReplayException('Unsupported replay version {}'.format(version))
+        offset = _HEADER.size + meta_size
+        self.meta = json.loads(data[_HEADER.size:offset].decode('utf-8'))
+        self.result = None
+        self.__blocks = self._read_trailer()
+        if self.__blocks is None:
+            self.__blocks = self._scan_blocks(offset)
+        self.__block_steps = [step for step, _ in self.__blocks]
+
+    def _read_trailer(self):
+        data = self.__data
+        if len(data) < _TRAILER.size:
+            return None
+        offset, magic = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+        if magic != TRAILER_MAGIC:
+            return None
+        _, size = _BLOCK.unpack_from(data, offset)
+        trailer = json.loads(data[offset + _BLOCK.size:offset + _BLOCK.size + size].decode('utf-8'))
+        self.result = trailer['result']
+        return [tuple(item) for item in trailer['index']]
+
+    def _scan_blocks(self, offset):
+        blocks = []
+        data = self.__data
+        while offset + _BLOCK.size <= len(data):
+            step, size = _BLOCK.unpack_from(data, offset)
+            if step == _TRAILER_BLOCK or offset + _BLOCK.size + size > len(data):
+                break
+            blocks.append((step, offset))
+            offset += _BLOCK.size + size
+        return blocks
+
+    @property
+    def seed(self):
+        return self.meta['seed']
+
+    @property
+    def first_step(self):
+        return self.__block_steps[0] if self.__block_steps else None
+
+    def _block_frames(self, block_number):
+        data = self.__data
+        _, offset = self.__blocks[block_number]
+        _, size = _BLOCK.unpack_from(data, offset)
+        start = offset + _BLOCK.size
+        block = zlib.decompress(data[start:start + size])
+        pos = 0
+        while pos < len(block):
+            step, is_keyframe, declares_count, states_count, events_count = _FRAME.unpack_from(block, pos)
+            pos += _FRAME.size
+            declares = []
+            for _ in range(declares_count):
+                obj_id, kind, team_size = _DECLARE.unpack_from(block, pos)
+                pos += _DECLARE.size
+                declares.append((obj_id, kind, block[pos:pos + team_size].decode('utf-8') or None))
+                pos += team_size
+            states = list(_STATE.iter_unpack(block[pos:pos + states_count * _STATE.size]))
+            pos += states_count * _STATE.size
+            events = list(_EVENT.iter_unpack(block[pos:pos + events_count * _EVENT.size]))
+            pos += events_count * _EVENT.size
+            yield step, is_keyframe, declares, states, events
+
+    def _replay(self, from_step=None):
+        # Восстанавливаем состояния, начиная с блока, в котором лежит from_step
+        first_block = 0
+        if from_step is not None:
+            first_block = max(bisect.bisect_right(self.__block_steps, from_step) - 1, 0)
+        objects = {}
+        for block_number in range(first_block, len(self.__blocks)):
+            for step, is_keyframe, declares, states, events in self._block_frames(block_number):
+                if is_keyframe:
+                    objects = {}
+                for obj_id, kind, team in declares:
+                    objects[obj_id] = ObjectState(obj_id, KIND_NAMES[kind], team, 0.0, 0.0, 0.0, 0.0, 0.0)
+                for obj_id, x, y, direction, payload, health in states:
+                    objects[obj_id] = objects[obj_id]._replace(
+                        x=x, y=y, direction=direction, payload=payload, health=health)
+                for event, obj_id in events:
+                    if event == EVENT_REMOVED:
+                        objects.pop(obj_id, None)
+                yield step, objects, events
+
+    @staticmethod
+    def _frame(step, objects, events):
+        return Frame(step, dict(objects), [(EVENT_NAMES[event], obj_id) for event, obj_id in events])
+
+    def frames(self, start=None, stop=None):
+        """
+            Кадры с шага start (включительно) до stop (не включая). objects каждого кадра -
+            отдельный словарь id -> ObjectState, events - список (имя события, id).
+        """
+        for step, objects, events in self._replay(from_step=start):
+            if stop is not None and step >= stop:
+                return
+            if start is None or step >= start:
+                yield self._frame(step, objects, events)
+
+    def state_at(self, step):
+        """
+            Кадр шага step, а если его нет в логе - ближайшего записанного до него. None, если таких нет.
+        """
+        found = None
+        for frame_step, objects, events in self._replay(from_step=step):
+            if frame_step > step:
+                break
+            # objects дальше меняется на месте - копируем
+            found = self._frame(frame_step, objects, events)
+        return found
+
+    def __iter__(self):
+        return self.frames()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Astrobox replay viewer')
+    parser.add_argument('path', help='replay file')
+    parser.add_argument('--step', type=int, help='print objects state at the game step')
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.path)
+    print('seed: {}'.format(replay.seed))
+    steps = events = 0
+    for frame in replay:
+        steps += 1
+        events += len(frame.events)
+    print('frames: {}, events: {}'.format(steps, events))
+    if replay.result is not None:
+        print('result: {}'.format(json.dumps(replay.result, sort_keys=True)))
+    if args.step is not None:
+        frame = replay.state_at(args.step)
+        if frame is None:
+            print('no frames before step {}'.format(args.step))
+            return
+        print('step {}:'.format(frame.step))
+        for state in sorted(frame.objects.values()):
+            print('  {0.id:>5} {0.kind:<10} {1:<20} ({0.x:.1f}, {0.y:.1f}) dir={0.direction:.0f} '
+                  'payload={0.payload:.0f} health={0.health:.0f}'.format(state, state.team or '-'))
+
+
+if __name__ == '__main__':
+    main()
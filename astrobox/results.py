@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+    Хранилище результатов игр в SQLite: таблица лидеров, личные встречи и итоги по стратегиям.
+
+        with ResultStore('results.db') as store:
+            for result in results:
+                store.add(result)
+        ResultStore('results.db').leaderboard()
+
+    Результаты копятся в памяти и пишутся пачкой в одной транзакции - сотни процессов, пишущих
+    в одну базу, не дерутся за блокировку на каждой игре. База в режиме WAL: чтение не мешает записи.
+
+        python -m astrobox.results results.db leaderboard
+"""
+import argparse
+import json
+import sqlite3
+import sys
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    uuid TEXT NOT NULL UNIQUE,
+    happened_at TEXT,
+    seed INTEGER,
+    game_steps INTEGER,
+    theme_overrides TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS match_teams (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    team TEXT NOT NULL,
+    team_class TEXT NOT NULL,
+    collected INTEGER NOT NULL,
+    dead INTEGER,
+    place INTEGER NOT NULL,
+    UNIQUE (match_id, team)
+);
+CREATE INDEX IF NOT EXISTS match_teams_class ON match_teams (team_class, match_id);
+CREATE INDEX IF NOT EXISTS matches_seed ON matches (seed);
+CREATE INDEX IF NOT EXISTS matches_theme ON matches (theme_overrides);
+'''
+
+
+def _overrides_key(overrides):
+    return json.dumps(overrides or {}, sort_keys=True)
+
+
+def match_rows(result):
+    """
+        Строки таблиц matches и match_teams для результата игры (SpaceField._make_game_result,
+        дополненного в astrobox.tournament.run_match). Место команды - по собранному элериуму, равным - одно.
+    """
+    collected = result['collected']
+    teams = result.get('teams') or {}
+    dead = result.get('dead') or {}
+    match = (result['uuid'], result.get('happened_at'), result.get('seed'), result.get('game_steps'),
+             _overrides_key(result.get('theme_overrides')), json.dumps(result, sort_keys=True))
+    team_rows = []
+    for team, elerium in collected.items():
+        place = 1 + sum(1 for other in collected.values() if other > elerium)
+        team_rows.append((team, teams.get(team, team), elerium, dead.get(team), place, result['uuid']))
+    return match, team_rows
+
+
+class ResultStore(object):
+    """
+        batch_size - сколько результатов копить до записи, timeout - сколько ждать чужую транзакцию, секунд.
+    """
+
+    def __init__(self, path, batch_size=100, timeout=60.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.__connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.__connection.row_factory = sqlite3.Row
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.executescript(SCHEMA)
+        self.__pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.__connection.execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+
+    def add(self, result):
+        self.__pending.append(result)
+        if len(self.__pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+            Записать накопленные результаты одной транзакцией. Уже записанные (по uuid) пропускаются.
+        """
+        if not self.__pending:
+            return
+        matches, teams = [], []
+        for result in self.__pending:
+            match, team_rows = match_rows(result)
+            matches.append(match)
+            teams.extend(team_rows)
+        connection = self.__connection
+        # IMMEDIATE - блокировку на запись берем сразу, а не посреди транзакции
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR IGNORE INTO matches (uuid, happened_at, seed, game_steps, theme_overrides, result) '
+                'VALUES (?, ?, ?, ?, ?, ?)', matches)
+            connection.executemany(
+                'INSERT OR IGNORE INTO match_teams (match_id, team, team_class, collected, dead, place) '
+                'SELECT id, ?, ?, ?, ?, ? FROM matches WHERE uuid = ?', teams)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self.__pending = []
+
+    def close(self):
+        if self.__connection is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.__connection.close()
+            self.__connection = None
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self.__connection.execute(sql, params)]
+
+    @staticmethod
+    def _theme_filter(theme_overrides, params):
+        if theme_overrides is None:
+            return ''
+        params.append(_overrides_key(theme_overrides))
+        return ' AND m.theme_overrides = ?'
+
+    def leaderboard(self, theme_overrides=None, limit=None):
+        """
+            Классы команд по числу побед (первых мест), затем по среднему сбору.
+            theme_overrides - только игры с такими переопределениями темы.
+        """
+        params = []
+        sql = (
+            'SELECT t.team_class, COUNT(*) AS matches, SUM(t.place = 1) AS wins, '
+            'SUM(t.collected) AS collected, AVG(t.collected) AS avg_collected, AVG(t.place) AS avg_place '
+            'FROM match_teams t JOIN matches m ON m.id = t.match_id WHERE 1'
+            + self._theme_filter(theme_overrides, params) +
+            ' GROUP BY t.team_class ORDER BY wins DESC, avg_collected DESC, t.team_class'
+        )
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return self._query(sql, params)
+
+    def head_to_head(self, team_class=None, theme_overrides=None):
+        """
+            Личные встречи пар классов в общих играх: кто собрал больше.
+        """
+        params = []
+        sql = (
+            'SELECT a.team_class, b.team_class AS opponent, COUNT(*) AS matches, '
+            'SUM(a.collected > b.collected) AS wins, SUM(a.collected < b.collected) AS losses, '
+            'SUM(a.collected = b.collected) AS draws '
+            'FROM match_teams a JOIN match_teams b ON b.match_id = a.match_id AND b.team_class != a.team_class '
+            'JOIN matches m ON m.id = a.match_id WHERE 1'
+        )
+        if team_class is not None:
+            sql += ' AND a.team_class = ?'
+            params.append(team_class)
+        sql += self._theme_filter(theme_overrides, params) + ' GROUP BY a.team_class, b.team_class ORDER BY 1, 2'
+        return self._query(sql, params)
+
+    def strategy_stats(self, team_class=None, theme_overrides=None):
+        """
+            Итоги по классам команд: сбор, потери и длина игр.
+        """
+        params = []
+        sql = (
+            'SELECT t.team_class, COUNT(*) AS matches, AVG(t.collected) AS avg_collected, '
+            'MIN(t.collected) AS min_collected, MAX(t.collected) AS max_collected, AVG(t.dead) AS avg_dead, '
+            'AVG(m.game_steps) AS avg_game_steps, AVG(t.place) AS avg_place '
+            'FROM match_teams t JOIN matches m ON m.id = t.match_id WHERE 1'
+        )
+        if team_class is not None:
+            sql += ' AND t.team_class = ?'
+            params.append(team_class)
+        sql += self._theme_filter(theme_overrides, params) + ' GROUP BY t.team_class ORDER BY t.team_class'
+        return self._query(sql, params)
+
+
+QUERIES = {
+    'leaderboard': ResultStore.leaderboard,
+    'head-to-head': ResultStore.head_to_head,
+    'strategies': ResultStore.strategy_stats,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m astrobox.results', description='Stored match results')
+    parser.add_argument('db', help='SQLite database written by astrobox.tournament --db')
+    parser.add_argument('query', choices=sorted(QUERIES))
+    parser.add_argument('--set', dest='overrides', action='append', default=None, metavar='NAME=VALUE',
+                        help='only matches with exactly these theme overrides')
+    args = parser.parse_args(argv)
+    theme_overrides = None
+    if args.overrides is not None:
+        from .tournament import _parse_override
+
+        theme_overrides = dict(_parse_override(value) for value in args.overrides)
+    with ResultStore(args.db) as store:
+        for row in QUERIES[args.query](store, theme_overrides=theme_overrides):
+            sys.stdout.write(json.dumps(row) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
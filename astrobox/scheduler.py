@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+    Отложенные вызовы по тикам сцены: пробуждения дронов и любые другие "через N тиков".
+    Очередь с приоритетом по тику срабатывания - объект, которому нечего ждать, ничего и не стоит.
+
+        timer = scene.scheduler.call_later(30, drone.move_at, asteroid)
+        timer.cancel()
+"""
+import heapq
+
+
+class Timer(object):
+
+    def __init__(self, step, callback, args):
+        self.step = step
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        # Из очереди не удаляем - отмененный таймер просто пропускается при срабатывании
+        self.cancelled = True
+        self.callback = self.args = None
+
+
+class TickScheduler(object):
+    """
+        Вызовы срабатывают пачкой в начале тика сцены (SpaceField._objects_step), до шагов объектов,
+        в порядке (тик, порядок постановки). Вызов, поставленный на прошедший тик, срабатывает в ближайшем.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.__queue = []
+        self.__added = 0
+
+    def __len__(self):
+        return sum(1 for _, _, timer in self.__queue if not timer.cancelled)
+
+    @property
+    def next_step(self):
+        """
+            Тик ближайшего вызова или None
+        """
+        queue = self.__queue
+        while queue and queue[0][2].cancelled:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else None
+
+    def call_at(self, step, callback, *args):
+        timer = Timer(step, callback, args)
+        self.__added += 1
+        heapq.heappush(self.__queue, (step, self.__added, timer))
+        return timer
+
+    def call_later(self, ticks, callback, *args):
+        return self.call_at(self.scene._step + ticks, callback, *args)
+
+    def run_due(self, step):
+        """
+            Выполнить вызовы с тиком не позже step. Вызовы, поставленные при этом на step, тоже выполняются.
+            Возвращает число выполненных вызовов.
+        """
+        queue = self.__queue
+        done = 0
+        while queue and queue[0][0] <= step:
+            _, _, timer = heapq.heappop(queue)
+            if timer.cancelled:
+                continue
+            callback, args = timer.callback, timer.args
+            timer.cancel()
+            callback(*args)
+            done += 1
+        return done
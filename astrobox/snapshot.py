@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+    Снимки состояния сцены и копирование объектов для форков.
+"""
+import copy
+from queue import Queue
+
+# Связь с интерфейсом, запись повтора, выгрузка состояния и процессы логики команд
+# принадлежат исходной сцене - в снимки и форки не попадают
+SCENE_EXCLUDED_ATTRS = ('ui', 'parent_conn', 'replay_recorder', 'state_exporter', 'team_logic_runner')
+
+
+def copy_state(state, memo):
+    """
+        deepcopy словаря атрибутов. Очереди событий и команд движка содержат блокировки,
+        их копируем поэлементно.
+    """
+    copied = {}
+    for name, value in state.items():
+        if isinstance(value, Queue):
+            queue = Queue()
+            for item in list(value.queue):
+                queue.put_nowait(copy.deepcopy(item, memo))
+            copied[name] = queue
+        else:
+            copied[name] = copy.deepcopy(value, memo)
+    return copied
+
+
+def scene_state(scene):
+    return dict((name, value) for name, value in scene.__dict__.items() if name not in SCENE_EXCLUDED_ATTRS)
+
+
+def _live_memo(scene, objects):
+    # Ссылки на сцену и ее объекты не копируем - снимок хранит только их собственное состояние
+    memo = {id(scene): scene}
+    for obj in objects:
+        memo[id(obj)] = obj
+    return memo
+
+
+class SceneSnapshot(object):
+    """
+        Состояние сцены и всех ее объектов на шаге step. Восстанавливается в ту же сцену
+        (SpaceField.restore) сколько угодно раз: объекты остаются теми же, меняется только их состояние,
+        созданные после снимка объекты пропадают, удаленные - возвращаются.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.step = scene._step
+        objects = list(scene.objects)
+        known = set(id(obj) for obj in objects)
+        for team_objects in scene.teams.values():
+            for obj in team_objects:
+                if id(obj) not in known:
+                    known.add(id(obj))
+                    objects.append(obj)
+        memo = _live_memo(scene, objects)
+        self.__objects = [(obj, copy_state(obj.__dict__, memo)) for obj in objects]
+        self.__scene_state = copy_state(scene_state(scene), memo)
+
+    def __len__(self):
+        return len(self.__objects)
+
+    def restore(self):
+        memo = _live_memo(self.scene, [obj for obj, _ in self.__objects])
+        for obj, state in self.__objects:
+            obj.__dict__.clear()
+            obj.__dict__.update(copy_state(state, memo))
+        scene = self.scene
+        objects = scene.objects
+        scene.__dict__.update(copy_state(self.__scene_state, memo))
+        # Список объектов привязан к движку на уровне класса GameObject (туда попадают объекты,
+        # созданные между тиками) - восстанавливаем его содержимое на месте
+        objects[:] = scene.objects
+        scene.objects = objects
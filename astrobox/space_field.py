@@ -1,14 +1,30 @@
 # -*- coding: utf-8 -*-
+import copy
 import datetime
 import math
 import random
 import uuid
-from collections import Counter, defaultdict
-
-from robogame_engine import Scene
-from robogame_engine.geometry import Point, Vector
-
-from .core import MotherShip, Asteroid, Drone
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from robogame_engine import GameObject, Scene
+from robogame_engine.events import EventOverlap
+from robogame_engine.geometry import Point
+
+from .assignment import TargetAssignment
+from .bulk import MothershipPass, ProjectilePass, TriggerPass
+from .config import SceneConfig
+from .cpu_budget import CpuAccounting
+from .guns import Projectile, ProjectilePool
+from .core import MotherShip, Asteroid, Drone, EventProximity, Unit
+from .registry import ObjectRegistry
+from .replay import ReplayRecorder
+from .scheduler import TickScheduler
+from .snapshot import SCENE_EXCLUDED_ATTRS, SceneSnapshot, copy_state, scene_state
+from .spatial import SpatialGrid
+from .state_export import StateExporter
+from .stocks import EleriumStocks
+from .team_logic import TeamLogicRunner
 from .theme import theme
 
 
@@ -36,6 +52,57 @@ class Rect(object):
         return "[{}] {}x{} ({}, {})".format(id(self), self.w, self.h, self.x, self.y)
 
 
+class FreeCells(object):
+    """
+        Номера свободных ячеек поля 0..count-1 по порядку, с выборкой и удалением k-й свободной
+        за O(log count) (дерево Фенвика) - вместо list.remove, который на больших картах дает O(n^2).
+        choice(rnd) берет из генератора ровно то же, что rnd.choice(list), - карты по seed не меняются.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        tree = [0] * (count + 1)
+        for i in range(1, count + 1):
+            tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= count:
+                tree[parent] += tree[i]
+        self.__tree = tree
+        self.__free = count
+        self.__top_bit = 1 << (count.bit_length() - 1) if count else 0
+
+    def __len__(self):
+        return self.__free
+
+    def pop(self, index):
+        """
+            Удалить и вернуть index-й по порядку свободный номер
+        """
+        if not 0 <= index < self.__free:
+            raise IndexError('free cell index out of range')
+        tree = self.__tree
+        position = 0
+        bit = self.__top_bit
+        while bit:
+            following = position + bit
+            if following <= self.count and tree[following] <= index:
+                position = following
+                index -= tree[following]
+            bit >>= 1
+        number = position
+        position += 1
+        while position <= self.count:
+            tree[position] -= 1
+            position += position & -position
+        self.__free -= 1
+        return number
+
+    def choice(self, rnd):
+        if not self.__free:
+            raise IndexError('Cannot choose from an empty sequence')
+        return self.pop(rnd.randrange(self.__free))
+
+
 class SpaceField(Scene):
     check_collisions = False
     detect_overlaps = True
@@ -43,17 +110,67 @@ class SpaceField(Scene):
 
     def __init__(self, *args, **kwargs):
         self.__motherships = {}
-        self.__asteroids = []
-        self.__drones = []
+        self.__units = ObjectRegistry()
+        # Объекты, которые больше не могут сами изменить свое состояние - их не шагаем
+        self.__dormant = set()
+        self.__overlap_map = {}
+        # Реестры объектов ведутся по мере добавления/удаления/гибели, а не пересобираются на каждый запрос
+        self.__registries = OrderedDict((cls, ObjectRegistry()) for cls in (Drone, Asteroid, MotherShip))
+        self.__alive_drones = defaultdict(ObjectRegistry)
+        self.__enemy_drones = {}
+        self.__asteroids_with_payload = ObjectRegistry()
+        # Итоги команд для проверки конца игры: элериум и здоровье живых дронов.
+        # Как и в списках команд движка, дрон учитывается в команде, с которой был создан
+        self.__drone_teams = {}
+        self.__team_drones_payload = defaultdict(int)
+        self.__team_drones_health = defaultdict(float)
+        # Команды в движке хранятся на уровне класса Scene - заводим свои для каждой сцены,
+        # иначе следующая игра в том же процессе унаследует команды предыдущей
+        self._Scene__teams = OrderedDict()
         if 'theme_mod_path' not in kwargs:
             kwargs['theme_mod_path'] = 'astrobox.themes.default'
+        config = kwargs.pop('config', None)
+        theme_overrides = dict(kwargs.pop('theme_overrides', None) or {})
         if 'can_fight' in kwargs:
-            theme.DRONES_CAN_FIGHT = kwargs.pop('can_fight')
-        self.max_drones_at_team = theme.MAX_DRONES_AT_TEAM
+            theme_overrides['DRONES_CAN_FIGHT'] = kwargs.pop('can_fight')
+        seed = kwargs.pop('seed', None)
+        replay_path = kwargs.pop('replay_path', None)
+        state_export_path = kwargs.pop('state_export_path', None)
+        self.team_processes = kwargs.pop('team_processes', 0)
         self._prev_endgame_state = {}
         self._game_over_tics = 0
         self._game_statistics_printed = False
         super(SpaceField, self).__init__(*args, **kwargs)
+        if self.field:
+            theme_overrides['FIELD_WIDTH'], theme_overrides['FIELD_HEIGHT'] = self.field
+        # Константы фиксируем на момент создания сцены, глобальную тему больше не трогаем
+        if config is None:
+            self.config = SceneConfig.from_module(theme.module, **theme_overrides)
+        else:
+            self.config = config.replace(**theme_overrides)
+        self.max_drones_at_team = self.config.MAX_DRONES_AT_TEAM
+        self.spatial_index = SpatialGrid(cell_size=self.config.SPATIAL_INDEX_CELL_SIZE)
+        self.__mothership_pass = MothershipPass(scene=self)
+        self.projectile_pool = ProjectilePool(scene=self)
+        self.__projectile_pass = ProjectilePass(scene=self)
+        self.scheduler = TickScheduler(scene=self)
+        self.__trigger_pass = TriggerPass(scene=self)
+        self.__triggers = {}
+        self.elerium_stocks = EleriumStocks(scene=self)
+        self.target_assignment = TargetAssignment(scene=self)
+        self.cpu_accounting = CpuAccounting(budget=self.config.DRONE_CPU_BUDGET,
+                                            overrun=self.config.DRONE_CPU_OVERRUN)
+        # Вся случайность игры - из генератора сцены: одинаковый seed дает одинаковую игру.
+        # Без seed берем его из глобального random, чтобы random.seed() в скриптах продолжал работать
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.random = random.Random(self.seed)
+        self.replay_recorder = None
+        if replay_path is not None:
+            self.replay_recorder = ReplayRecorder(scene=self, path=replay_path)
+        self.state_exporter = None
+        if state_export_path is not None:
+            self.state_exporter = StateExporter(scene=self, path=state_export_path)
+        self.team_logic_runner = None
 
     def prepare(self, asteroids_count=5, max_drones_at_team=None):
         if max_drones_at_team is not None:
@@ -68,23 +185,26 @@ class SpaceField(Scene):
         self._fill_space(
             asteroids_count=asteroids_count
         )
+        logics = dict((team, drones[0].team_logic) for team, drones in self.teams.items() if drones[0].team_logic)
+        if logics and self.team_logic_runner is None:
+            self.team_logic_runner = TeamLogicRunner(scene=self, logics=logics, processes=self.team_processes)
         # нужно тиков что бы дрону пролететь экран по диагонали
-        _screen_diagonal = (theme.FIELD_WIDTH ** 2 + theme.FIELD_HEIGHT ** 2) ** .5
-        self._game_over_tics = int(_screen_diagonal / theme.DRONE_SPEED)
+        _screen_diagonal = (self.config.FIELD_WIDTH ** 2 + self.config.FIELD_HEIGHT ** 2) ** .5
+        self._game_over_tics = int(_screen_diagonal / self.config.DRONE_SPEED)
 
     def _get_team_pos(self, team_number):
         radius = MotherShip.radius
         if team_number == 0:
             return Point(radius, radius)
         elif team_number == 1:
-            return Point(theme.FIELD_WIDTH - radius, radius)
+            return Point(self.config.FIELD_WIDTH - radius, radius)
         elif team_number == 2:
-            return Point(radius, theme.FIELD_HEIGHT - radius)
+            return Point(radius, self.config.FIELD_HEIGHT - radius)
         else:
-            return Point(theme.FIELD_WIDTH - radius, theme.FIELD_HEIGHT - radius)
+            return Point(self.config.FIELD_WIDTH - radius, self.config.FIELD_HEIGHT - radius)
 
     def _fill_space(self, asteroids_count, field_reduce_rate=1.5):
-        field = Rect(w=theme.FIELD_WIDTH, h=theme.FIELD_HEIGHT)
+        field = Rect(w=self.config.FIELD_WIDTH, h=self.config.FIELD_HEIGHT)
         field.reduce(dw=MotherShip.radius * field_reduce_rate, dh=MotherShip.radius * field_reduce_rate)
         if self.teams_count >= 2:
             field.reduce(dw=MotherShip.radius * field_reduce_rate)
@@ -105,7 +225,7 @@ class SpaceField(Scene):
 
         self.info("Adjusted cell {}".format(cell))
 
-        cell_numbers = [i for i in range(cells_count)]
+        cell_numbers = FreeCells(cells_count)
 
         jit_box = Rect(w=int(cell.w * self._CELL_JITTER), h=int(cell.h * self._CELL_JITTER))
         jit_box.shift(dx=(cell.w - jit_box.w) // 2, dy=(cell.h - jit_box.h) // 2)
@@ -122,7 +242,7 @@ class SpaceField(Scene):
         # Генерируем количество элериума для астероидов
         asteroid_payloads = []
         for p in range(asteroids_count):
-            payload = random.randint(theme.MIN_ASTEROID_ELERIUM, theme.MAX_ASTEROID_ELERIUM)
+            payload = self.random.randint(self.config.MIN_ASTEROID_ELERIUM, self.config.MAX_ASTEROID_ELERIUM)
             asteroid_payloads.append(payload)
         # Отсортируем по убыванию
         asteroid_payloads.sort(key=lambda p: -p)
@@ -130,12 +250,11 @@ class SpaceField(Scene):
         # Генерируем позиции астероидов
         asteroid_coords = []
         for i in range(asteroids_count):
-            cell_number = random.choice(cell_numbers)
-            cell_numbers.remove(cell_number)
+            cell_number = cell_numbers.choice(self.random)
             cell.x = (cell_number % cells_in_width) * cell.w
             cell.y = (cell_number // cells_in_width) * cell.h
-            dx = random.randint(0, jit_box.w)
-            dy = random.randint(0, jit_box.h)
+            dx = self.random.randint(0, jit_box.w)
+            dy = self.random.randint(0, jit_box.h)
             pos = Point(field.x + cell.x + dx, field.y + cell.y + dy)
             asteroid_coords.append(pos)
         center_of_scene = Point(field.w / 2, field.h / 2)
@@ -143,15 +262,15 @@ class SpaceField(Scene):
         # примерно равные условия для всех игроков, распределяя более объемные ресурсы
         # ближе к центру, что дает больше возможностей к выбору стратегий. Дает некий игровой баланс.
         # (например, постараться отхватить жирный кусок или подстрелить жаждущих наживы)
-        asteroid_coords.sort(key=lambda c: c.distance_to(center_of_scene))
+        cx, cy = center_of_scene.x, center_of_scene.y
+        asteroid_coords.sort(key=lambda c: math.sqrt((c.x - cx) ** 2 + (c.y - cy) ** 2))
 
         for i, pos in enumerate(asteroid_coords):
             asteroid_payload = asteroid_payloads[i]
-            asteroid = Asteroid(coord=pos, elerium=asteroid_payload)
-            self.__asteroids.append(asteroid)
+            Asteroid(coord=pos, elerium=asteroid_payload)
 
         max_elerium = round(sum(asteroid_payloads), -2) + 100
-        if not theme.DRONES_CAN_FIGHT:
+        if not self.config.DRONES_CAN_FIGHT:
             max_elerium = round(max_elerium * 1.5 / self.teams_count, -2)
         if max_elerium < 1000:
             max_elerium = 1000
@@ -165,46 +284,333 @@ class SpaceField(Scene):
         for drone in self.drones:
             # Перемещаем дронов к их месту спуна
             drone.coord = drone.mothership.coord.copy()
+            self.spatial_index.update(drone)
 
     def game_step(self):
-        super().game_step()
-        for base in self.motherships:
-            if not base.is_alive:
+        with self.active():
+            self._objects_step()
+
+    @contextmanager
+    def active(self):
+        """
+            Объекты, созданные вне сцены (снаряды), движок добавляет в сцену, привязанную на уровне класса
+            GameObject. На время тика это мы - иначе выстрелы в форке попадут в исходную сцену.
+            Для действий с форком между тиками: with fork.active(): drone.gun.shot(target)
+        """
+        previous_link = GameObject._GameObject__scene, GameObject._GameObject__container
+        GameObject.link_to_scene(scene=self, container=self.objects)
+        try:
+            yield self
+        finally:
+            GameObject.link_to_scene(*previous_link)
+
+    def _objects_step(self):
+        dormant = self.__dormant
+        # Отложенные вызовы этого тика (пробуждения дронов) - до шагов объектов
+        self.scheduler.run_due(self._step)
+        # Координаты могли поменять напрямую, минуя game_step объектов
+        for obj in self.__units:
+            if obj not in dormant:
+                self.spatial_index.update(obj)
+        self.__mothership_pass.update_healing(self.alive_drones_by_team)
+        if self.team_logic_runner is not None:
+            # Приказы логик команд выполняются в этом же тике
+            self.team_logic_runner.step()
+        # Цикл движка, но без спящих объектов
+        self.__overlap_map = self._get_overlap_map() if self.detect_overlaps else {}
+        for obj in self.objects:
+            if obj in dormant:
+                if self.detect_overlaps:
+                    self._detect_dormant_overlaps(obj)
+                continue
+            if isinstance(obj, Drone):
+                self.cpu_accounting.step_drone(obj)
+            else:
+                obj.proceed_events()
+                obj.proceed_commands()
+                obj.game_step()
+            if obj in self.__units and obj._can_go_dormant():
+                # Уснувший объект в перекрытиях пассивен - о них узнают активные партнеры
+                dormant.add(obj)
+                obj._on_dormant()
+                if self.detect_overlaps:
+                    self._detect_dormant_overlaps(obj)
                 continue
-            for drone in self.drones:
-                if drone.team == base.team:
+            if self.detect_overlaps:
+                self._detect_overlaps(obj)
+        hits = self.__projectile_pass.detect_hits([obj for obj in self.objects if isinstance(obj, Projectile)])
+        if self.detect_overlaps:
+            # Цель, как и раньше, узнает о снаряде из on_overlap_with
+            for projectile, target in hits:
+                target.add_event(EventOverlap(projectile))
+        self.__mothership_pass.reset_healing()
+        self.__mothership_pass.push_back(self.__registries[MotherShip].items)
+        if self.__triggers:
+            # Координаты за тик окончательные - проверяем триггеры сближения
+            for trigger in self.__trigger_pass.evaluate(list(self.__triggers.values())):
+                if trigger.once:
+                    self.remove_trigger(trigger)
+                if trigger.callback is not None:
+                    trigger.unit.add_event(EventProximity(trigger))
+        if self.replay_recorder is not None:
+            self.replay_recorder.record_step()
+        if self.state_exporter is not None:
+            self.state_exporter.export_step()
+
+    def advance(self, ticks=1):
+        """
+            Прогнать сцену на ticks тиков вперед без интерфейса и проверки конца игры - для форков.
+        """
+        for _ in range(ticks):
+            self._step += 1
+            self.game_step()
+
+    def snapshot(self):
+        """
+            Снимок состояния сцены и всех объектов, см. restore
+        """
+        return SceneSnapshot(self)
+
+    def restore(self, snapshot):
+        if snapshot.scene is not self:
+            raise ValueError('Snapshot was taken from another scene')
+        snapshot.restore()
+
+    def fork(self):
+        """
+            Независимая безголовая копия сцены со всеми объектами - для прогонов "а что, если".
+            Генератор случайных чисел тоже копируется, так что форк без вмешательства повторяет исходную игру.
+        """
+        return copy.deepcopy(self)
+
+    def __deepcopy__(self, memo):
+        fork = self.__class__.__new__(self.__class__)
+        memo[id(self)] = fork
+        fork.__dict__.update(copy_state(scene_state(self), memo))
+        for name in SCENE_EXCLUDED_ATTRS:
+            setattr(fork, name, None)
+        fork.headless = True
+        return fork
+
+    def _get_overlap_map(self):
+        # Та же проверка, что и в движке. Спящие объекты участвуют пассивно: их не шагают,
+        # но с активными объектами они по-прежнему перекрываются - пары из двух спящих пропускаем.
+        # Попадания снарядов считает отдельный проход по отрезкам полета (ProjectilePass)
+        overlap_map = defaultdict(list)
+        dormant = self.__dormant
+        objects = [obj for obj in self.objects if not isinstance(obj, Projectile)]
+        for i, left in enumerate(objects):
+            left_dormant = left in dormant
+            for right in objects[i + 1:]:
+                if left_dormant and right in dormant:
                     continue
-                dist = base.radius - base.distance_to(drone)
-                if dist < 0:
+                try:
+                    if right.owner == left or left.owner == right:
+                        continue
+                except AttributeError:
+                    pass
+                summ_radius = left.radius + right.radius
+                if abs(left.x - right.x) > summ_radius and abs(left.y - right.y) > summ_radius:
                     continue
-                step_back_vector = Vector.from_points(base.coord, drone.coord, module=dist + 3)
-                drone.coord += step_back_vector
+                distance = left.distance_to(right)
+                overlap_distance = int(summ_radius - distance)
+                if overlap_distance > 1:
+                    overlap_map[left].append((overlap_distance, right))
+                    overlap_map[right].append((overlap_distance, left))
+        return overlap_map
+
+    def _detect_overlaps(self, left):
+        dormant = self.__dormant
+        for _, right in self.__overlap_map.get(left, ()):
+            left.add_event(EventOverlap(right))
+            # Спящий партнер пассивен - событие его бы разбудило, а сделать с ним он ничего не может
+            if right not in dormant:
+                right.add_event(EventOverlap(left))
+
+    def _detect_dormant_overlaps(self, obj):
+        # Свою половину событий движок шлет из цикла каждого объекта пары - активные партнеры
+        # спящего получают ее в его очередь цикла, как если бы он шагал
+        dormant = self.__dormant
+        for _, right in self.__overlap_map.get(obj, ()):
+            if right not in dormant:
+                right.add_event(EventOverlap(obj))
+
+    def is_dormant(self, obj):
+        return obj in self.__dormant
+
+    @property
+    def dormant_objects(self):
+        return [obj for obj in self.objects if obj in self.__dormant]
+
+    def activate_object(self, obj):
+        """
+            Возвращает спящий объект в число шагаемых - его что-то затронуло.
+        """
+        if obj in self.__dormant:
+            self.__dormant.discard(obj)
+            obj._on_activated()
+
+    def add_trigger(self, trigger, key=None):
+        """
+            Зарегистрировать триггер сближения, обычно через Unit.when_near / Unit.when_far.
+        """
+        trigger.key = (trigger.unit, trigger if key is None else key)
+        previous = self.__triggers.get(trigger.key)
+        if previous is not None:
+            previous.cancelled = True
+        self.__triggers[trigger.key] = trigger
+        return trigger
+
+    def remove_trigger(self, trigger):
+        if self.__triggers.get(trigger.key) is trigger:
+            del self.__triggers[trigger.key]
+
+    @property
+    def triggers(self):
+        return list(self.__triggers.values())
+
+    def __drop_triggers(self, obj):
+        for key in [key for key in self.__triggers if key[0] is obj]:
+            self.__triggers.pop(key).cancelled = True
+
+    def remove_object(self, obj):
+        super(SpaceField, self).remove_object(obj)
+        if isinstance(obj, Unit):
+            self._unregister_unit(obj)
+        elif isinstance(obj, Projectile):
+            self.projectile_pool.release(obj)
+
+    def _register_unit(self, obj):
+        self.__units.add(obj)
+        self.spatial_index.insert(obj)
+        for cls, registry in self.__registries.items():
+            if isinstance(obj, cls):
+                registry.add(obj)
+        if isinstance(obj, Drone) and obj.is_alive:
+            self.__add_alive_drone(obj)
+        if isinstance(obj, Drone) and obj.auto_team:
+            self.__drone_teams[obj] = obj.team
+            if obj.is_alive:
+                self.__team_drones_payload[obj.team] += obj.payload
+                self.__team_drones_health[obj.team] += obj.health
+        if isinstance(obj, Asteroid) and obj.payload > 0:
+            self.__asteroids_with_payload.add(obj)
+        self.elerium_stocks.update(obj)
+
+    def _unregister_unit(self, obj):
+        self.__drop_triggers(obj)
+        self.__units.discard(obj)
+        self.__dormant.discard(obj)
+        self.spatial_index.remove(obj)
+        for registry in self.__registries.values():
+            registry.discard(obj)
+        if isinstance(obj, Drone):
+            self.__discard_alive_drone(obj, obj.team)
+        self.__asteroids_with_payload.discard(obj)
+        self.elerium_stocks.remove(obj)
+
+    def _unit_died(self, obj):
+        self.__drop_triggers(obj)
+        if isinstance(obj, Drone):
+            self.__discard_alive_drone(obj, obj.team)
+            team = self.__drone_teams.get(obj)
+            if team is not None:
+                self.__team_drones_payload[team] -= obj.payload
+                self.__team_drones_health[team] -= obj.health
+        self.elerium_stocks.release(obj)
+        self.elerium_stocks.update(obj)
+        if self.replay_recorder is not None:
+            self.replay_recorder.unit_died(obj)
+
+    def _unit_team_changed(self, obj, old_team):
+        if isinstance(obj, Drone) and obj in self.__alive_drones[old_team]:
+            self.__discard_alive_drone(obj, old_team)
+            self.__add_alive_drone(obj)
+
+    def _payload_changed(self, obj, old_payload):
+        self.activate_object(obj)
+        team = self.__drone_teams.get(obj)
+        if team is not None and obj.is_alive:
+            self.__team_drones_payload[team] += obj.payload - old_payload
+        if isinstance(obj, Asteroid):
+            if obj.payload > 0:
+                self.__asteroids_with_payload.add(obj)
+            else:
+                self.__asteroids_with_payload.discard(obj)
+        self.elerium_stocks.update(obj)
+
+    def _health_changed(self, obj, old_health):
+        team = self.__drone_teams.get(obj)
+        if team is not None and old_health > 0:
+            self.__team_drones_health[team] += obj.health - old_health
+
+    def __add_alive_drone(self, drone):
+        self.__alive_drones[drone.team].add(drone)
+        self.__enemy_drones.clear()
+
+    def __discard_alive_drone(self, drone, team):
+        if team in self.__alive_drones:
+            self.__alive_drones[team].discard(drone)
+            self.__enemy_drones.clear()
+
+    def _engine_time_spent(self, seconds):
+        self.cpu_accounting.engine_time_spent(seconds)
+
+    def _in_healing_range(self, drone):
+        return self.__mothership_pass.in_healing_range(drone)
 
     def get_mothership(self, team_name):
         return self.__motherships.get(team_name)
 
     @property
     def drones(self):
-        return self.get_objects_by_type(Drone)
+        return list(self.__registries[Drone])
 
     @property
     def asteroids(self):
-        return self.get_objects_by_type(Asteroid)
+        return list(self.__registries[Asteroid])
 
     @property
     def motherships(self):
-        return self.get_objects_by_type(MotherShip)
+        return list(self.__registries[MotherShip])
+
+    @property
+    def alive_drones_by_team(self):
+        return dict((team, registry.items) for team, registry in self.__alive_drones.items())
+
+    def alive_team_drones(self, team):
+        """
+            Кортеж живых дронов команды.
+        """
+        registry = self.__alive_drones.get(team)
+        return registry.items if registry is not None else ()
+
+    def enemy_drones(self, team):
+        """
+            Кортеж живых дронов всех команд, кроме team. Кешируется до первой гибели/появления дрона.
+        """
+        enemies = self.__enemy_drones.get(team)
+        if enemies is None:
+            enemies = tuple(drone for other_team, registry in self.__alive_drones.items() if other_team != team
+                            for drone in registry.items)
+            self.__enemy_drones[team] = enemies
+        return enemies
+
+    @property
+    def asteroids_with_payload(self):
+        return self.__asteroids_with_payload.items
 
     def _get_game_state(self):
+        # Итоги дронов ведутся по ходу игры, так что здесь O(команд), а не O(объектов)
         game_state = defaultdict(defaultdict)
-        for team, objects in self.teams.items():
-            game_state[team]['drones'] = sum(obj.payload if obj.is_alive else 0 for obj in objects)
+        for team in self.teams:
+            game_state[team]['drones'] = self.__team_drones_payload[team]
         for ship in self.motherships:
             game_state[ship.team]['base'] = ship.payload if ship.is_alive else 0
-        if theme.DRONES_CAN_FIGHT:
+        if self.config.DRONES_CAN_FIGHT:
             # есть ли кто живой
-            for team, objects in self.teams.items():
-                game_state[team]['low_health'] = sum(obj.health for obj in objects if obj.is_alive)
+            for team in self.teams:
+                game_state[team]['low_health'] = self.__team_drones_health[team]
             # база жива
             for ship in self.motherships:
                 game_state[ship.team]['low_health'] += ship.health
@@ -227,7 +633,7 @@ class SpaceField(Scene):
         _rating.reverse()
         for elerium, team, was_dead in _rating:
             mess = '{:<20}:{:>6} elerium'.format(team, elerium)
-            if theme.DRONES_CAN_FIGHT and was_dead:
+            if self.config.DRONES_CAN_FIGHT and was_dead:
                 mess += ' (was eliminated)'
             print(mess)
         self._game_statistics_printed = True
@@ -247,7 +653,7 @@ class SpaceField(Scene):
         for team in self.teams:
             has_any_diff |= self._prev_endgame_state[team]['drones'] != _cur_state[team]['drones']
             has_any_diff |= self._prev_endgame_state[team]['base'] != _cur_state[team]['base']
-            if theme.DRONES_CAN_FIGHT:
+            if self.config.DRONES_CAN_FIGHT:
                 has_any_diff |= abs(self._prev_endgame_state[team]['low_health'] - _cur_state[team]['low_health']) > 10
             if has_any_diff:
                 break
@@ -265,13 +671,21 @@ class SpaceField(Scene):
         _cur_state.pop('countdown')
         now = datetime.datetime.now()
         game_result = dict(game_steps=self._step, uuid=str(uuid.uuid4()), happened_at=now.strftime('%Y-%m-%d %H:%M:%S'))
+        game_result['seed'] = self.seed
+        game_result.update(self.cpu_accounting.result())
         game_result['collected'] = {}
         for team, stat in _cur_state.items():
             game_result['collected'][team] = stat['drones'] + stat['base']
-        if theme.DRONES_CAN_FIGHT:
+        if self.config.DRONES_CAN_FIGHT:
             game_result['dead'] = {}
             for team, objects in self.teams.items():
                 game_result['dead'][team] = sum(1 for obj in objects if not obj.is_alive)
+        if self.replay_recorder is not None:
+            self.replay_recorder.close(result=game_result)
+        if self.state_exporter is not None:
+            self.state_exporter.close()
+        if self.team_logic_runner is not None:
+            self.team_logic_runner.close()
         return game_result
 
 
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+
+from robogame_engine.geometry import Point
+
+
+class SpatialGrid(object):
+    """
+        Равномерная сетка для пространственных запросов к объектам сцены.
+        Объект хранится в ячейке, в которую попадает его центр.
+    """
+
+    def __init__(self, cell_size=100):
+        if cell_size <= 0:
+            raise ValueError("cell_size should be greater than 0")
+        self.cell_size = float(cell_size)
+        self.__cells = {}
+        self.__obj_cells = {}
+        # Границы занятой области в ячейках - для остановки расширения колец поиска
+        self.__bounds = None
+        self.__max_radius = 0
+
+    def __len__(self):
+        return len(self.__obj_cells)
+
+    def __contains__(self, obj):
+        return obj in self.__obj_cells
+
+    def _cell_of(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def insert(self, obj):
+        self.update(obj)
+
+    def update(self, obj):
+        key = self._cell_of(obj.coord.x, obj.coord.y)
+        old_key = self.__obj_cells.get(obj)
+        if old_key == key:
+            return
+        if old_key is not None:
+            self.__discard(obj, old_key)
+        else:
+            self.__max_radius = max(self.__max_radius, obj.radius)
+        self.__cells.setdefault(key, {})[obj] = None
+        self.__obj_cells[obj] = key
+        self.__extend_bounds(key)
+
+    def remove(self, obj):
+        key = self.__obj_cells.pop(obj, None)
+        if key is not None:
+            self.__discard(obj, key)
+
+    def __discard(self, obj, key):
+        cell = self.__cells[key]
+        del cell[obj]
+        if not cell:
+            del self.__cells[key]
+
+    def __extend_bounds(self, key):
+        cx, cy = key
+        if self.__bounds is None:
+            self.__bounds = [cx, cy, cx, cy]
+            return
+        bounds = self.__bounds
+        if cx < bounds[0]:
+            bounds[0] = cx
+        elif cx > bounds[2]:
+            bounds[2] = cx
+        if cy < bounds[1]:
+            bounds[1] = cy
+        elif cy > bounds[3]:
+            bounds[3] = cy
+
+    @staticmethod
+    def _match(obj, cls, team, exclude_team, predicate):
+        if cls is not None and not isinstance(obj, cls):
+            return False
+        if team is not None and obj.team != team:
+            return False
+        if exclude_team is not None and obj.team == exclude_team:
+            return False
+        if predicate is not None and not predicate(obj):
+            return False
+        return True
+
+    def __iter_cells(self, min_cx, min_cy, max_cx, max_cy):
+        cells = self.__cells
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(cells):
+            # Запрошенная область больше занятой - дешевле пройти по всем ячейкам
+            for (cx, cy), cell in cells.items():
+                if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy:
+                    yield cell
+            return
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    yield cell
+
+    def query_radius(self, point, radius, cls=None, team=None, exclude_team=None, predicate=None, touching=False):
+        """
+            Объекты, центр которых не дальше radius от точки, ближайшие первыми.
+            С touching=True учитывается и радиус самого объекта (круги касаются).
+        """
+        if isinstance(point, Point):
+            x, y = point.x, point.y
+        else:
+            x, y = point.coord.x, point.coord.y
+        reach = radius + self.__max_radius if touching else radius
+        min_cx, min_cy = self._cell_of(x - reach, y - reach)
+        max_cx, max_cy = self._cell_of(x + reach, y + reach)
+        found = []
+        for cell in self.__iter_cells(min_cx, min_cy, max_cx, max_cy):
+            for obj in cell:
+                limit = radius + obj.radius if touching else radius
+                distance = math.sqrt((obj.coord.x - x) ** 2 + (obj.coord.y - y) ** 2)
+                if distance > limit:
+                    continue
+                if not self._match(obj, cls, team, exclude_team, predicate):
+                    continue
+                found.append((distance, obj.id, obj))
+        found.sort(key=lambda item: item[:2])
+        return [obj for _, _, obj in found]
+
+    def query_rect(self, x, y, w, h, cls=None, team=None, exclude_team=None, predicate=None):
+        """
+            Объекты, центр которых лежит в прямоугольнике (x, y, w, h), в порядке создания.
+        """
+        min_cx, min_cy = self._cell_of(x, y)
+        max_cx, max_cy = self._cell_of(x + w, y + h)
+        found = []
+        for cell in self.__iter_cells(min_cx, min_cy, max_cx, max_cy):
+            for obj in cell:
+                if not (x <= obj.coord.x <= x + w and y <= obj.coord.y <= y + h):
+                    continue
+                if not self._match(obj, cls, team, exclude_team, predicate):
+                    continue
+                found.append(obj)
+        found.sort(key=lambda obj: obj.id)
+        return found
+
+    def iter_nearest(self, point, cls=None, team=None, exclude_team=None, predicate=None, max_distance=None):
+        """
+            Генератор объектов в порядке удаления от точки.
+            Кольца ячеек просматриваются лениво - ближние объекты отдаются без обхода всей сетки.
+        """
+        if self.__bounds is None:
+            return
+        if isinstance(point, Point):
+            x, y = point.x, point.y
+        else:
+            x, y = point.coord.x, point.coord.y
+        cx, cy = self._cell_of(x, y)
+        min_bx, min_by, max_bx, max_by = self.__bounds
+        # Сколько колец нужно, чтобы накрыть всю занятую область
+        max_ring = max(cx - min_bx, max_bx - cx, cy - min_by, max_by - cy, 0)
+        heap = []
+        cells = self.__cells
+        for ring in range(max_ring + 1):
+            if ring == 0:
+                ring_cells = [(cx, cy)]
+            else:
+                ring_cells = [(cx + dx, cy - ring) for dx in range(-ring, ring + 1)]
+                ring_cells += [(cx + dx, cy + ring) for dx in range(-ring, ring + 1)]
+                ring_cells += [(cx - ring, cy + dy) for dy in range(-ring + 1, ring)]
+                ring_cells += [(cx + ring, cy + dy) for dy in range(-ring + 1, ring)]
+            for key in ring_cells:
+                cell = cells.get(key)
+                if not cell:
+                    continue
+                for obj in cell:
+                    if not self._match(obj, cls, team, exclude_team, predicate):
+                        continue
+                    distance = math.sqrt((obj.coord.x - x) ** 2 + (obj.coord.y - y) ** 2)
+                    heapq.heappush(heap, (distance, obj.id, obj))
+            # Все, что ближе этого расстояния, уже гарантированно просмотрено
+            covered = ring * self.cell_size
+            while heap and heap[0][0] <= covered:
+                distance, _, obj = heapq.heappop(heap)
+                if max_distance is not None and distance > max_distance:
+                    return
+                yield obj
+            if max_distance is not None and covered > max_distance:
+                return
+        while heap:
+            distance, _, obj = heapq.heappop(heap)
+            if max_distance is not None and distance > max_distance:
+                return
+            yield obj
+
+    def nearest(self, point, k=1, **filters):
+        """
+            Список из k ближайших объектов, подходящих под фильтры.
+        """
+        found = []
+        if k <= 0:
+            return found
+        for obj in self.iter_nearest(point, **filters):
+            found.append(obj)
+            if len(found) >= k:
+                break
+        return found
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+    Выгрузка состояния сцены в кольцевой буфер в разделяемой памяти (mmap файла) для отрисовки
+    в отдельном процессе: симуляция не ждет кадров, безголовую игру можно смотреть со стороны.
+
+    Буфер: заголовок, таблица имен (команды и спрайты, только дописывается) и slots слотов.
+    Каждый тик пишется в следующий слот - таблица всех юнитов и снарядов. Слот защищен счетчиком
+    версий: нечетный - идет запись, читатель перечитывает кадр, если счетчик поменялся.
+
+        SpaceField(state_export_path='/dev/shm/astrobox.state')
+        python -m astrobox.state_export /dev/shm/astrobox.state --fps 2
+"""
+import argparse
+import mmap
+import struct
+import time
+from collections import namedtuple
+
+from .core import Unit
+from .guns import Projectile
+from .replay import KIND_NAMES, object_kind
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+MAGIC = b'ABSX'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBIIIQ')  # сигнатура, версия, слотов, объектов в слоте, размер таблицы имен, занято, кадров
+_NAME = struct.Struct('<H')  # длина имени
+_SLOT = struct.Struct('<QIII')  # версия, шаг, записано объектов, объектов на сцене
+_RECORD = struct.Struct('<IBHHffffffi')  # id, вид, команда, спрайт, x, y, направление, zoom, meter_1, meter_2, counter
+NO_NAME = 0xFFFF
+NO_COUNTER = -2 ** 31
+
+RECORD_FIELDS = ('id', 'kind', 'team', 'sprite', 'x', 'y', 'direction', 'zoom', 'meter_1', 'meter_2', 'counter')
+if numpy is not None:
+    RECORD_DTYPE = numpy.dtype([
+        ('id', '<u4'), ('kind', 'u1'), ('team', '<u2'), ('sprite', '<u2'), ('x', '<f4'), ('y', '<f4'),
+        ('direction', '<f4'), ('zoom', '<f4'), ('meter_1', '<f4'), ('meter_2', '<f4'), ('counter', '<i4'),
+    ])
+    assert RECORD_DTYPE.itemsize == _RECORD.size
+
+ObjectRecord = namedtuple('ObjectRecord', RECORD_FIELDS)
+StateFrame = namedtuple('StateFrame', 'step total records')
+
+
+class StateExportException(Exception):
+    pass
+
+
+def _buffer_size(slots, max_objects, names_size):
+    return _HEADER.size + names_size + slots * (_SLOT.size + max_objects * _RECORD.size)
+
+
+class StateExporter(object):
+    """
+        Пишет таблицу объектов сцены после каждого тика (сцена сама вызывает export_step).
+        Если объектов больше max_objects, в слот попадают первые max_objects, а total в кадре - сколько было.
+    """
+
+    def __init__(self, scene, path, slots=8, max_objects=4096, names_size=64 * 1024):
+        if not 2 <= slots <= 255:
+            raise StateExportException('slots should be from 2 to 255')
+        self.scene = scene
+        self.path = path
+        self.slots = slots
+        self.max_objects = max_objects
+        self.names_size = names_size
+        self.__names = {}
+        self.__names_used = 0
+        self.__frames = 0
+        self.__closed = False
+        self.__slot_size = _SLOT.size + max_objects * _RECORD.size
+        self.__slots_offset = _HEADER.size + names_size
+        # Записи кадра собираются здесь до захвата слота - см. export_step
+        self.__records = bytearray(max_objects * _RECORD.size)
+        size = _buffer_size(slots, max_objects, names_size)
+        with open(path, 'wb') as ff:
+            ff.truncate(size)
+        self.__file = open(path, 'r+b')
+        self.__buffer = mmap.mmap(self.__file.fileno(), size)
+        self._write_header()
+        scene.state_exporter = self
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    def _write_header(self):
+        _HEADER.pack_into(self.__buffer, 0, MAGIC, VERSION, self.slots, self.max_objects,
+                          self.names_size, self.__names_used, self.__frames)
+
+    def _name_id(self, name):
+        if name is None:
+            return NO_NAME
+        name_id = self.__names.get(name)
+        if name_id is None:
+            data = name.encode('utf-8')
+            offset = _HEADER.size + self.__names_used
+            if len(self.__names) >= NO_NAME or self.__names_used + _NAME.size + len(data) > self.names_size:
+                raise StateExportException('Names table is full, increase names_size')
+            # Сначала само имя, потом счетчик в заголовке - читатель не увидит недописанное
+            _NAME.pack_into(self.__buffer, offset, len(data))
+            self.__buffer[offset + _NAME.size:offset + _NAME.size + len(data)] = data
+            self.__names_used += _NAME.size + len(data)
+            name_id = self.__names[name] = len(self.__names)
+        return name_id
+
+    def export_step(self):
+        if self.__closed:
+            return
+        # Записи (и новые имена, которые могут не поместиться) готовим до захвата слота: с нечетной версией
+        # слот оставлять нельзя - читатели будут ждать его до исчерпания попыток
+        records = self.__records
+        offset = count = total = 0
+        pack_into, name_id, record_size = _RECORD.pack_into, self._name_id, _RECORD.size
+        try:
+            for obj in self.scene.objects:
+                if not isinstance(obj, (Unit, Projectile)):
+                    continue
+                total += 1
+                if count == self.max_objects:
+                    continue
+                counter = obj.counter
+                pack_into(
+                    records, offset, obj.id, object_kind(obj), name_id(obj.team), name_id(obj.sprite_filename),
+                    obj.coord.x, obj.coord.y, obj.direction, obj.zoom, obj.meter_1, obj.meter_2,
+                    NO_COUNTER if counter is None else int(counter),
+                )
+                offset += record_size
+                count += 1
+        except StateExportException as exc:
+            # Выгрузка - для внешних наблюдателей, игра из-за нее не останавливается
+            self.scene.error('State export to {} stopped: {}'.format(self.path, exc))
+            self.close()
+            return
+        buffer = self.__buffer
+        slot_offset = self.__slots_offset + (self.__frames % self.slots) * self.__slot_size
+        version = struct.unpack_from('<Q', buffer, slot_offset)[0]
+        struct.pack_into('<Q', buffer, slot_offset, version + 1)
+        start = slot_offset + _SLOT.size
+        buffer[start:start + offset] = memoryview(records)[:offset]
+        _SLOT.pack_into(buffer, slot_offset, version + 2, self.scene._step, count, total)
+        self.__frames += 1
+        self._write_header()
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__buffer.flush()
+        self.__buffer.close()
+        self.__file.close()
+
+
+class StateReader(object):
+    """
+        Читатель буфера из другого процесса. latest() - последний записанный кадр:
+        структурированный массив NumPy (если установлен) или список ObjectRecord.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__file = open(path, 'rb')
+        self.__buffer = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slots, self.max_objects, self.names_size, _, _ = _HEADER.unpack_from(self.__buffer, 0)
+        if magic != MAGIC:
+            raise StateExportException('{} is not an astrobox state buffer'.format(path))
+        if version != VERSION:
+            raise StateExportException('Unsupported state buffer version {}'.format(version))
+        if len(self.__buffer) < _buffer_size(self.slots, self.max_objects, self.names_size):
+            raise StateExportException('{} is truncated'.format(path))
+        self.__slot_size = _SLOT.size + self.max_objects * _RECORD.size
+        self.__slots_offset = _HEADER.size + self.names_size
+        self.__names = []
+        self.__names_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def frames_written(self):
+        return _HEADER.unpack_from(self.__buffer, 0)[6]
+
+    def name(self, name_id):
+        """
+            Имя команды или спрайта по номеру из записи объекта (None для NO_NAME).
+        """
+        if name_id == NO_NAME:
+            return None
+        if name_id >= len(self.__names):
+            self._read_names()
+        return self.__names[name_id]
+
+    def _read_names(self):
+        used = _HEADER.unpack_from(self.__buffer, 0)[5]
+        while self.__names_read < used:
+            offset = _HEADER.size + self.__names_read
+            length = _NAME.unpack_from(self.__buffer, offset)[0]
+            start = offset + _NAME.size
+            self.__names.append(self.__buffer[start:start + length].decode('utf-8'))
+            self.__names_read += _NAME.size + length
+
+    def latest(self, retries=100):
+        """
+            Последний целый кадр или None, если кадров еще не было.
+            Данные копируются из буфера один раз - запись в это время не блокируется.
+        """
+        for _ in range(retries):
+            frames = self.frames_written
+            if not frames:
+                return None
+            slot_offset = self.__slots_offset + ((frames - 1) % self.slots) * self.__slot_size
+            version, step, count, total = _SLOT.unpack_from(self.__buffer, slot_offset)
+            if version % 2:
+                continue
+            start = slot_offset + _SLOT.size
+            if numpy is not None:
+                records = numpy.frombuffer(self.__buffer, dtype=RECORD_DTYPE, count=count, offset=start).copy()
+            else:
+                records = [ObjectRecord(*values) for values in
+                           _RECORD.iter_unpack(self.__buffer[start:start + count * _RECORD.size])]
+            if _SLOT.unpack_from(self.__buffer, slot_offset)[0] == version:
+                return StateFrame(step=step, total=total, records=records)
+        raise StateExportException('Could not read a consistent frame')
+
+    def close(self):
+        self.__buffer.close()
+        self.__file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m astrobox.state_export',
+                                     description='Astrobox shared state buffer viewer')
+    parser.add_argument('path', help='state buffer file')
+    parser.add_argument('--fps', type=float, default=1.0, help='frames per second to print')
+    parser.add_argument('--frames', type=int, default=None, help='stop after this many frames')
+    args = parser.parse_args(argv)
+
+    shown = 0
+    last_step = None
+    with StateReader(args.path) as reader:
+        while args.frames is None or shown < args.frames:
+            frame = reader.latest()
+            if frame is not None and frame.step != last_step:
+                last_step = frame.step
+                shown += 1
+                print('step {}: {} objects'.format(frame.step, frame.total))
+                for record in frame.records:
+                    record = ObjectRecord(*record)
+                    print('  {0.id:>5} {1:<10} {2:<20} ({0.x:.1f}, {0.y:.1f}) dir={0.direction:.0f} '
+                          '{3}'.format(record, KIND_NAMES[record.kind], reader.name(record.team) or '-',
+                                       reader.name(record.sprite)))
+            time.sleep(1.0 / args.fps)
+
+
+if __name__ == '__main__':
+    main()
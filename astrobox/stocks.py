@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+    Источники элериума сцены: астероиды и обломки с непустым трюмом, и их резервирование дронами команд.
+
+        stocks = scene.elerium_stocks
+        stock = stocks.nearest(drone, for_drone=drone, min_payload=drone.free_space)
+        stocks.reserve(drone, stock[0])
+
+    Ближайшие источники ищутся обходом пространственного индекса, проверка "источник и не занят"
+    стоит O(1) - выбор цели не зависит от числа союзников и источников на поле.
+"""
+from .core import Asteroid, Drone
+
+STOCK_CLASSES = (Asteroid, Drone)
+
+
+class EleriumStocks(object):
+    """
+        Источник - астероид или обломок дрона с элериумом. Состав обновляет сцена при изменении трюмов и гибели юнитов.
+        Резерв дрона учитывается, пока дрон жив и его трюм не полон - как и раньше в демо-стратегиях.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.__stocks = set()
+        # (команда, источник) -> дроны, занявшие его, и обратно дрон -> источник
+        self.__reserved = {}
+        self.__by_drone = {}
+
+    def __len__(self):
+        return len(self.__stocks)
+
+    def __contains__(self, obj):
+        return obj in self.__stocks
+
+    def update(self, obj):
+        """
+            Пересчитать, источник ли obj. Опустевший источник освобождается от резервов.
+        """
+        if isinstance(obj, STOCK_CLASSES) and not obj.is_alive and obj.payload > 0 and obj in self.scene.spatial_index:
+            self.__stocks.add(obj)
+            return
+        if obj in self.__stocks:
+            self.__stocks.discard(obj)
+            self.__drop_reservations(obj)
+
+    def remove(self, obj):
+        """
+            Объект ушел со сцены: снять резервы на него и резерв его самого, если это дрон.
+        """
+        self.__stocks.discard(obj)
+        self.__drop_reservations(obj)
+        self.release(obj)
+
+    def __drop_reservations(self, stock):
+        for key in [key for key in self.__reserved if key[1] is stock]:
+            for drone in self.__reserved.pop(key):
+                del self.__by_drone[drone]
+
+    def reserve(self, drone, stock):
+        """
+            Занять источник для дрона. Прежний резерв дрона снимается, stock=None - просто снять.
+        """
+        self.release(drone)
+        if stock is None:
+            return
+        key = (drone.team, stock)
+        self.__reserved.setdefault(key, set()).add(drone)
+        self.__by_drone[drone] = key
+
+    def release(self, drone):
+        key = self.__by_drone.pop(drone, None)
+        if key is None:
+            return
+        drones = self.__reserved[key]
+        drones.discard(drone)
+        if not drones:
+            del self.__reserved[key]
+
+    def reserved_by(self, drone):
+        key = self.__by_drone.get(drone)
+        return key[1] if key is not None else None
+
+    def is_reserved(self, stock, team, for_drone=None):
+        """
+            Занят ли источник кем-то из команды team, кроме самого for_drone.
+        """
+        drones = self.__reserved.get((team, stock))
+        if not drones:
+            return False
+        return any(drone is not for_drone and drone.is_alive and not drone.cargo.is_full for drone in drones)
+
+    def _predicate(self, team, for_drone, min_payload):
+        stocks, reserved = self.__stocks, self.__reserved
+
+        def predicate(obj):
+            if obj not in stocks or obj.payload < min_payload:
+                return False
+            return team is None or (team, obj) not in reserved or not self.is_reserved(obj, team, for_drone)
+
+        return predicate
+
+    def iter_nearest(self, point, cls=STOCK_CLASSES, team=None, for_drone=None, min_payload=0):
+        """
+            Свободные источники в порядке удаления от point. Занятость проверяется для команды team,
+            по умолчанию - для команды for_drone.
+        """
+        if team is None and for_drone is not None:
+            team = for_drone.team
+        return self.scene.spatial_index.iter_nearest(
+            point, cls=cls, predicate=self._predicate(team, for_drone, min_payload))
+
+    def nearest(self, point, k=1, **filters):
+        """
+            Список из k ближайших свободных источников, фильтры - как у iter_nearest.
+        """
+        found = []
+        if k <= 0:
+            return found
+        for stock in self.iter_nearest(point, **filters):
+            found.append(stock)
+            if len(found) >= k:
+                break
+        return found
+
+    def richest(self, point, cls=STOCK_CLASSES, team=None, for_drone=None):
+        """
+            Свободный источник с наибольшим запасом, из равных - ближайший к point. Обходит все источники.
+        """
+        if team is None and for_drone is not None:
+            team = for_drone.team
+        predicate = self._predicate(team, for_drone, min_payload=0)
+        best, best_key = None, None
+        for stock in self.__stocks:
+            if not isinstance(stock, cls) or not predicate(stock):
+                continue
+            key = (-stock.payload, stock.distance_to(point), stock.id)
+            if best_key is None or key < best_key:
+                best, best_key = stock, key
+        return best
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+    Перебор констант темы для балансировки: сетка или случайный план значений, каждый вариант -
+    на наборе сидов, игры идут в пуле процессов турнира.
+
+    Результат каждой игры сохраняется на диск под ключом - хешем значений темы, сида, параметров игры
+    и кода стратегий (и движка). Повторный запуск прерванного перебора доигрывает только недостающее,
+    а после правки стратегии или темы игры переигрываются сами.
+
+        python -m astrobox.sweep demo.game.WorkerDrone demo.game.HunterDrone --seeds 1-5 --can-fight \\
+            --grid DRONE_SPEED=3,5 --grid PROJECTILE_DAMAGE=10,20 --cache .sweep-cache
+"""
+import argparse
+import ast
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+from collections import OrderedDict, defaultdict
+from importlib import import_module
+
+from .config import SceneConfig
+from .results import ResultStore
+from .tournament import (DEFAULT_THEME_MOD_PATH, MatchSpec, Tournament, TournamentException, _parse_seeds,
+                         class_path, import_class)
+
+
+def grid(values):
+    """
+        Все сочетания значений: {'DRONE_SPEED': [3, 5], 'PROJECTILE_DAMAGE': [10, 20]} - 4 варианта.
+    """
+    names = sorted(values)
+    combinations = itertools.product(*(values[name] for name in names))
+    return [OrderedDict(zip(names, combination)) for combination in combinations]
+
+
+def random_design(ranges, samples, seed=None):
+    """
+        samples случайных вариантов. Диапазон - (от, до) включительно (целые, если оба конца целые)
+        или список значений для выбора.
+    """
+    rnd = random.Random(seed)
+    names = sorted(ranges)
+    variants = []
+    for _ in range(samples):
+        variant = OrderedDict()
+        for name in names:
+            spec = ranges[name]
+            if isinstance(spec, list):
+                variant[name] = rnd.choice(spec)
+            elif all(isinstance(bound, int) for bound in spec):
+                variant[name] = rnd.randint(*spec)
+            else:
+                variant[name] = rnd.uniform(*spec)
+        variants.append(variant)
+    return variants
+
+
+def _hash_files(digest, paths):
+    for path in sorted(paths):
+        digest.update(path.encode('utf-8'))
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+
+
+def _package_sources(module_name):
+    # Код модуля вместе со всем его пакетом верхнего уровня - стратегии обычно разложены по нескольким модулям
+    module = import_module(module_name.partition('.')[0])
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return []
+    if os.path.basename(path) != '__init__.py':
+        return [path]
+    sources = []
+    for root, _, files in os.walk(os.path.dirname(path)):
+        sources.extend(os.path.join(root, name) for name in files if name.endswith('.py'))
+    return sources
+
+
+def code_hash(teams):
+    """
+        Хеш исходников пакетов классов команд и самого astrobox.
+    """
+    digest = hashlib.sha256()
+    sources = set(_package_sources(__name__))
+    for path in teams:
+        sources.update(_package_sources(import_class(path).__module__))
+    _hash_files(digest, sources)
+    return digest.hexdigest()
+
+
+def theme_values(theme_mod_path, overrides):
+    """
+        Все константы темы с переопределениями. Неизвестное имя константы - ValueError.
+    """
+    return SceneConfig.from_module(import_module(theme_mod_path), **overrides).as_dict()
+
+
+def match_key(spec, code):
+    """
+        Ключ кеша игры: значения темы, сид, параметры игры и хеш кода.
+    """
+    key = dict(
+        theme=theme_values(spec.theme_mod_path, spec.theme_overrides), seed=spec.seed, teams=spec.teams,
+        drones_at_team=spec.drones_at_team, asteroids_count=spec.asteroids_count, can_fight=spec.can_fight,
+        field=spec.field, code=code,
+    )
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+class ResultCache(object):
+    """
+        Каталог с результатами игр, файл на ключ. Запись через временный файл - оборванный
+        запуск не оставляет испорченных результатов.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._file(key)) as cached:
+                return json.load(cached)
+        except (IOError, ValueError):
+            return None
+
+    def put(self, key, result):
+        handle, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(handle, 'w') as tmp:
+            json.dump(result, tmp)
+        os.replace(tmp_path, self._file(key))
+
+
+class Sweep(object):
+    """
+        Варианты переопределений темы x сиды. Команды играют все вместе в каждой игре.
+    """
+
+    def __init__(self, teams, variants, seeds, cache_path, theme_mod_path=DEFAULT_THEME_MOD_PATH, **match_kwargs):
+        self.teams = [class_path(cls) for cls in teams]
+        self.variants = [dict(variant) for variant in variants]
+        self.seeds = list(seeds)
+        self.cache = ResultCache(cache_path)
+        self.theme_mod_path = theme_mod_path
+        self.match_kwargs = match_kwargs
+        for variant in self.variants:
+            theme_values(theme_mod_path, variant)
+
+    def specs(self):
+        """
+            Список (номер варианта, спецификация игры).
+        """
+        return [
+            (number, MatchSpec(teams=self.teams, seed=seed, theme_overrides=variant,
+                               theme_mod_path=self.theme_mod_path, **self.match_kwargs))
+            for number, variant in enumerate(self.variants) for seed in self.seeds
+        ]
+
+    def run(self, processes=None, on_result=None):
+        """
+            Доиграть недостающие игры. Возвращает (результаты по вариантам, сколько сыграно, ошибки).
+            on_result(result, cached) вызывается на каждую игру - например, для записи в ResultStore.
+        """
+        code = code_hash(self.teams)
+        results = [[] for _ in self.variants]
+        todo = []
+        for number, spec in self.specs():
+            key = match_key(spec, code)
+            result = self.cache.get(key)
+            if result is None:
+                todo.append((number, spec, key))
+                continue
+            results[number].append(result)
+            if on_result is not None:
+                on_result(result, True)
+        errors = []
+        if todo:
+            with Tournament(processes=processes, preload=self.teams) as tournament:
+                for index, result, error in tournament.run([spec for _, spec, _ in todo]):
+                    number, spec, key = todo[index]
+                    if error is not None:
+                        errors.append('{!r} {}: {}'.format(spec, spec.theme_overrides, error))
+                        continue
+                    self.cache.put(key, result)
+                    results[number].append(result)
+                    if on_result is not None:
+                        on_result(result, False)
+        return results, len(todo) - len(errors), errors
+
+    def summary(self, results):
+        """
+            Средний сбор элериума классов команд по вариантам.
+        """
+        rows = []
+        for variant, variant_results in zip(self.variants, results):
+            collected = defaultdict(list)
+            for result in variant_results:
+                for team, team_class in result['teams'].items():
+                    collected[team_class].append(result['collected'][team])
+            rows.append(dict(
+                theme_overrides=variant, matches=len(variant_results),
+                avg_collected=dict((team_class, sum(values) / len(values)) for team_class, values in collected.items()),
+            ))
+        return rows
+
+
+def _parse_values(value):
+    name, sep, raw = value.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError('grid values should be NAME=VALUE,VALUE')
+    return name, [ast.literal_eval(item) for item in raw.split(',')]
+
+
+def _parse_range(value):
+    name, sep, raw = value.partition('=')
+    low, colon, high = raw.partition(':')
+    if not sep or not colon:
+        raise argparse.ArgumentTypeError('random range should be NAME=LOW:HIGH')
+    return name, (ast.literal_eval(low), ast.literal_eval(high))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m astrobox.sweep', description='Theme constants sweep')
+    parser.add_argument('teams', nargs='+', help='drone classes, e.g. demo.game.WorkerDrone')
+    parser.add_argument('--grid', type=_parse_values, action='append', default=[], metavar='NAME=V1,V2',
+                        help='grid values of a theme constant')
+    parser.add_argument('--random', type=_parse_range, action='append', default=[], metavar='NAME=LOW:HIGH',
+                        help='random range of a theme constant, with --samples')
+    parser.add_argument('--samples', type=int, default=10, help='random design variants')
+    parser.add_argument('--design-seed', type=int, default=None)
+    parser.add_argument('--seeds', type=_parse_seeds, default=[1], help='seeds list: 1,2,5-10')
+    parser.add_argument('--drones', type=int, default=5, help='drones at team')
+    parser.add_argument('--asteroids', type=int, default=27)
+    parser.add_argument('--field', type=int, nargs=2, default=(1200, 600), metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--can-fight', action='store_true')
+    parser.add_argument('--theme', default=DEFAULT_THEME_MOD_PATH, help='theme module path')
+    parser.add_argument('--cache', default='.sweep-cache', help='results cache directory')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--db', default=None, help='also store played matches in the SQLite database')
+    args = parser.parse_args(argv)
+
+    if args.grid and args.random:
+        parser.error('use either --grid or --random')
+    if args.random:
+        variants = random_design(dict(args.random), args.samples, seed=args.design_seed)
+    else:
+        variants = grid(dict(args.grid))
+    try:
+        sweep = Sweep(args.teams, variants, args.seeds, args.cache, theme_mod_path=args.theme,
+                      drones_at_team=args.drones, asteroids_count=args.asteroids, field=args.field,
+                      can_fight=args.can_fight)
+    except (TournamentException, ValueError) as exc:
+        parser.error(str(exc))
+    store = ResultStore(args.db) if args.db is not None else None
+    try:
+        on_result = (lambda result, cached: store.add(result)) if store is not None else None
+        results, played, errors = sweep.run(processes=args.processes, on_result=on_result)
+    finally:
+        if store is not None:
+            store.close()
+    for error in errors:
+        print('match failed: {}'.format(error), file=sys.stderr)
+    for row in sweep.summary(results):
+        sys.stdout.write(json.dumps(row) + '\n')
+    print('{} matches played, {} from cache'.format(played, sum(map(len, results)) - played), file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+    Логика команды, которую можно считать параллельно в рабочих процессах.
+
+    Обычные дроны думают внутри своего game_step и обработчиков событий, меняя свое состояние
+    напрямую, поэтому разнести их по процессам нельзя. Команда с логикой TeamLogic устроена иначе:
+    раз в тик логика получает неизменяемый снимок мира WorldView и отдает приказы своим дронам.
+    Логики всех команд считаются одновременно (в рабочих процессах сцены), а приказы
+    применяются в основном процессе в порядке команд сцены - игра не зависит от числа процессов.
+
+        class MyLogic(TeamLogic):
+            def think(self, world, orders):
+                for drone in world.my_drones:
+                    ...
+                    orders.move_at(drone, asteroid)
+
+        class MyDrone(Drone):
+            team_logic = MyLogic   # или путь 'mymodule.MyLogic'
+
+        SpaceField(team_processes=4)
+"""
+import math
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+
+from robogame_engine.geometry import Point
+
+from .cargo import CargoException
+from .core import Drone, Unit
+from .replay import KIND_ASTEROID, KIND_DRONE, KIND_MOTHERSHIP, object_kind
+from .tournament import class_path, import_class
+
+UnitView = namedtuple('UnitView', 'id kind team x y direction payload free_space health is_alive is_moving')
+
+ORDER_ACTIONS = ('move_at', 'turn_to', 'stop', 'load_from', 'unload_to', 'shot')
+
+
+class WorldView(object):
+    """
+        Снимок юнитов сцены на начало тика с точки зрения команды team.
+    """
+
+    def __init__(self, step, team, config, units, random_seed):
+        self.step = step
+        self.team = team
+        self.config = config
+        self.units = units
+        self.by_id = dict((unit.id, unit) for unit in units)
+        # Случайность логики - своя у каждой команды и тика, от процессов не зависит
+        self.random = random.Random(random_seed)
+
+    @property
+    def asteroids(self):
+        return [unit for unit in self.units if unit.kind == KIND_ASTEROID]
+
+    @property
+    def motherships(self):
+        return [unit for unit in self.units if unit.kind == KIND_MOTHERSHIP]
+
+    @property
+    def drones(self):
+        return [unit for unit in self.units if unit.kind == KIND_DRONE]
+
+    @property
+    def my_drones(self):
+        return [unit for unit in self.units if unit.kind == KIND_DRONE and unit.team == self.team]
+
+    @property
+    def my_mothership(self):
+        for unit in self.units:
+            if unit.kind == KIND_MOTHERSHIP and unit.team == self.team:
+                return unit
+
+    @staticmethod
+    def distance(unit, other):
+        return math.sqrt((unit.x - other.x) ** 2 + (unit.y - other.y) ** 2)
+
+    def nearest(self, unit, candidates):
+        return min(candidates, key=lambda other: self.distance(unit, other), default=None)
+
+
+class Orders(object):
+    """
+        Приказы дронам команды за тик. Цель - UnitView, id объекта или точка (x, y).
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def _add(self, drone, action, target=None):
+        drone_id = drone.id if isinstance(drone, UnitView) else drone
+        if isinstance(target, UnitView):
+            target = target.id
+        elif isinstance(target, (tuple, list)):
+            target = (float(target[0]), float(target[1]))
+        self.items.append((drone_id, action, target))
+
+    def move_at(self, drone, target):
+        self._add(drone, 'move_at', target)
+
+    def turn_to(self, drone, target):
+        self._add(drone, 'turn_to', target)
+
+    def stop(self, drone):
+        self._add(drone, 'stop')
+
+    def load_from(self, drone, source):
+        self._add(drone, 'load_from', source)
+
+    def unload_to(self, drone, target):
+        self._add(drone, 'unload_to', target)
+
+    def shot(self, drone, target=None):
+        self._add(drone, 'shot', target)
+
+
+class TeamLogic(object):
+    """
+        Логика одной команды. Экземпляр живет всю игру (в рабочем процессе, если они есть),
+        так что между тиками можно хранить что угодно, кроме объектов сцены - их в процессе нет.
+    """
+
+    def __init__(self, team):
+        self.team = team
+
+    def think(self, world, orders):
+        raise NotImplementedError()
+
+
+def unit_view(obj):
+    health = getattr(obj, 'health', 0)
+    return UnitView(
+        obj.id, object_kind(obj), obj.team, obj.coord.x, obj.coord.y, obj.direction, obj.payload,
+        obj.free_space, health, obj.is_alive, obj.is_moving,
+    )
+
+
+def _think(logics, team, logic_path, world):
+    """
+        Возвращает (приказы, текст ошибки, процессорное время логики).
+    """
+    started = time.process_time()
+    try:
+        logic = logics.get(team)
+        if logic is None:
+            logic = logics[team] = import_class(logic_path)(team=team)
+        orders = Orders()
+        logic.think(world, orders)
+        return orders.items, None, time.process_time() - started
+    except Exception as exc:
+        return [], '{}: {}'.format(exc.__class__.__name__, exc), time.process_time() - started
+
+
+def _worker(conn):
+    logics = {}
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            conn.send([(team,) + _think(logics, team, logic_path, world) for team, logic_path, world in message])
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+
+class TeamLogicRunner(object):
+    """
+        Раз в тик (в начале SpaceField.game_step) собирает приказы всех команд с TeamLogic
+        и применяет их к дронам. processes=0 - логики считаются в этом процессе.
+    """
+
+    def __init__(self, scene, logics, processes=0):
+        self.scene = scene
+        self.logics = dict((team, class_path(logic)) for team, logic in logics.items())
+        self.processes = min(processes, len(self.logics))
+        self.__local_logics = {}
+        self.__closed = False
+        self.__workers = []
+        for _ in range(self.processes):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child_conn,))
+            process.daemon = True
+            process.start()
+            child_conn.close()
+            self.__workers.append((process, parent_conn))
+
+    def _world(self, team, units):
+        scene = self.scene
+        return WorldView(step=scene._step, team=team, config=scene.config, units=units,
+                         random_seed='{}-{}-{}'.format(scene.seed, scene._step, team))
+
+    def step(self):
+        if self.__closed:
+            return
+        scene = self.scene
+        units = [unit_view(obj) for obj in scene.objects if isinstance(obj, Unit)]
+        teams = [team for team in scene.teams if team in self.logics]
+        if self.__workers:
+            batches = [[] for _ in self.__workers]
+            for index, team in enumerate(teams):
+                batches[index % len(batches)].append((team, self.logics[team], self._world(team, units)))
+            for (_, conn), batch in zip(self.__workers, batches):
+                conn.send(batch)
+            results = {}
+            for _, conn in self.__workers:
+                for team, orders, error, seconds in conn.recv():
+                    results[team] = orders, error, seconds
+        else:
+            results = dict(
+                (team, _think(self.__local_logics, team, self.logics[team], self._world(team, units)))
+                for team in teams
+            )
+        # Порядок применения - порядок команд сцены, внутри команды - порядок приказов
+        for team in teams:
+            orders, error, seconds = results[team]
+            scene.cpu_accounting.charge(team, seconds)
+            if error is not None:
+                scene.error('Team {} logic failed: {}'.format(team, error))
+            self.apply(team, orders)
+
+    def apply(self, team, orders):
+        scene = self.scene
+        objects = dict((obj.id, obj) for obj in scene.objects)
+        for drone_id, action, target in orders:
+            drone = objects.get(drone_id)
+            if not isinstance(drone, Drone) or drone.team != team or action not in ORDER_ACTIONS:
+                scene.error('Team {} order {} for {} rejected'.format(team, action, drone_id))
+                continue
+            if not drone.is_alive:
+                continue
+            if isinstance(target, tuple):
+                target = Point(*target)
+            elif target is not None:
+                target = objects.get(target)
+                if target is None:
+                    continue
+            if action == 'stop':
+                drone.stop()
+            elif action == 'shot':
+                if drone.have_gun:
+                    drone.gun.shot(target)
+            elif target is not None:
+                try:
+                    getattr(drone, action)(target)
+                except CargoException as exc:
+                    scene.error('Team {} order {} for {} rejected: {}'.format(team, action, drone_id, exc))
+
+    def close(self):
+        self.__closed = True
+        for process, conn in self.__workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, EOFError):
+                pass
+            conn.close()
+            process.join()
+        self.__workers = []
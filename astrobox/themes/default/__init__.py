@@ -37,8 +37,13 @@ ASTEROID_ROTATION_SPEED = 0.27
 CARGO_TRANSITION_SPEED = 1
 CARGO_TRANSITION_DISTANCE = 10
 
+SPATIAL_INDEX_CELL_SIZE = 100  # размер ячейки сетки пространственного индекса
+
 SLEEP_COUNTDOWN = 10  # тиков игры замершего обьекта до посылки ему on_wakeup
 
+DRONE_CPU_BUDGET = 0  # секунд процессорного времени кода игрока на дрона за тик, 0 - без ограничения
+DRONE_CPU_OVERRUN = 'throttle'  # что делать с превысившим бюджет: throttle или skip, см. astrobox.cpu_budget
+
 # Fighting
 DRONES_CAN_FIGHT = False
 DRONE_DEAD_SPEED = 0.5
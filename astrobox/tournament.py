@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+    Безголовые турниры: много игр SpaceField в пуле процессов.
+
+    Пример:
+        python -m astrobox.tournament demo.game.WorkerDrone demo.game.GreedyDrone \\
+            demo.game.HunterDrone demo.game.DestroyerDrone --seeds 1-20 --can-fight
+"""
+import argparse
+import ast
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+from importlib import import_module
+
+from robogame_engine.theme import theme
+
+from .results import ResultStore
+
+DEFAULT_THEME_MOD_PATH = 'astrobox.themes.default'
+
+
+class TournamentException(Exception):
+    pass
+
+
+def class_path(cls):
+    if isinstance(cls, str):
+        return cls
+    return '{}.{}'.format(cls.__module__, cls.__qualname__)
+
+
+def import_class(path):
+    module_path, _, class_name = path.replace(':', '.').rpartition('.')
+    if not module_path:
+        raise TournamentException("Can't import {}: use module.ClassName".format(path))
+    try:
+        return getattr(import_module(module_path), class_name)
+    except (ImportError, AttributeError) as exc:
+        raise TournamentException("Can't import {}: {}".format(path, exc))
+
+
+class MatchSpec(object):
+    """
+        Описание одной игры. Классы дронов хранятся путями - так спецификация
+        дешево передается в рабочие процессы.
+    """
+
+    def __init__(self, teams, seed=None, drones_at_team=5, asteroids_count=27, can_fight=False,
+                 field=(1200, 600), speed=1, theme_overrides=None, theme_mod_path=DEFAULT_THEME_MOD_PATH,
+                 replay_path=None):
+        # Опечатка в пути класса должна всплыть здесь, а не в рабочем процессе пула
+        self.teams = [class_path(import_class(cls) if isinstance(cls, str) else cls) for cls in teams]
+        if len(set(self.teams)) != len(self.teams):
+            raise TournamentException('Team classes in one match should be unique')
+        self.seed = seed
+        self.drones_at_team = drones_at_team
+        self.asteroids_count = asteroids_count
+        self.can_fight = can_fight
+        self.field = tuple(field) if field else None
+        self.speed = speed
+        self.theme_overrides = dict(theme_overrides or {})
+        self.theme_mod_path = theme_mod_path
+        self.replay_path = replay_path
+
+    def __repr__(self):
+        return 'MatchSpec({}, seed={})'.format(', '.join(self.teams), self.seed)
+
+
+def apply_theme(theme_mod_path=DEFAULT_THEME_MOD_PATH, overrides=None):
+    """
+        Сбрасывает закешированные в теме значения предыдущей игры и накладывает переопределения.
+        Нужно для констант, которые читает сам движок (MAX_SPEED, HEARTBEAT_INTERVAL, ...),
+        astrobox берет константы из конфигурации сцены.
+    """
+    theme.__dict__.clear()
+    theme.set_theme_module(mod_path=theme_mod_path)
+    for name, value in (overrides or {}).items():
+        setattr(theme, name, value)
+
+
+def run_match(spec, quiet=True):
+    """
+        Проводит одну безголовую игру и возвращает результат SpaceField._make_game_result
+        дополненный параметрами игры.
+    """
+    from .space_field import SpaceField
+
+    apply_theme(spec.theme_mod_path, spec.theme_overrides)
+    if spec.seed is not None:
+        # Игра берет случайность из генератора сцены, а глобальный random - для стратегий игроков
+        random.seed(spec.seed)
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        scene = SpaceField(
+            name='Tournament',
+            speed=spec.speed,
+            field=spec.field,
+            theme_mod_path=spec.theme_mod_path,
+            asteroids_count=spec.asteroids_count,
+            can_fight=spec.can_fight,
+            max_drones_at_team=spec.drones_at_team,
+            theme_overrides=spec.theme_overrides,
+            seed=spec.seed,
+            replay_path=spec.replay_path,
+            headless=True,
+        )
+        for path in spec.teams:
+            drone_class = import_class(path)
+            for _ in range(spec.drones_at_team):
+                drone_class()
+        game_result = scene.go()
+    game_result['seed'] = scene.seed
+    game_result['teams'] = {team: path for team, path in zip(scene.teams, spec.teams)}
+    game_result['theme_overrides'] = spec.theme_overrides
+    if spec.replay_path is not None:
+        game_result['replay_path'] = spec.replay_path
+    return game_result
+
+
+def _init_worker(preload):
+    # Импорты делаем один раз на процесс, дальше игры идут на "прогретом" интерпретаторе
+    import_module('astrobox.space_field')
+    for path in preload:
+        import_class(path)
+
+
+def _run_match_safe(args):
+    index, spec = args
+    try:
+        return index, run_match(spec), None
+    except Exception as exc:
+        return index, None, '{}: {}'.format(exc.__class__.__name__, exc)
+
+
+class Tournament(object):
+    """
+        Пул рабочих процессов, переиспользуемый для всех игр турнира.
+        Результаты отдаются по мере завершения игр.
+    """
+
+    def __init__(self, processes=None, preload=()):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.preload = [class_path(cls) for cls in preload]
+        self.__pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        if self.__pool is None:
+            self.__pool = multiprocessing.Pool(
+                processes=self.processes, initializer=_init_worker, initargs=(self.preload,))
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+
+    def run(self, specs):
+        """
+            Генератор (index, result, error) в порядке завершения игр.
+            index - номер спецификации в specs, error - текст исключения, если игра упала.
+        """
+        self.start()
+        for item in self.__pool.imap_unordered(_run_match_safe, enumerate(specs), chunksize=1):
+            yield item
+
+
+def round_robin(team_classes, seeds, teams_per_match=4, **match_kwargs):
+    """
+        Спецификации игр "каждый с каждым": все сочетания по teams_per_match команд на каждом сиде.
+    """
+    if teams_per_match > len(team_classes):
+        raise TournamentException('Not enough teams: {} for {} per match'.format(
+            len(team_classes), teams_per_match))
+    team_classes = [import_class(cls) if isinstance(cls, str) else cls for cls in team_classes]
+    specs = []
+    for seed in seeds:
+        for teams in itertools.combinations(team_classes, teams_per_match):
+            specs.append(MatchSpec(teams=teams, seed=seed, **match_kwargs))
+    return specs
+
+
+def _parse_seeds(value):
+    seeds = []
+    for part in value.split(','):
+        if '-' in part:
+            begin, end = part.split('-')
+            seeds.extend(range(int(begin), int(end) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def _parse_override(value):
+    name, sep, raw = value.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError('theme override should be NAME=VALUE')
+    try:
+        return name, ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        return name, raw
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m astrobox.tournament', description='Headless astrobox tournament')
+    parser.add_argument('teams', nargs='+', help='drone classes, e.g. demo.game.WorkerDrone')
+    parser.add_argument('--seeds', type=_parse_seeds, default=[1], help='seeds list: 1,2,5-10')
+    parser.add_argument('--teams-per-match', type=int, default=None)
+    parser.add_argument('--drones', type=int, default=5, help='drones at team')
+    parser.add_argument('--asteroids', type=int, default=27)
+    parser.add_argument('--field', type=int, nargs=2, default=(1200, 600), metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--can-fight', action='store_true')
+    parser.add_argument('--theme', default=DEFAULT_THEME_MOD_PATH, help='theme module path')
+    parser.add_argument('--set', dest='overrides', type=_parse_override, action='append', default=[],
+                        metavar='NAME=VALUE', help='theme constant override')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout, help='JSON lines output')
+    parser.add_argument('--replay-dir', default=None, help='write replay of every match to the directory')
+    parser.add_argument('--db', default=None, help='also store results in the SQLite database')
+    parser.add_argument('--db-batch', type=int, default=100, help='results per database transaction')
+    args = parser.parse_args(argv)
+
+    teams_per_match = args.teams_per_match or min(len(args.teams), 4)
+    try:
+        specs = round_robin(
+            args.teams, args.seeds, teams_per_match=teams_per_match,
+            drones_at_team=args.drones, asteroids_count=args.asteroids, can_fight=args.can_fight,
+            field=args.field, theme_overrides=dict(args.overrides), theme_mod_path=args.theme,
+        )
+    except TournamentException as exc:
+        parser.error(str(exc))
+    if args.replay_dir is not None:
+        os.makedirs(args.replay_dir, exist_ok=True)
+        for index, spec in enumerate(specs):
+            spec.replay_path = os.path.join(args.replay_dir, 'match-{:04d}-seed-{}.abr'.format(index, spec.seed))
+    failed = 0
+    # В базу пишет только этот процесс - рабочие процессы отдают результаты через пул
+    store = ResultStore(args.db, batch_size=args.db_batch) if args.db is not None else None
+    try:
+        with Tournament(processes=args.processes, preload=args.teams) as tournament:
+            for index, result, error in tournament.run(specs):
+                if error is not None:
+                    failed += 1
+                    print('match {} {!r} failed: {}'.format(index, specs[index], error), file=sys.stderr)
+                    continue
+                args.output.write(json.dumps(result) + '\n')
+                args.output.flush()
+                if store is not None:
+                    store.add(result)
+    finally:
+        if store is not None:
+            store.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
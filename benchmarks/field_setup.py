@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    Время подготовки сцены (SpaceField.prepare) в зависимости от числа астероидов.
+    Поле растет вместе с числом астероидов, плотность постоянная - как на обычной карте.
+    Отдельно - выбор ячеек для астероидов: прежний list.remove и текущий FreeCells.
+
+        python -m benchmarks.field_setup --asteroids 1000,10000,50000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from astrobox.core import Drone
+from astrobox.space_field import FreeCells, SpaceField
+
+# Площадь поля на астероид, как на карте 1200x600 с 27 астероидами
+AREA_PER_ASTEROID = 1200 * 600 // 27
+
+
+class BenchDrone(Drone):
+    pass
+
+
+def legacy_choose_cells(rnd, cells_count, asteroids_count):
+    # Реализация до FreeCells - для сравнения
+    cell_numbers = [i for i in range(cells_count)]
+    chosen = []
+    for _ in range(asteroids_count):
+        cell_number = rnd.choice(cell_numbers)
+        cell_numbers.remove(cell_number)
+        chosen.append(cell_number)
+    return chosen
+
+
+def current_choose_cells(rnd, cells_count, asteroids_count):
+    cell_numbers = FreeCells(cells_count)
+    return [cell_numbers.choice(rnd) for _ in range(asteroids_count)]
+
+
+def measure_cells(choose, asteroids_count, seed):
+    started = time.perf_counter()
+    chosen = choose(random.Random(seed), asteroids_count, asteroids_count)
+    return time.perf_counter() - started, chosen
+
+
+def measure_prepare(asteroids_count, seed):
+    side = int((asteroids_count * AREA_PER_ASTEROID) ** .5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scene = SpaceField(seed=seed, field=(side * 2, side), headless=True)
+        BenchDrone()
+        started = time.perf_counter()
+        scene.prepare(asteroids_count=asteroids_count)
+    return time.perf_counter() - started, (side * 2, side)
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.field_setup',
+                                     description='SpaceField.prepare time by asteroids count')
+    parser.add_argument('--asteroids', type=_int_list, default=[27, 1000, 10000, 50000],
+                        help='asteroids count list: 27,1000')
+    parser.add_argument('--legacy-limit', type=int, default=50000,
+                        help='skip the quadratic legacy cell choice above this count')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print('{:>10}{:>14}{:>12}{:>14}{:>16}{:>17}'.format(
+        'asteroids', 'field', 'prepare, s', 'us/asteroid', 'legacy cells, s', 'current cells, s'))
+    for count in args.asteroids:
+        seconds, field = measure_prepare(count, args.seed)
+        current, chosen = measure_cells(current_choose_cells, count, args.seed)
+        if count <= args.legacy_limit:
+            legacy, legacy_chosen = measure_cells(legacy_choose_cells, count, args.seed)
+            assert legacy_chosen == chosen, 'cell choice differs from the legacy one'
+            legacy = '{:.3f}'.format(legacy)
+        else:
+            legacy = '-'
+        print('{:>10}{:>14}{:>12.3f}{:>14.1f}{:>16}{:>17.3f}'.format(
+            count, '{}x{}'.format(*field), seconds, seconds / count * 1e6, legacy, current))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+    Микробенчмарк Drone.update_sleep_state: стоимость одного вызова на дрона
+    для прежнего строкового снимка состояния и текущего числового.
+
+        python -m benchmarks.sleep_state
+"""
+import argparse
+import timeit
+
+from robogame_engine.geometry import Vector
+
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+
+
+class BenchDrone(Drone):
+    pass
+
+
+def legacy_update_sleep_state(drone):
+    # Реализация до перехода на числовые снимки - для сравнения
+    new_state = '-'.join([str(getattr(drone, attr)) for attr in drone.sleep_attrs])
+    if drone._sleep_state is None or drone._sleep_state != new_state:
+        drone._sleep_state = new_state
+        drone._sleep_countdown = drone.scene.config.SLEEP_COUNTDOWN
+    elif drone._sleep_countdown > 0:
+        drone._sleep_countdown -= 1
+    else:
+        drone._sleep_countdown = drone.scene.config.SLEEP_COUNTDOWN
+
+
+def measure(update, drones, moving, number):
+    step = Vector(0.5, 0.25)
+
+    def tick():
+        for drone in drones:
+            if moving:
+                drone.coord += step
+            update(drone)
+
+    for drone in drones:
+        drone._sleep_state = None
+    seconds = min(timeit.repeat(tick, number=number, repeat=3))
+    return seconds / number / len(drones) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drone.update_sleep_state per-drone cost')
+    parser.add_argument('--drones', type=int, default=50)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    SpaceField(can_fight=True, headless=True)
+    drones = [BenchDrone() for _ in range(args.drones)]
+    print('{:<12}{:>14}{:>14}{:>10}'.format('state', 'legacy, us', 'current, us', 'speedup'))
+    for moving in (False, True):
+        legacy = measure(legacy_update_sleep_state, drones, moving, args.number)
+        current = measure(Drone.update_sleep_state, drones, moving, args.number)
+        print('{:<12}{:>14.3f}{:>14.3f}{:>9.1f}x'.format(
+            'moving' if moving else 'idle', legacy, current, legacy / current))
+
+
+if __name__ == '__main__':
+    main()
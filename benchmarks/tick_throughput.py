@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+    Пропускная способность симуляции: безголовые сцены по матрице размеров
+    (дронов в команде, команд, астероидов, мирная игра / бои).
+
+    Для каждого сценария три прогона с одним seed:
+        - чистый - тиков в секунду;
+        - с разметкой фаз - доли времени тика: боты, снаряды, прочие объекты,
+          перекрытия, служебная часть SpaceField.game_step и проверка конца игры;
+        - под tracemalloc - пиковая память (создание сцены и первые тики).
+
+        python -m benchmarks.tick_throughput --ticks 500 --output results.json
+        python -m benchmarks.tick_throughput --compare results.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+
+from robogame_engine import GameObject
+
+from astrobox.core import Drone
+from astrobox.guns import Projectile
+from astrobox.space_field import SpaceField
+
+TEAM_CLASSES = (
+    'demo.game.WorkerDrone',
+    'demo.game.GreedyDrone',
+    'demo.game.HunterDrone',
+    'demo.game.DestroyerDrone',
+)
+OBJECT_METHODS = ('proceed_events', 'proceed_commands', 'game_step')
+PHASES = ('drones', 'projectiles', 'other_objects', 'overlaps', 'scene', 'game_over_check')
+
+
+def _import_team(path):
+    from importlib import import_module
+
+    module_path, _, name = path.rpartition('.')
+    return getattr(import_module(module_path), name)
+
+
+class Scenario(object):
+
+    def __init__(self, drones, teams, asteroids, can_fight, field, seed):
+        self.drones = drones
+        self.teams = teams
+        self.asteroids = asteroids
+        self.can_fight = can_fight
+        self.field = field
+        self.seed = seed
+
+    @property
+    def key(self):
+        return _result_key(self.as_dict())
+
+    def as_dict(self):
+        return OrderedDict(
+            drones=self.drones, teams=self.teams, asteroids=self.asteroids,
+            can_fight=self.can_fight, field=list(self.field), seed=self.seed,
+        )
+
+    def make_scene(self):
+        scene = SpaceField(
+            name='Benchmark', field=self.field, speed=1, asteroids_count=self.asteroids,
+            can_fight=self.can_fight, max_drones_at_team=self.drones, seed=self.seed, headless=True,
+        )
+        for path in TEAM_CLASSES[:self.teams]:
+            drone_class = _import_team(path)
+            for _ in range(self.drones):
+                drone_class()
+        scene.prepare(**scene.init_kwargs)
+        return scene
+
+
+def run_ticks(scene, ticks):
+    """
+        Тики как в Scene.go, без UI. Возвращает число сделанных тиков (игра может кончиться раньше).
+    """
+    for _ in range(ticks):
+        scene._step += 1
+        scene.game_step()
+        is_game_over, _ = scene.get_game_result()
+        if is_game_over:
+            break
+    return scene._step
+
+
+class PhaseTimer(object):
+    """
+        Разметка фаз подменой методов на классах. Вложенные вызовы (super() в потомках)
+        засчитываются самому внешнему, так что время не считается дважды.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.__patched = []
+        self.__depth = 0
+
+    @staticmethod
+    def _object_phase(obj):
+        if isinstance(obj, Drone):
+            return 'drones'
+        if isinstance(obj, Projectile):
+            return 'projectiles'
+        return 'other_objects'
+
+    def _wrap(self, owner, name, phase=None):
+        original = owner.__dict__[name]
+        timer = self
+
+        def timed(obj, *args, **kwargs):
+            if timer.__depth:
+                return original(obj, *args, **kwargs)
+            timer.__depth += 1
+            started = time.perf_counter()
+            try:
+                return original(obj, *args, **kwargs)
+            finally:
+                timer.seconds[phase or timer._object_phase(obj)] += time.perf_counter() - started
+                timer.__depth -= 1
+
+        setattr(owner, name, timed)
+        self.__patched.append((owner, name, original))
+
+    def __enter__(self):
+        object_classes = set()
+        for cls in [GameObject] + _subclasses(GameObject):
+            for klass in cls.__mro__:
+                if issubclass(klass, GameObject):
+                    object_classes.add(klass)
+        for cls in object_classes:
+            for name in OBJECT_METHODS:
+                if name in cls.__dict__:
+                    self._wrap(cls, name)
+        self._wrap(SpaceField, '_get_overlap_map', phase='overlaps')
+        self._wrap(SpaceField, '_detect_overlaps', phase='overlaps')
+        self._wrap(SpaceField, 'get_game_result', phase='game_over_check')
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, name, original in reversed(self.__patched):
+            setattr(owner, name, original)
+        self.__patched = []
+
+    def measure(self, scene, ticks):
+        started = time.perf_counter()
+        done = 0
+        for _ in range(ticks):
+            scene._step += 1
+            step_started = time.perf_counter()
+            scene.game_step()
+            self.seconds['scene'] += time.perf_counter() - step_started
+            done += 1
+            if scene.get_game_result()[0]:
+                break
+        total = time.perf_counter() - started
+        # Служебная часть game_step - все, что не объекты и не перекрытия
+        inner = sum(self.seconds[phase] for phase in ('drones', 'projectiles', 'other_objects', 'overlaps'))
+        self.seconds['scene'] -= inner
+        return done, total
+
+
+def _subclasses(cls):
+    found = []
+    for subclass in cls.__subclasses__():
+        found.append(subclass)
+        found.extend(_subclasses(subclass))
+    return found
+
+
+def bench_scenario(scenario, ticks, memory_ticks):
+    result = scenario.as_dict()
+
+    scene = scenario.make_scene()
+    started = time.perf_counter()
+    done = run_ticks(scene, ticks)
+    seconds = time.perf_counter() - started
+    result['ticks'] = done
+    result['seconds'] = round(seconds, 4)
+    result['ticks_per_second'] = round(done / seconds, 2) if seconds else None
+
+    scene = scenario.make_scene()
+    with PhaseTimer() as timer:
+        done, total = timer.measure(scene, ticks)
+    result['phases_ms_per_tick'] = OrderedDict(
+        (phase, round(timer.seconds[phase] / done * 1000, 4)) for phase in PHASES)
+    result['instrumented_ms_per_tick'] = round(total / done * 1000, 4)
+
+    tracemalloc.start()
+    try:
+        scene = scenario.make_scene()
+        run_ticks(scene, memory_ticks)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result['peak_memory_kb'] = peak // 1024
+    return result
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def _fight_list(value):
+    modes = {'peace': False, 'fight': True}
+    try:
+        return [modes[item] for item in value.split(',')]
+    except KeyError:
+        raise argparse.ArgumentTypeError('modes: peace,fight')
+
+
+def compare(old, new):
+    old_results = {_result_key(item): item for item in old['scenarios']}
+    print('{:<24}{:>12}{:>12}{:>9}'.format('scenario', 'old tick/s', 'new tick/s', 'ratio'))
+    for item in new['scenarios']:
+        previous = old_results.get(_result_key(item))
+        if previous is None or not previous['ticks_per_second']:
+            continue
+        print('{:<24}{:>12.1f}{:>12.1f}{:>8.2f}x'.format(
+            _result_key(item), previous['ticks_per_second'], item['ticks_per_second'],
+            item['ticks_per_second'] / previous['ticks_per_second']))
+
+
+def _result_key(item):
+    return 'd{}-t{}-a{}-{}'.format(item['drones'], item['teams'], item['asteroids'],
+                                   'fight' if item['can_fight'] else 'peace')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.tick_throughput',
+                                     description='SpaceField tick throughput benchmark')
+    parser.add_argument('--drones', type=_int_list, default=[5, 10], help='drones at team list: 5,10')
+    parser.add_argument('--teams', type=_int_list, default=[2, 4], help='teams count list, up to 4')
+    parser.add_argument('--asteroids', type=_int_list, default=[27, 100], help='asteroids count list')
+    parser.add_argument('--modes', type=_fight_list, default=[False, True], help='peace,fight')
+    parser.add_argument('--field', type=int, nargs=2, default=(1200, 600), metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--ticks', type=int, default=500)
+    parser.add_argument('--memory-ticks', type=int, default=100, help='ticks under tracemalloc')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='JSON results file')
+    parser.add_argument('--compare', default=None, help='previous JSON results to compare with')
+    args = parser.parse_args(argv)
+    if any(teams < 1 or teams > len(TEAM_CLASSES) for teams in args.teams):
+        parser.error('teams count should be from 1 to {}'.format(len(TEAM_CLASSES)))
+
+    scenarios = [
+        Scenario(drones, teams, asteroids, can_fight, tuple(args.field), args.seed)
+        for drones, teams, asteroids, can_fight in itertools.product(
+            args.drones, args.teams, args.asteroids, args.modes)
+    ]
+    results = OrderedDict(
+        created_at=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        ticks=args.ticks,
+        scenarios=[],
+    )
+    print('{:<24}{:>8}{:>10}{:>11}  {}'.format('scenario', 'ticks', 'tick/s', 'peak, KB', 'ms per tick by phase'))
+    for scenario in scenarios:
+        # Сцена печатает рейтинг в конце игры - не мешаем таблице
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = bench_scenario(scenario, args.ticks, args.memory_ticks)
+        results['scenarios'].append(result)
+        phases = ' '.join('{}={:.2f}'.format(phase, ms) for phase, ms in result['phases_ms_per_tick'].items())
+        print('{:<24}{:>8}{:>10.1f}{:>11}  {}'.format(
+            scenario.key, result['ticks'], result['ticks_per_second'], result['peak_memory_kb'], phases))
+        sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as ff:
+            json.dump(results, ff, indent=2)
+    if args.compare:
+        with open(args.compare) as ff:
+            compare(json.load(ff), results)
+
+
+if __name__ == '__main__':
+    main()
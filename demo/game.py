@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from astrobox.space_field import SpaceField
-from astrobox.core import Drone, Unit
+from astrobox.core import Asteroid, Drone, Unit
 from astrobox.utils import nearest_angle_distance
 from demo.strategies import *
 from robogame_engine.geometry import Vector
@@ -15,9 +15,7 @@ class DroneUnitWithStrategies(Drone):
 
     def append_strategy(self, strategy):
         if strategy.is_group_unique:
-            for s in self.__strategies:
-                if s.group == strategy.group:
-                    self.__strategies.remove(s)
+            self.__strategies = [s for s in self.__strategies if s.group != strategy.group]
         self.__strategies.append(strategy)
 
     def clear_strategies(self):
@@ -28,12 +26,12 @@ class DroneUnitWithStrategies(Drone):
 
     def game_step(self):
         self.native_game_step()
-        for s in self.__strategies:
-            if s.is_finished:
-                self.__strategies.remove(s)
-                continue
-            s.game_step()
-            break
+        # Выполняется первая незаконченная стратегия, законченные перед ней убираем
+        strategies = self.__strategies
+        while strategies and strategies[0].is_finished:
+            del strategies[0]
+        if strategies:
+            strategies[0].game_step()
 
     @property
     def elerium_stocks(self):
@@ -70,28 +68,12 @@ class GreedyDrone(WorkerDrone):
         super(GreedyDrone, self).__init__(**kwargs)
 
     def get_nearest_elerium_stock(self):
-        elerium_stocks = [es for es in self.scene.asteroids if es.cargo.payload > 0]
-        for drone in self.teammates:
-            if drone.elerium_stock is not None and \
-                    not drone.cargo.is_full and \
-                    drone.elerium_stock in elerium_stocks:
-                elerium_stocks.remove(drone.elerium_stock)
-
-        if not elerium_stocks:
-            return None
-        # Берем наибольшее кол-во elerium-а, что сможем унести, из ближайшего
-        elerium_stocks = sorted(elerium_stocks, key=lambda x: x.distance_to(self))
-        nearest_stock = None
-        max_elerium = 0
-        for stock in elerium_stocks:
-            if stock.cargo.payload >= self.cargo.free_space:
-                return stock
-            if stock.cargo.payload > max_elerium:
-                nearest_stock = stock
-                max_elerium = stock.cargo.payload
+        # Берем ближайший, из которого унесем полный трюм, иначе - самый богатый
+        stocks = self.scene.elerium_stocks
+        nearest_stock = stocks.nearest(self, cls=Asteroid, for_drone=self, min_payload=self.cargo.free_space)
         if nearest_stock:
-            return nearest_stock
-        return random.choice(elerium_stocks)
+            return nearest_stock[0]
+        return stocks.richest(self, cls=Asteroid, for_drone=self)
 
 
 class HunterDrone(GreedyDrone):
@@ -104,7 +86,6 @@ class HunterDrone(GreedyDrone):
         self._victim = None
         # self._no_victim_strategy = False
         self._victim_stamp = 0
-        self._next_victim = None
         self.substrategy = None
 
     @property
@@ -122,32 +103,14 @@ class HunterDrone(GreedyDrone):
         pass
 
     def get_nearest_elerium_stock(self):
-        # Сперва сбор элериума с жертв
-        elerium_stocks = [drone for drone in self.scene.drones
-                          if not drone.is_alive and drone.cargo.payload > 0]
-        for drone in self.teammates:
-            if drone.elerium_stock is not None and \
-                    not drone.cargo.is_full and \
-                    drone.elerium_stock in elerium_stocks:
-                elerium_stocks.remove(drone.elerium_stock)
-        if elerium_stocks:
-            elerium_stocks = sorted(elerium_stocks, key=lambda x: x.distance_to(self))
-            return elerium_stocks[0]
-
-        # Потом с астероидов
-        elerium_stocks = [asteriod for asteriod in self.scene.asteroids if asteriod.cargo.payload > 0]
-        for drone in self.teammates:
-            if drone.elerium_stock is not None and \
-                    not drone.cargo.is_full and \
-                    drone.elerium_stock in elerium_stocks:
-                elerium_stocks.remove(drone.elerium_stock)
-        if not elerium_stocks:
-            return None
-        elerium_stocks = sorted(elerium_stocks, key=lambda x: x.distance_to(self))
-        return elerium_stocks[0]
+        # Сперва сбор элериума с жертв, потом с астероидов
+        for cls in (Drone, Asteroid):
+            elerium_stocks = self.scene.elerium_stocks.nearest(self, cls=cls, for_drone=self)
+            if elerium_stocks:
+                return elerium_stocks[0]
+        return None
 
     def set_victim(self, victim):
-        self._next_victim = None
         self._victim = victim
         self._victim_stamp = 0
         if not self.substrategy.is_finished:
@@ -179,10 +142,9 @@ class HunterDrone(GreedyDrone):
             ):
                 self.gun.shot(self.victim)
         else:
-            enemies = [enemy for enemy in self.scene.drones
-                       if enemy.team != self.team and enemy.is_alive and
-                       enemy.distance_to(self) < self.gun.shot_distance]
-            enemie = sorted(enemies, key=lambda x: -x.cargo.payload)
+            enemies = self.scene.spatial_index.query_radius(
+                self, self.gun.shot_distance, cls=Drone, exclude_team=self.team,
+                predicate=lambda enemy: enemy.is_alive)
             for enemy in enemies:
                 vector = Vector.from_points(self.coord, enemy.coord)
                 if abs(nearest_angle_distance(vector.direction, self.direction)) < 7:
@@ -194,7 +156,7 @@ class HunterDrone(GreedyDrone):
 class RunnerDrone(DroneUnitWithStrategies):
 
     def any_asteroid(self):
-        return random.choice(self.scene.asteroids)
+        return self.scene.random.choice(self.scene.asteroids)
 
     def on_born(self):
         self.append_strategy(StrategyApproach(unit=self, target_point=self.any_asteroid().coord, distance=0))
@@ -212,7 +174,6 @@ class DestroyerDrone(DroneUnitWithStrategies):
     def __init__(self, **kwargs):
         super(DestroyerDrone, self).__init__(**kwargs)
         self._victim = None
-        self._next_victim = None
         self._target_mship = None
         self._elerium_stock = None
 
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
-import random
-
-from robogame_engine.theme import theme
+import weakref
 
+from astrobox.behaviour import DONE, FAIL, Approach, Behaviour, Decide, Pause, StateMachine, Transfer
 from astrobox.cargo import CargoTransition, CargoException
+from astrobox.core import Asteroid, Drone, MotherShip
 
 
 class Strategy(object):
@@ -82,27 +82,28 @@ class StrategyApproach(Strategy):
         super(StrategyApproach, self).__init__(**kwargs)
         self._target_point = target_point
         self._target_distance = distance
-        self.__done = False
-        self.__last_distance = None
         self.__conditional_approach = condition
+        # Прибытие отслеживает сцена раз в тик; у дрона один такой триггер - новый подход заменяет прежний
+        self.__arrival = self.unit.when_near(target_point, distance + 1, key='approach')
+
+    @property
+    def is_arrived(self):
+        if self.__arrival.is_met is None or self.__arrival.cancelled:
+            # Сцена еще не проверяла триггер (или его заменил другой подход) - считаем сами
+            return int(self.unit.distance_to(self._target_point)) <= self._target_distance
+        return self.__arrival.is_met
 
     @property
     def is_finished(self):
         # Если установлено условие сближения и оно ложно, заканчиваем выполненение
         if self.__conditional_approach is not None and not self.__conditional_approach():
             return True
-        return int(self.unit.distance_to(self._target_point)) <= self._target_distance
+        return self.is_arrived
 
     def game_step(self):
-        new_distance = int(self.unit.distance_to(self._target_point))
-        if self.__last_distance is not None and new_distance < self.__last_distance:
-            self.__last_distance = new_distance
+        if self.unit.is_moving or self.is_arrived:
             return
-        if self.unit.is_moving:
-            return
-        if new_distance > self._target_distance:
-            self.__last_distance = new_distance
-            self.unit.move_at(self._target_point.copy(), speed=theme.DRONE_SPEED)
+        self.unit.move_at(self._target_point.copy(), speed=self.unit.scene.config.DRONE_SPEED)
 
 
 # Комбинированные стратегии
@@ -110,41 +111,39 @@ class StrategySequence(Strategy):
     def __init__(self, *strategies, **kwargs):
         super(StrategySequence, self).__init__(**kwargs)
         self.__strategies = strategies
-        self.__current_strategy = self.__strategies[0] if self.__strategies else None
+        # Номер текущей стратегии, None - последовательность закончена
+        self.__current = 0 if self.__strategies else None
 
     def _next_strategy(self):
-        if self.__current_strategy is None:
+        if self.__current is None:
             return False
-        strategy_id = self.__strategies.index(self.__current_strategy)
-        if strategy_id < 0 or strategy_id + 1 >= len(self.__strategies):
-            self.__current_strategy = None
+        if self.__current + 1 >= len(self.__strategies):
+            self.__current = None
             return False
-        self.__current_strategy = self.__strategies[strategy_id + 1]
+        self.__current += 1
         return True
 
     def __str__(self):
         strout = "{} {} {}(".format(self.__class__.__name__, self.unit.__class__.__name__, self.unit)
-        for s in self.__strategies:
-            strout += ("{}" if self.__strategies.index(s) == 0 else ", {}").format(str(s))
-        return strout + ")"
+        return strout + ", ".join(str(s) for s in self.__strategies) + ")"
 
     @property
     def is_finished(self):
-        return self.__current_strategy is None
+        return self.__current is None
 
     def game_step(self):
-        if self.__current_strategy is None:
+        if self.__current is None:
             return
-        if self.__current_strategy.is_finished:
+        if self.__strategies[self.__current].is_finished:
             if not self._next_strategy():
                 return
-        self.__current_strategy.game_step()
+        self.__strategies[self.__current].game_step()
 
 
 class StrategyApproachAndLoad(StrategySequence):
     def __init__(self, unit=None, target_unit=None, distance=None, **kwargs):
         if distance is None:
-            distance = theme.CARGO_TRANSITION_DISTANCE - 1
+            distance = unit.scene.config.CARGO_TRANSITION_DISTANCE - 1
         try:
             self.strategies = [
             StrategyApproach(unit=unit, target_point=target_unit.coord, distance=distance,
@@ -175,100 +174,135 @@ class StrategyApproachAndUnload(StrategySequence):
 
 
 # Комплексные стратегии
+def _choose_harvest_target(unit, memory):
+    return memory.harvesting.choose_target(memory)
+
+
+def _target_have_elerium(unit, memory):
+    return memory.target.cargo.payload > 0
+
+
+# Рейс за элериумом и обратно. После переноса груза дрон тик стоит, как раньше в StrategySequence
+HARVESTING = StateMachine([
+    ('choose', Decide(_choose_harvest_target),
+     {'load': 'approach&load', 'unload': 'approach&unload', 'wander': 'approach'}),
+    ('approach&load', Approach(distance=None, condition=_target_have_elerium), {DONE: 'load'}),
+    ('load', Transfer(load=True), {DONE: 'loaded', FAIL: 'failed'}),
+    ('loaded', Pause(1), {DONE: 'choose'}),
+    ('approach&unload', Approach(), {DONE: 'unload'}),
+    ('unload', Transfer(load=False), {DONE: 'unloaded', FAIL: 'failed'}),
+    ('unloaded', Pause(1), {DONE: 'choose'}),
+    ('approach', Approach(), {DONE: 'choose'}),
+    ('failed', Pause(1), {DONE: 'choose'}),
+])
+
+# Состояния автомата под именами прежних подстратегий
+_HARVESTING_STRATEGY_IDS = {
+    'approach&load': 'approach&load', 'load': 'approach&load', 'loaded': 'approach&load',
+    'approach&unload': 'approach&unload', 'unload': 'approach&unload', 'unloaded': 'approach&unload',
+    'approach': 'approach',
+}
+
+
 class StrategyHarvesting(Strategy):
     def __init__(self, unit=None):
         super(StrategyHarvesting, self).__init__(unit=unit, id="harvesting", group="harvest", is_group_unique=True)
-        self.__substrategy = None
         assert unit is not None
         assert hasattr(unit, 'elerium_stock')
+        self.__behaviour = Behaviour(HARVESTING, unit, harvesting=self, target=None)
 
     def anyAsteroid(self):
-        return random.choice(self.unit.scene.asteroids)
+        return self.unit.scene.random.choice(self.unit.scene.asteroids)
 
     def reset(self):
-        self.__substrategy = None
+        self.__behaviour.reset()
 
     @property
     def current_strategy_id(self):
-        if self.__substrategy is not None:
-            return self.__substrategy.id
-        return ""
+        return _HARVESTING_STRATEGY_IDS.get(self.__behaviour.state, "")
 
     def get_nearest_elerium_stock(self):
-        elerium_stocks = [asteriod for asteriod in self.unit.scene.asteroids if asteriod.cargo.payload > 0]
-        elerium_stocks += [drone for drone in self.unit.scene.drones if not drone.is_alive and drone.cargo.payload > 0]
-        for drone in self.unit.teammates:
-            if drone.elerium_stock is not None and \
-                    not drone.cargo.is_full and \
-                    drone.elerium_stock in elerium_stocks:
-                elerium_stocks.remove(drone.elerium_stock)
-
+        # Источники, уже занятые союзниками, пропускаем
+        elerium_stocks = self.unit.scene.elerium_stocks.nearest(self.unit, cls=(Asteroid, Drone), for_drone=self.unit)
         if not elerium_stocks:
             return None
-        elerium_stocks = sorted(elerium_stocks, key=lambda x: x.distance_to(self.unit))
         return elerium_stocks[0]
 
-    def game_step(self):
+    def __set_elerium_stock(self, stock):
+        self.unit.set_elerium_stock(stock)
+        self.unit.scene.elerium_stocks.reserve(self.unit, stock)
+
+    def choose_target(self, memory):
         # Даем возможность переопределять выбор источника elerium'а
         nearest_calc = self.unit if hasattr(self.unit, 'get_nearest_elerium_stock') else self
-        if self.__substrategy is None or self.__substrategy.is_finished:
-            if self.unit.cargo.is_full:
-                self.unit.set_elerium_stock(None)
-                self.__substrategy = StrategyApproachAndUnload(unit=self.unit, target_unit=self.unit.mothership)
-            else:
-                near_elerium_stock = nearest_calc.get_nearest_elerium_stock()
-                if near_elerium_stock is not None:
-                    self.unit.set_elerium_stock(near_elerium_stock)
-                    self.__substrategy = StrategyApproachAndLoad(unit=self.unit, target_unit=near_elerium_stock)
-                else:
-                    if self.unit.cargo.payload > 0 and not self.unit.mothership.cargo.is_full:
-                        self.unit.set_elerium_stock(None)
-                        self.__substrategy = StrategyApproachAndUnload(unit=self.unit,
-                                                                       target_unit=self.unit.mothership)
-                    else:
-                        # Делаем видимость загруженности дрона работой
-                        self.__substrategy = StrategyApproach(unit=self.unit, target_point=self.anyAsteroid().coord)
-        if self.__substrategy is not None:
-            self.__substrategy.game_step()
+        if self.unit.cargo.is_full:
+            self.__set_elerium_stock(None)
+            memory.target = self.unit.mothership
+            return 'unload'
+        near_elerium_stock = nearest_calc.get_nearest_elerium_stock()
+        if near_elerium_stock is not None:
+            self.__set_elerium_stock(near_elerium_stock)
+            memory.target = near_elerium_stock
+            return 'load'
+        if self.unit.cargo.payload > 0 and not self.unit.mothership.cargo.is_full:
+            self.__set_elerium_stock(None)
+            memory.target = self.unit.mothership
+            return 'unload'
+        # Делаем видимость загруженности дрона работой
+        memory.target = self.anyAsteroid().coord
+        return 'wander'
+
+    def game_step(self):
+        self.__behaviour.game_step()
 
 
 class StrategyHunting(Strategy):
-    _teams_strategies = {}
+    # Стратегии команд храним по сценам - в одном процессе может пройти несколько игр подряд
+    _teams_strategies = weakref.WeakKeyDictionary()
 
     @classmethod
     def getTeamStrategy(cls, team, hunter):
-        if team not in cls._teams_strategies:
-            cls._teams_strategies[team] = StrategyHunting(unit=hunter, id="hunting", group="hunting",
-                                                          is_group_unique=True)
-        return cls._teams_strategies[team]
+        scene_strategies = cls._teams_strategies.setdefault(hunter.scene, {})
+        if team not in scene_strategies:
+            scene_strategies[team] = StrategyHunting(unit=hunter, id="hunting", group="hunting",
+                                                     is_group_unique=True)
+        return scene_strategies[team]
 
     def __init__(self, **kwargs):
         super(StrategyHunting, self).__init__(**kwargs)
         self._hunters = []
         self._victims = []
 
+    @staticmethod
+    def is_victim_valid(hunter):
+        victim = hunter.victim
+        return victim is not None \
+            and victim.distance_to(victim.mothership) > hunter.scene.config.MOTHERSHIP_SAFE_DISTANCE \
+            and victim.cargo.payload > 0
+
+    def assign_victims(self, scene, team):
+        """
+            Раз в тик на всю команду: свободным охотникам - ближайших по сумме расстояний жертв
+        """
+        hunters = [mate for mate in self._hunters if mate.is_alive and not mate.is_unloading]
+        taken = set(mate.victim for mate in hunters if self.is_victim_valid(mate))
+        hunters = [mate for mate in hunters if not self.is_victim_valid(mate)]
+        # Дроны оппонентов с непустым карго дальше безопасной дистанции от своей базы
+        safe_distance = scene.config.MOTHERSHIP_SAFE_DISTANCE
+        victims = [enemy for enemy in scene.enemy_drones(team)
+                   if enemy.cargo.payload > 0 and enemy not in taken
+                   and enemy.distance_to(enemy.mothership) > safe_distance]
+        scene.target_assignment.assign(team, hunters, victims)
+
     def get_victim(self, hunter):
         if hunter not in self._hunters:
             self._hunters.append(hunter)
-
-        if hunter.victim is not None \
-                and hunter.victim.distance_to(hunter.victim.mothership) > theme.MOTHERSHIP_SAFE_DISTANCE \
-                and hunter.victim.cargo.payload > 0:
+        if self.is_victim_valid(hunter):
             return hunter.victim
-
-        # Все дроны оппонентов с непустым карго
-        enemies = [drone for drone in hunter.scene.drones if
-                   drone.team != hunter.team and drone.is_alive and drone.cargo.payload > 0]
-        # Дроны оппонетнов дальше, чем дистанция до их mothership-а
-        enemies = [enemy for enemy in enemies if enemy.distance_to(enemy.mothership) > theme.MOTHERSHIP_SAFE_DISTANCE]
-        for mate in self._hunters:
-            if hunter != mate and mate.victim is not None and mate.victim in enemies:
-                enemies.remove(mate.victim)
-        victim = None
-        for enemy in enemies:
-            if victim is None or hunter.distance_to(enemy) < hunter.distance_to(victim):
-                victim = enemy
-        return victim
+        assignment = hunter.scene.target_assignment
+        if not assignment.is_assigned(hunter.team):
+            self.assign_victims(hunter.scene, hunter.team)
+        return assignment.target_for(hunter)
 
     def game_step(self, hunter):
         if not hasattr(hunter, 'substrategy') or hunter.substrategy is None:
@@ -276,7 +310,7 @@ class StrategyHunting(Strategy):
 
         if hunter.victim is not None and (not hunter.victim.is_alive or
                                           int(hunter.victim.distance_to(
-                                              hunter.victim.mothership)) < theme.MOTHERSHIP_HEALING_DISTANCE):
+                                              hunter.victim.mothership)) < hunter.scene.config.MOTHERSHIP_HEALING_DISTANCE):
             hunter._victim = None
             hunter._victim_stamp = 0
 
@@ -289,31 +323,11 @@ class StrategyHunting(Strategy):
         # Разгрузимся, чтобы не потерять нажитое
         if hunter.is_unloading:
             # Собираем елериум пока не нашли жертву
-            # print(self.__class__.__name__+"::game_step", "bringing elerium to mothership")
             hunter.substrategy.game_step()
             return
 
-        # Получим ближайшую жертву от другого вызова game_step
-        if hunter._next_victim is not None:
-            if hunter.victim is None:
-                move_at_point = hunter.set_victim(hunter._next_victim)
-
-        # Выберем ближашего свободного союзника
-        victim = None
-        while True:
-            victim = self.get_victim(hunter)
-            if victim is None:
-                break
-            victim_distance = victim.distance_to(hunter)
-            closertm = [mate for mate in hunter.teammates if
-                        mate.victim is None and mate.distance_to(victim) < victim_distance]
-            closertm = [mate for mate in closertm if mate._next_victim is None and not mate.is_unloading]
-            if not closertm:
-                # нет никого свобожного ближе
-                break
-            closertm = sorted(closertm, key=lambda x: x.distance_to(victim))
-            closertm[0]._next_victim = victim
-            victim = None
+        # Жертву назначает команда - ближайшему к ней свободному охотнику
+        victim = self.get_victim(hunter)
         is_new_victim = victim is not None and hunter.victim != victim
 
         if is_new_victim:
@@ -324,7 +338,7 @@ class StrategyHunting(Strategy):
                 hunter._victim_stamp = 0
                 move_at_point = hunter.victim.coord.copy()
         if move_at_point is not None and int(hunter.distance_to(move_at_point)) > hunter.radius:
-            hunter.move_at(move_at_point.copy(), speed=theme.DRONE_SPEED)
+            hunter.move_at(move_at_point.copy(), speed=hunter.scene.config.DRONE_SPEED)
 
         # Собираем елериум пока не нашли жертву
         if hunter.victim is None and victim is None:
@@ -348,9 +362,9 @@ class StrategyDestroyer(Strategy):
         assert hasattr(self.unit, 'elerium_stock')
 
     def nearest_enemy_mothership(self):
-        motherships = [m for m in self.unit.scene.motherships if m.team != self.unit.team and m.is_alive]
+        motherships = self.unit.scene.spatial_index.nearest(
+            self.unit, cls=MotherShip, exclude_team=self.unit.team, predicate=lambda m: m.is_alive)
         if motherships:
-            motherships = sorted(motherships, key=lambda x: x.distance_to(self.unit))
             return motherships[0]
         return None
 
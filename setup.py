@@ -14,7 +14,7 @@ with open('requirements.txt') as ff:
 setuptools.setup(
     name='astrobox',
     version='1.6.0',
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     license='BSD License',
     description='The package allows you to create Astro Robo Game for programmers.',
@@ -32,4 +32,7 @@ setuptools.setup(
         'Programming Language :: Python :: 3.8',
     ],
     install_requires=install_requires,
+    extras_require={
+        'env': ['numpy'],
+    },
 )
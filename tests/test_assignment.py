@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import itertools
+import random
+from unittest import TestCase, skipIf
+
+from astrobox import bulk
+from astrobox.assignment import TargetAssignment, hungarian
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class HunterDrone(Drone):
+    pass
+
+
+class VictimDrone(Drone):
+    pass
+
+
+def brute_force(costs):
+    rows, cols = len(costs), len(costs[0])
+    if rows <= cols:
+        return min(sum(costs[row][col] for row, col in enumerate(perm))
+                   for perm in itertools.permutations(range(cols), rows))
+    return brute_force([list(column) for column in zip(*costs)])
+
+
+class TestHungarian(TestCase):
+
+    def test_optimal(self):
+        rnd = random.Random(1)
+        for rows, cols in ((1, 1), (3, 3), (4, 6), (6, 4), (5, 5)):
+            for _ in range(20):
+                costs = [[rnd.randint(0, 50) for _ in range(cols)] for _ in range(rows)]
+                result = hungarian(costs)
+                chosen = [col for col in result if col is not None]
+                self.assertEqual(len(chosen), min(rows, cols))
+                self.assertEqual(len(set(chosen)), len(chosen))
+                total = sum(costs[row][col] for row, col in enumerate(result) if col is not None)
+                self.assertEqual(total, brute_force(costs))
+
+    def test_empty(self):
+        self.assertEqual(hungarian([]), [])
+        self.assertEqual(hungarian([[], []]), [None, None])
+
+
+class TestTargetAssignment(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=5, field=(1000, 600), headless=True)
+        self.hunters = [HunterDrone() for _ in range(3)]
+        self.victims = [VictimDrone() for _ in range(2)]
+        self.scene.prepare(asteroids_count=1)
+        for i, drone in enumerate(self.hunters):
+            drone.coord = Point(100 + i * 300, 100)
+        for i, drone in enumerate(self.victims):
+            drone.coord = Point(150 + i * 600, 300)
+        self.team = self.hunters[0].team
+
+    def test_assign_once_per_tick(self):
+        assignment = self.scene.target_assignment
+        self.assertFalse(assignment.is_assigned(self.team))
+        assigned = assignment.assign(self.team, self.hunters, self.victims)
+        # Каждой жертве - ближайший охотник, третий остается без цели
+        self.assertEqual(assigned, {self.hunters[0]: self.victims[0], self.hunters[2]: self.victims[1]})
+        self.assertTrue(assignment.is_assigned(self.team))
+        self.assertIsNone(assignment.target_for(self.hunters[1]))
+        self.assertEqual(assignment.target_for(self.hunters[2]), self.victims[1])
+        self.scene.advance(1)
+        self.assertFalse(assignment.is_assigned(self.team))
+        self.assertIsNone(assignment.target_for(self.hunters[2]))
+
+    def test_forbidden_pairs(self):
+        costs = [[None, 10], [1, None], [None, None]]
+        assigned = self.scene.target_assignment.assign(self.team, self.hunters, self.victims, costs=costs)
+        self.assertEqual(assigned, {self.hunters[0]: self.victims[1], self.hunters[1]: self.victims[0]})
+        costs = [[None, None]] * 3
+        self.assertEqual(self.scene.target_assignment.assign(self.team, self.hunters, self.victims, costs=costs), {})
+
+    def test_negative_costs(self):
+        # Стоимость - выгода со знаком минус: допустимые пары не должны теряться из-за запрещенных
+        assignment = self.scene.target_assignment
+        hunter, other = self.hunters[:2]
+        first, second = self.victims
+        self.assertEqual(assignment.assign(self.team, [hunter], self.victims, costs=[[-10, None]]), {hunter: first})
+        costs = [[-10, None], [None, -5]]
+        self.assertEqual(assignment.assign(self.team, [hunter, other], self.victims, costs=costs),
+                         {hunter: first, other: second})
+        costs = [[-10, -30], [-20, None], [None, None]]
+        self.assertEqual(assignment.assign(self.team, self.hunters, self.victims, costs=costs),
+                         {hunter: second, other: first})
+
+    @skipIf(bulk.numpy is None, 'NumPy is not installed')
+    def test_numpy_distances_match_loop(self):
+        points = [Point(random.Random(i).uniform(0, 1000), i * 7.5) for i in range(40)]
+        units = [HunterDrone(coord=point) for point in points]
+        by_numpy = TargetAssignment(self.scene, use_numpy=True).distances(units, units[::-1])
+        by_loop = TargetAssignment(self.scene, use_numpy=False).distances(units, units[::-1])
+        for row_numpy, row_loop in zip(by_numpy, by_loop):
+            for numpy_value, loop_value in zip(row_numpy, row_loop):
+                self.assertAlmostEqual(numpy_value, loop_value)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.behaviour import DONE, FAIL, Approach, Behaviour, Decide, Node, Pause, StateMachine, Transfer
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class BehaviourDrone(Drone):
+    pass
+
+
+class Count(Node):
+
+    def enter(self, unit, memory):
+        memory.entered += 1
+
+    def check(self, unit, memory):
+        return DONE if memory.steps >= 2 else None
+
+    def step(self, unit, memory):
+        memory.steps += 1
+
+
+class FakeScene(object):
+    _step = 0
+
+
+class FakeUnit(object):
+    scene = FakeScene()
+
+
+class TestStateMachine(TestCase):
+
+    def test_compile_errors(self):
+        with self.assertRaises(ValueError):
+            StateMachine([])
+        with self.assertRaises(ValueError):
+            StateMachine([('a', Node(), {}), ('a', Node(), {})])
+        with self.assertRaises(ValueError):
+            StateMachine([('a', Node(), {DONE: 'b'})])
+        with self.assertRaises(ValueError):
+            StateMachine([('a', Node(), {})], initial='b')
+
+    def test_transitions(self):
+        machine = StateMachine([
+            ('first', Count(), {DONE: 'second'}),
+            ('second', Decide(lambda unit, memory: 'again' if memory.entered < 2 else 'stop'),
+             {'again': 'first', 'stop': None}),
+        ])
+        self.assertEqual(machine.transitions, ({DONE: 1}, {'again': 0, 'stop': -1}))
+        behaviour = Behaviour(machine, FakeUnit(), entered=0, steps=0)
+        states = []
+        for _ in range(4):
+            behaviour.game_step()
+            states.append(behaviour.state)
+        # Решение принимается в том же тике, в котором закончился предыдущий узел
+        self.assertEqual(states, ['first', 'first', 'first', None])
+        self.assertEqual(behaviour.memory.entered, 2)
+        self.assertTrue(behaviour.is_finished)
+        behaviour.reset()
+        self.assertEqual(behaviour.state, 'first')
+
+    def test_instant_cycle_and_unknown_outcome(self):
+        machine = StateMachine([
+            ('a', Decide(lambda unit, memory: 'go'), {'go': 'b'}),
+            ('b', Decide(lambda unit, memory: 'go'), {'go': 'a'}),
+        ])
+        behaviour = Behaviour(machine, FakeUnit())
+        behaviour.game_step()
+        self.assertEqual(behaviour.state, 'a')
+        behaviour = Behaviour(StateMachine([('a', Decide(lambda unit, memory: 'oops'), {})]), FakeUnit())
+        with self.assertRaises(ValueError):
+            behaviour.game_step()
+
+    def test_pause(self):
+        unit = FakeUnit()
+        unit.scene = FakeScene()
+        behaviour = Behaviour(StateMachine([('wait', Pause(3), {DONE: None})]), unit)
+        for step in range(1, 5):
+            unit.scene._step = step
+            behaviour.game_step()
+            self.assertEqual(behaviour.is_finished, step == 4)
+
+
+class TestHarvestMachine(TestCase):
+    machine = StateMachine([
+        ('approach', Approach(distance=None), {DONE: 'load'}),
+        ('load', Transfer(load=True), {DONE: 'home', FAIL: None}),
+        ('home', Approach('home'), {DONE: 'unload'}),
+        ('unload', Transfer('home', load=False), {DONE: None}),
+    ])
+
+    def setUp(self):
+        self.scene = SpaceField(seed=6, field=(1000, 600), headless=True)
+        self.drone = BehaviourDrone()
+        self.scene.prepare(asteroids_count=1)
+        self.asteroid = self.scene.asteroids[0]
+        self.asteroid.coord = Point(600, 300)
+        self.scene.spatial_index.update(self.asteroid)
+
+    def run_behaviour(self, behaviour, ticks=600):
+        for _ in range(ticks):
+            if behaviour.is_finished:
+                break
+            with self.scene.active():
+                behaviour.game_step()
+            self.scene.advance(1)
+
+    def test_trip_reuses_transition(self):
+        payload = self.asteroid.payload
+        behaviour = Behaviour(self.machine, self.drone, target=self.asteroid, home=self.drone.mothership)
+        self.run_behaviour(behaviour)
+        self.assertTrue(behaviour.is_finished)
+        self.assertEqual(self.drone.payload, 0)
+        self.assertGreater(self.drone.mothership.payload, 0)
+        self.assertEqual(self.drone.mothership.payload, payload - self.asteroid.payload)
+        transition = behaviour.memory.transition
+        behaviour.reset()
+        self.run_behaviour(behaviour)
+        self.assertIs(behaviour.memory.transition, transition)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.cpu_budget import CpuAccounting
+from astrobox.space_field import SpaceField
+
+
+def burn(seconds):
+    started = time.process_time()
+    while time.process_time() - started < seconds:
+        pass
+
+
+class SlowDrone(Drone):
+
+    def __init__(self, **kwargs):
+        super(SlowDrone, self).__init__(**kwargs)
+        self.thoughts = 0
+
+    def on_born(self):
+        self.move_at(self.scene.asteroids[0])
+
+    def game_step(self):
+        super(SlowDrone, self).game_step()
+        self.thoughts += 1
+        burn(0.002)
+
+
+class FastDrone(Drone):
+
+    def on_born(self):
+        self.move_at(self.scene.asteroids[0])
+
+
+class TestCpuBudget(TestCase):
+
+    def play(self, steps=20, **theme_overrides):
+        scene = SpaceField(seed=2, field=(900, 600), headless=True, theme_overrides=theme_overrides)
+        slow = SlowDrone()
+        FastDrone()
+        scene.prepare(asteroids_count=2)
+        scene.advance(steps)
+        return scene, slow
+
+    def test_accounting(self):
+        scene, slow = self.play()
+        self.assertEqual(slow.thoughts, 20)
+        accounting = scene.cpu_accounting
+        self.assertGreaterEqual(accounting.by_team[slow.team], 0.04)
+        self.assertLess(accounting.by_team['FastDrone'], accounting.by_team[slow.team] / 10)
+        self.assertAlmostEqual(accounting.by_drone[slow.id], accounting.by_team[slow.team])
+        result = accounting.result()
+        self.assertEqual(set(result['cpu_time']), {slow.team, 'FastDrone'})
+        self.assertNotIn('cpu_skipped', result)
+
+    def test_throttle(self):
+        scene, slow = self.play(DRONE_CPU_BUDGET=0.0005)
+        # Каждый тик с кодом стоит ~4 бюджета - примерно один тик из четырех-пяти
+        self.assertLessEqual(slow.thoughts, 6)
+        self.assertEqual(scene.cpu_accounting.skipped[slow.team] + slow.thoughts, 20)
+        self.assertNotIn('FastDrone', scene.cpu_accounting.skipped)
+        # Движок дрона шагает и без его кода
+        self.assertGreater(slow.distance_to(slow.my_mothership), 0)
+        self.assertTrue(slow.is_moving)
+
+    def test_skip(self):
+        scene, slow = self.play(DRONE_CPU_BUDGET=0.0005, DRONE_CPU_OVERRUN='skip')
+        self.assertEqual(slow.thoughts, 10)
+        self.assertEqual(scene.cpu_accounting.result()['cpu_skipped'], {slow.team: 10})
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            CpuAccounting(budget=1, overrun='kill')
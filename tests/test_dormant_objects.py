@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Asteroid, Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class LooterDrone(Drone):
+
+    def __init__(self, **kwargs):
+        super(LooterDrone, self).__init__(**kwargs)
+        self.overlaps = []
+
+    def on_overlap_with(self, obj_status):
+        self.overlaps.append(obj_status)
+
+
+class TestDormantObjects(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(can_fight=True, theme_overrides=dict(DRONE_DEAD_SPEED_DECELERATION=1))
+        self.drone = LooterDrone()
+        self.scene.prepare(asteroids_count=1)
+        for asteroid in self.scene.asteroids:
+            self.scene.remove_object(asteroid)
+        self.asteroid = Asteroid(coord=Point(300, 300), elerium=100)
+        self.move_drone(300, 300)
+
+    def step(self, count=1):
+        for _ in range(count):
+            self.scene._step += 1
+            self.scene.game_step()
+
+    def move_drone(self, x, y):
+        self.drone.coord = Point(x, y)
+        self.scene.spatial_index.update(self.drone)
+
+    def test_asteroid_rotates_while_dormant(self):
+        self.move_drone(300, 400)
+        self.step()
+        self.assertTrue(self.scene.is_dormant(self.asteroid))
+        direction = self.asteroid.direction
+        self.step(10)
+        rotation = (self.asteroid.direction - direction) % 360
+        self.assertAlmostEqual(rotation, 10 * self.scene.config.ASTEROID_ROTATION_SPEED)
+        self.assertIn(self.asteroid, self.scene.spatial_index.query_radius(Point(300, 300), 1))
+
+    def test_cargo_transition_wakes_up(self):
+        speed = self.scene.config.CARGO_TRANSITION_SPEED
+        self.step()
+        self.assertTrue(self.scene.is_dormant(self.asteroid))
+        self.drone.load_from(self.asteroid)
+        # Перенос затрагивает трюм астероида - астероид просыпается сразу же
+        self.drone._transition.game_step()
+        self.assertFalse(self.scene.is_dormant(self.asteroid))
+        self.assertEqual(self.asteroid.payload, 100 - speed)
+        self.step()
+        self.assertEqual(self.asteroid.payload, 100 - 2 * speed)
+
+    def test_overlap_with_dormant_asteroid(self):
+        self.step(2)
+        self.assertTrue(self.scene.is_dormant(self.asteroid))
+        del self.drone.overlaps[:]
+        self.step(3)
+        self.assertTrue(self.scene.is_dormant(self.asteroid))
+        # Спящий астероид не шагает, но перекрытие с активным дроном сообщается как раньше - дважды за тик,
+        # из цикла каждого объекта пары
+        self.assertEqual(self.drone.overlaps.count(self.asteroid), 6)
+
+    def test_dead_drone(self):
+        self.move_drone(300, 400)
+        self.drone.cargo._transfer_payload(50, self.asteroid.cargo)
+        self.drone.damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.step(3)
+        self.assertTrue(self.scene.is_dormant(self.drone))
+        looter = LooterDrone(coord=self.drone.coord.copy())
+        looter.set_team(self.drone.team)
+        looter.load_from(self.drone)
+        self.step()
+        self.assertEqual(looter.payload, self.scene.config.CARGO_TRANSITION_SPEED)
+        self.assertIn(self.drone, self.scene.drones)
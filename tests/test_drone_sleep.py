@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point, Vector
+
+
+class SleepyDrone(Drone):
+    pass
+
+
+class TaggedDrone(Drone):
+    sleep_attrs = ('coord', 'tag')
+
+    def __init__(self, **kwargs):
+        super(TaggedDrone, self).__init__(**kwargs)
+        self.tag = ['a']
+
+
+class WaypointDrone(Drone):
+    sleep_attrs = ('coord', 'waypoint')
+
+    def __init__(self, **kwargs):
+        super(WaypointDrone, self).__init__(**kwargs)
+        self.waypoint = Point(200, 200)
+
+
+class TestDroneSleep(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(can_fight=True)
+        self.countdown = self.scene.config.SLEEP_COUNTDOWN
+
+    def idle(self, drone, ticks):
+        for _ in range(ticks):
+            self.scene._step += 1
+            drone.update_sleep_state()
+
+    def test_fall_asleep_and_wake_up_on_move(self):
+        drone = SleepyDrone(coord=Point(100, 100))
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        drone.coord += Vector(0.5, 0)
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+
+    def test_nudge_below_str_precision(self):
+        drone = SleepyDrone(coord=Point(100, 100))
+        self.idle(drone, self.countdown + 1)
+        # Как и прежнее сравнение по str(): сдвиг и поворот меньше 0.1 сон не прерывают
+        drone.coord += Vector(0.02, 0)
+        drone.vector = Vector.from_direction(drone.direction + 0.01, module=1)
+        drone.update_sleep_state()
+        self.assertTrue(drone.is_asleep())
+        drone.coord += Vector(0.1, 0)
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+
+    def test_payload_and_gun_wake_up(self):
+        drone = SleepyDrone(coord=Point(100, 100))
+        self.idle(drone, self.countdown)
+        drone.cargo._transfer_payload(10, SleepyDrone(coord=Point(0, 0), payload=50).cargo)
+        self.idle(drone, 1)
+        self.assertFalse(drone.is_asleep())
+        drone.gun._cooldown = 10
+        self.idle(drone, self.countdown)
+        self.assertFalse(drone.is_asleep())
+
+    def test_custom_attrs_compared_by_str(self):
+        drone = TaggedDrone(coord=Point(100, 100))
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        drone.tag.append('b')
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+
+    def test_attr_changes_type(self):
+        drone = WaypointDrone(coord=Point(100, 100))
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        # Точка стала None и обратно, простое значение стало точкой - снимок перестраивается, как и строковый
+        drone.waypoint = None
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        drone.waypoint = Point(300, 300)
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        drone.waypoint = 'home'
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
+        drone.waypoint = [Point(1, 1)]
+        drone.update_sleep_state()
+        self.idle(drone, self.countdown + 1)
+        self.assertTrue(drone.is_asleep())
+        drone.waypoint.append(Point(2, 2))
+        drone.update_sleep_state()
+        self.assertFalse(drone.is_asleep())
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.space_field import SpaceField
+from astrobox.core import Drone
+from robogame_engine.geometry import Point
+
+
+class HarvesterDrone(Drone):
+    pass
+
+
+class RivalDrone(Drone):
+    pass
+
+
+class TestEleriumStocks(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=4, field=(1000, 600), headless=True)
+        self.drone, self.mate = HarvesterDrone(), HarvesterDrone()
+        self.rival = RivalDrone()
+        self.scene.prepare(asteroids_count=3)
+        self.stocks = self.scene.elerium_stocks
+        # Астероиды на одной линии: ближний, средний, дальний
+        self.asteroids = self.scene.asteroids
+        for i, asteroid in enumerate(self.asteroids):
+            self.place(asteroid, 300 + i * 100)
+        for drone in (self.drone, self.mate, self.rival):
+            self.place(drone, 100)
+
+    def place(self, obj, x):
+        obj.coord = Point(x, 300)
+        self.scene.spatial_index.update(obj)
+
+    def set_payload(self, asteroid, payload):
+        asteroid.cargo._clip_payload(asteroid.payload - payload)
+
+    def nearest(self, drone, **filters):
+        return self.stocks.nearest(drone, k=3, for_drone=drone, **filters)
+
+    def test_stocks_follow_payload(self):
+        near, middle, far = self.asteroids
+        self.assertEqual(self.nearest(self.drone), [near, middle, far])
+        self.set_payload(middle, 0)
+        self.assertNotIn(middle, self.stocks)
+        self.assertEqual(self.nearest(self.drone), [near, far])
+        # Погибший дрон с элериумом - тоже источник
+        self.rival.cargo._transfer_payload(10, near.cargo)
+        self.place(self.rival, 350)
+        self.assertNotIn(self.rival, self.stocks)
+        self.rival.damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.assertEqual(self.nearest(self.drone), [near, self.rival, far])
+
+    def test_team_reservations(self):
+        near, middle, far = self.asteroids
+        self.stocks.reserve(self.mate, near)
+        self.assertEqual(self.stocks.reserved_by(self.mate), near)
+        # Свой резерв не мешает, чужой - только союзникам
+        self.assertEqual(self.nearest(self.mate), [near, middle, far])
+        self.assertEqual(self.nearest(self.drone), [middle, far])
+        self.assertEqual(self.nearest(self.rival), [near, middle, far])
+        self.stocks.reserve(self.mate, far)
+        self.assertEqual(self.nearest(self.drone), [near, middle])
+        self.stocks.reserve(self.mate, None)
+        self.assertIsNone(self.stocks.reserved_by(self.mate))
+        self.assertEqual(self.nearest(self.drone), [near, middle, far])
+
+    def test_reservation_expires(self):
+        near, middle, far = self.asteroids
+        self.stocks.reserve(self.mate, near)
+        self.mate.cargo._transfer_payload(self.mate.cargo.free_space, middle.cargo)
+        # Полный дрон за источником не летит - резерв не учитывается
+        self.assertTrue(self.mate.cargo.is_full)
+        self.assertIn(near, self.nearest(self.drone))
+        self.stocks.reserve(self.drone, far)
+        self.set_payload(far, 0)
+        self.assertIsNone(self.stocks.reserved_by(self.drone))
+        self.stocks.reserve(self.drone, near)
+        self.drone.damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.assertIsNone(self.stocks.reserved_by(self.drone))
+
+    def test_removed_stock_released(self):
+        near, middle, far = self.asteroids
+        self.stocks.reserve(self.drone, near)
+        self.stocks.reserve(self.mate, middle)
+        self.scene.remove_object(near)
+        self.assertNotIn(near, self.stocks)
+        self.assertIsNone(self.stocks.reserved_by(self.drone))
+        self.assertFalse(self.stocks.is_reserved(near, self.drone.team))
+        self.assertEqual(self.stocks.reserved_by(self.mate), middle)
+        self.assertEqual(self.nearest(self.drone), [far])
+
+    def test_min_payload_and_richest(self):
+        near, middle, far = self.asteroids
+        self.set_payload(near, 5)
+        self.set_payload(middle, 20)
+        self.set_payload(far, 20)
+        self.assertEqual(self.nearest(self.drone, min_payload=10), [middle, far])
+        self.assertEqual(self.stocks.richest(self.drone, for_drone=self.drone), middle)
+        self.stocks.reserve(self.mate, middle)
+        self.assertEqual(self.stocks.richest(self.drone, for_drone=self.drone), far)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+import numpy
+
+from astrobox.env import (
+    ACT_LOAD, ACT_MOVE, ACT_UNLOAD, F_KIND, F_OWNER, F_PAYLOAD, F_X, F_Y, FEATURES, KIND_ASTEROID, KIND_DRONE,
+    KIND_MOTHERSHIP, AstroboxEnv, EnvException, EnvSpec, VectorEnv,
+)
+
+
+def harvest_actions(obs, drones):
+    """
+        Простая политика: пустые дроны летят к астероиду с элериумом и грузятся, полные - разгружаются на базе.
+    """
+    mothership = int(numpy.flatnonzero((obs[:, F_KIND] == KIND_MOTHERSHIP) & (obs[:, F_OWNER] == 1))[0])
+    asteroids = numpy.flatnonzero((obs[:, F_KIND] == KIND_ASTEROID) & (obs[:, F_PAYLOAD] > 0))
+    own = numpy.flatnonzero((obs[:, F_KIND] == KIND_DRONE) & (obs[:, F_OWNER] == 1))
+    actions = numpy.zeros((drones, 2), dtype=numpy.int64)
+    for number, index in enumerate(own):
+        if obs[index, F_PAYLOAD] >= 100:
+            target, action = mothership, ACT_UNLOAD
+        elif len(asteroids):
+            target, action = int(asteroids[number % len(asteroids)]), ACT_LOAD
+        else:
+            continue
+        distance = numpy.hypot(*(obs[index, [F_X, F_Y]] - obs[target, [F_X, F_Y]]))
+        actions[number] = (action if distance < 1 else ACT_MOVE, target)
+    return actions
+
+
+class TestAstroboxEnv(TestCase):
+
+    def test_observation(self):
+        env = AstroboxEnv(EnvSpec(drones=3, opponents=['demo.game.WorkerDrone'], seed=3, asteroids_count=5))
+        obs = env.reset()
+        self.assertEqual(obs.shape, (2 + 5 + 6, len(FEATURES)))
+        self.assertEqual(obs.shape, env.observation_shape)
+        self.assertEqual(list(obs[:, F_KIND]), [KIND_MOTHERSHIP] * 2 + [KIND_ASTEROID] * 5 + [KIND_DRONE] * 6)
+        self.assertEqual(list(obs[7:, F_OWNER]), [1] * 3 + [-1] * 3)
+        self.assertEqual(list(obs[2:7, F_OWNER]), [0] * 5)
+
+    def test_actions_and_reward(self):
+        env = AstroboxEnv(EnvSpec(drones=2, seed=5, asteroids_count=3, field=(600, 400)))
+        obs = env.reset()
+        target = int(numpy.flatnonzero(obs[:, F_KIND] == KIND_ASTEROID)[0])
+        drone, asteroid = env.agent_drones[0], env.entities[target]
+        distance = drone.distance_to(asteroid)
+        for _ in range(30):
+            obs, reward, done, info = env.step([(ACT_MOVE, target), (ACT_MOVE, target)])
+        self.assertLess(drone.distance_to(asteroid), distance)
+        collected = 0
+        for _ in range(1500):
+            obs, reward, done, info = env.step(harvest_actions(obs, 2))
+            collected += reward
+            if done:
+                break
+        self.assertGreater(collected, 0)
+        self.assertEqual(collected, env.agent_drones[0].my_mothership.payload)
+
+    def test_invalid_target(self):
+        env = AstroboxEnv(EnvSpec(drones=1, seed=1, asteroids_count=2))
+        env.reset()
+        with self.assertRaises(EnvException):
+            env.step([(ACT_MOVE, 100)])
+
+
+class TestVectorEnv(TestCase):
+
+    def play(self, processes):
+        specs = [EnvSpec(drones=2, opponents=['demo.game.GreedyDrone'], seed=seed, asteroids_count=4,
+                         field=(600, 400), max_steps=60) for seed in (1, 2, 3)]
+        with VectorEnv(specs, processes=processes) as env:
+            obs = env.reset()
+            rewards = []
+            for _ in range(80):
+                actions = numpy.stack([harvest_actions(env_obs, 2) for env_obs in obs])
+                obs, reward, done, infos = env.step(actions)
+                rewards.append(reward)
+                if done.any():
+                    self.assertTrue(done.all())
+                    self.assertEqual(infos[0]['final_observation'].shape, obs.shape[1:])
+        return obs, numpy.array(rewards)
+
+    def test_in_process_and_workers_match(self):
+        obs, rewards = self.play(processes=0)
+        self.assertEqual(obs.shape, (3, 2 + 4 + 4, len(FEATURES)))
+        self.assertEqual(rewards.shape, (80, 3))
+        worker_obs, worker_rewards = self.play(processes=2)
+        numpy.testing.assert_array_equal(obs, worker_obs)
+        numpy.testing.assert_array_equal(rewards, worker_rewards)
+
+    def test_different_shapes(self):
+        with self.assertRaises(EnvException):
+            VectorEnv([EnvSpec(asteroids_count=3), EnvSpec(asteroids_count=4)])
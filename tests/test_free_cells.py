@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest import TestCase
+
+from astrobox.space_field import FreeCells
+
+
+class TestFreeCells(TestCase):
+
+    def test_same_choice_as_list(self):
+        for count in (1, 2, 7, 64, 1000):
+            expected_rnd, rnd = random.Random(count), random.Random(count)
+            numbers = list(range(count))
+            cells = FreeCells(count)
+            for _ in range(count):
+                number = expected_rnd.choice(numbers)
+                numbers.remove(number)
+                self.assertEqual(cells.choice(rnd), number)
+            self.assertEqual(len(cells), 0)
+            self.assertEqual(rnd.random(), expected_rnd.random())
+
+    def test_pop(self):
+        cells = FreeCells(5)
+        self.assertEqual([cells.pop(1), cells.pop(1), cells.pop(2)], [1, 2, 4])
+        self.assertEqual(len(cells), 2)
+        with self.assertRaises(IndexError):
+            cells.pop(2)
+        cells.pop(0)
+        cells.pop(0)
+        with self.assertRaises(IndexError):
+            cells.choice(random.Random(1))
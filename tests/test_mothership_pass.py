@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest import TestCase, skipIf
+
+from astrobox import bulk
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class HomeDrone(Drone):
+    pass
+
+
+class AlienDrone(Drone):
+    pass
+
+
+class TestMothershipPass(TestCase):
+
+    def setUp(self):
+        random.seed(7)
+        self.scene = SpaceField(can_fight=True, field=(1200, 600))
+        self.home = [HomeDrone() for _ in range(300)]
+        self.alien = AlienDrone()
+        self.scene.prepare(asteroids_count=1, max_drones_at_team=300)
+        self.base = self.scene.get_mothership(self.home[0].team)
+        distance = self.scene.config.MOTHERSHIP_HEALING_DISTANCE
+        for i, drone in enumerate(self.home):
+            if i % 3:
+                drone.coord = Point(random.uniform(0, 600), random.uniform(0, 600))
+            else:
+                # Ровно на границе радиуса лечения и рядом с ней
+                drone.coord = Point(self.base.coord.x + distance * (1 + (i % 5 - 2) * 1e-12), self.base.coord.y)
+
+    def healing_flags(self, use_numpy):
+        mothership_pass = bulk.MothershipPass(self.scene, use_numpy=use_numpy)
+        mothership_pass.update_healing(self.scene.alive_drones_by_team)
+        return [mothership_pass.in_healing_range(drone) for drone in self.home]
+
+    @skipIf(bulk.numpy is None, 'numpy is not installed')
+    def test_numpy_same_as_python(self):
+        self.assertGreaterEqual(len(self.home), bulk.NUMPY_MIN_DRONES)
+        expected = [
+            drone.distance_to(self.base.coord) < self.scene.config.MOTHERSHIP_HEALING_DISTANCE
+            for drone in self.home
+        ]
+        self.assertEqual(self.healing_flags(use_numpy=False), expected)
+        self.assertEqual(self.healing_flags(use_numpy=True), expected)
+
+    def test_push_back(self):
+        self.alien.coord = Point(self.base.coord.x + 10, self.base.coord.y)
+        self.home[1].coord = Point(self.base.coord.x + 10, self.base.coord.y)
+        self.scene.spatial_index.update(self.alien)
+        self.scene.spatial_index.update(self.home[1])
+        moved = bulk.MothershipPass(self.scene).push_back(self.scene.motherships)
+        self.assertEqual(moved, [self.alien])
+        self.assertAlmostEqual(self.alien.distance_to(self.base), self.base.radius + 3)
+        self.assertIn(self.alien, self.scene.spatial_index.query_radius(self.alien.coord, 0))
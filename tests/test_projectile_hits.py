@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase, skipIf
+
+import mock
+from astrobox import bulk
+from astrobox.core import Drone
+from astrobox.guns import Projectile
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point, Vector
+from robogame_engine.theme import theme
+
+
+class ShooterDrone(Drone):
+    pass
+
+
+class TargetDrone(Drone):
+    pass
+
+
+class TestSegmentEntry(TestCase):
+
+    def test_entry(self):
+        self.assertAlmostEqual(bulk.segment_entry(0, 0, 100, 0, 50, 0, 10), 0.4)
+        self.assertEqual(bulk.segment_entry(45, 0, 100, 0, 50, 0, 10), 0.0)
+        # Круг сбоку, позади и за концом отрезка
+        self.assertIsNone(bulk.segment_entry(0, 0, 100, 0, 50, 20, 10))
+        self.assertIsNone(bulk.segment_entry(0, 0, 100, 0, -30, 0, 10))
+        self.assertIsNone(bulk.segment_entry(0, 0, 100, 0, 130, 0, 10))
+        self.assertIsNone(bulk.segment_entry(0, 0, 0, 0, 50, 0, 10))
+
+
+class TestProjectileHits(TestCase):
+    field = (1200, 600)
+
+    def make_scene(self, **overrides):
+        self.scene = SpaceField(seed=2, field=self.field, can_fight=True, headless=True, theme_overrides=overrides)
+        self.shooter = ShooterDrone()
+        self.mate = ShooterDrone()
+        self.near, self.far = TargetDrone(), TargetDrone()
+        self.scene.prepare(asteroids_count=1)
+        self.place(self.shooter, 200)
+        # Пока не понадобятся - в стороне от линии огня
+        self.place(self.mate, 600, y=550)
+        self.place(self.near, 800, y=550)
+        self.place(self.far, 1000, y=550)
+        self.shooter.vector = Vector.from_direction(0, module=1)
+
+    def place(self, drone, x, y=300):
+        drone.coord = Point(x, y)
+        self.scene.spatial_index.update(drone)
+
+    def shoot(self, ticks=20):
+        self.scene.advance(1)
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        self.scene.advance(ticks)
+
+    def damaged(self):
+        return [drone for drone in (self.shooter, self.mate, self.near, self.far)
+                if drone.health < self.scene.config.DRONE_MAX_SHIELD]
+
+    @mock.patch.object(theme, 'MAX_SPEED', 150)
+    def test_fast_projectile_does_not_tunnel(self):
+        # За тик снаряд пролетает больше диаметра дрона - в конце ни одного тика он дрона не перекрывает
+        self.make_scene(PROJECTILE_SPEED=150)
+        self.place(self.near, 420)
+        self.shoot(4)
+        self.assertEqual(self.damaged(), [self.near])
+        projectile, = [obj for obj in self.scene.objects if isinstance(obj, Projectile)]
+        self.assertTrue(projectile.has_hit)
+        # Снаряд остановился у цели, а не за ней
+        self.assertLess(projectile.x, self.near.x)
+
+    @mock.patch.object(theme, 'MAX_SPEED', 150)
+    def test_first_target_on_path(self):
+        self.make_scene(PROJECTILE_SPEED=150)
+        self.place(self.near, 420)
+        self.place(self.far, 500)
+        self.shoot()
+        self.assertEqual(self.damaged(), [self.near])
+
+    def test_friendly_fire(self):
+        self.make_scene(TEAM_DRONES_FRIENDLY_FIRE=True)
+        self.place(self.mate, 350)
+        self.place(self.near, 500)
+        self.shoot(40)
+        self.assertEqual(self.damaged(), [self.mate])
+
+    def test_no_friendly_fire(self):
+        self.make_scene(TEAM_DRONES_FRIENDLY_FIRE=False)
+        self.place(self.mate, 350)
+        self.place(self.near, 500)
+        self.shoot(40)
+        self.assertEqual(self.damaged(), [self.near])
+
+    @skipIf(bulk.numpy is None, 'NumPy is not installed')
+    def test_numpy_candidates_match_index(self):
+        self.make_scene()
+        projectiles = []
+        for i, drone in enumerate((self.mate, self.near, self.far)):
+            self.place(drone, 300 + i * 90)
+        with self.scene.active():
+            for direction in range(-20, 21, 5):
+                projectile = self.scene.projectile_pool.acquire(
+                    self.shooter.gun.projectile, coord=Point(200, 300), owner=self.shooter, direction=direction)
+                projectiles.append(projectile)
+        projectile_pass = bulk.ProjectilePass(self.scene, use_numpy=True)
+        targets = [drone for drone in self.scene.drones if drone.is_alive]
+        for projectile in projectiles:
+            projectile._sweep_from = Point(200, 300)
+            projectile.coord = Point(200, 300) + Vector.from_direction(projectile.direction, module=400)
+        batched = projectile_pass._candidates_batched(projectiles, targets)
+        for projectile, candidates in zip(projectiles, batched):
+            by_index = projectile_pass._candidates_by_index(projectile)
+            self.assertEqual(projectile_pass._first_hit(projectile, candidates),
+                             projectile_pass._first_hit(projectile, by_index))
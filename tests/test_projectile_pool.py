@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.guns import Projectile
+from astrobox.space_field import SpaceField
+
+
+class TargetDrone(Drone):
+    pass
+
+
+class TestProjectilePool(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=4, field=(1000, 600), can_fight=True, headless=True)
+        self.shooter = Drone()
+        self.scene.prepare(asteroids_count=1)
+        self.scene.advance(1)
+
+    def projectiles(self):
+        return [obj for obj in self.scene.objects if isinstance(obj, Projectile)]
+
+    def fly(self):
+        """
+            Выстрел из одной и той же точки и полет снаряда до его удаления со сцены.
+        """
+        self.shooter.coord.x, self.shooter.coord.y = 300, 300
+        self.shooter.gun._cooldown = 0
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        projectile, = self.projectiles()
+        born_id = projectile.id
+        track = []
+        while projectile in self.scene.objects:
+            self.scene.advance(1)
+            track.append((round(projectile.coord.x, 6), round(projectile.coord.y, 6), projectile.ttl, projectile.zoom))
+        # Пока снаряд в карантине, стрелять им нельзя
+        self.scene.advance(2)
+        return projectile, born_id, track
+
+    def test_reuse(self):
+        pool = self.scene.projectile_pool
+        first, first_id, first_track = self.fly()
+        self.assertEqual((pool.created, pool.reused, len(pool)), (1, 0, 1))
+        second, second_id, second_track = self.fly()
+        self.assertIs(second, first)
+        self.assertEqual((pool.created, pool.reused, len(pool)), (1, 1, 1))
+        self.assertGreater(second_id, first_id)
+        self.assertEqual(second_track, first_track)
+        self.assertEqual(second.team, self.shooter.team)
+
+    def test_quarantine_and_double_remove(self):
+        pool = self.scene.projectile_pool
+        projectile, _, _ = self.fly()
+        self.scene.remove_object(projectile)
+        self.assertEqual(len(pool), 1)
+        self.shooter.gun._cooldown = 0
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        self.scene.remove_object(self.projectiles()[0])
+        # Только что удаленный снаряд еще не выдается
+        self.shooter.gun._cooldown = 0
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        self.assertEqual((pool.created, pool.reused), (2, 1))
+
+    def test_relaunch_matches_constructor(self):
+        pool = self.scene.projectile_pool
+        self.shooter.gun._cooldown = 0
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        fresh, = self.projectiles()
+        fresh_attrs = set(vars(fresh))
+        engine_attrs = ('radius', 'target', '_selected', '_heartbeat_tics')
+        fresh_values = [getattr(fresh, name) for name in engine_attrs]
+        while fresh in self.scene.objects:
+            self.scene.advance(1)
+        self.scene.advance(2)
+        fresh.target, fresh._selected, fresh._heartbeat_tics = self.shooter, True, 0
+        self.shooter.gun._cooldown = 0
+        with self.scene.active():
+            self.shooter.gun.shot(None)
+        relaunched, = self.projectiles()
+        self.assertIs(relaunched, fresh)
+        self.assertEqual(pool.reused, 1)
+        # Переинициализация повторяет конструктор движка - набор атрибутов тот же
+        self.assertEqual(set(vars(relaunched)), fresh_attrs)
+        self.assertEqual([getattr(relaunched, name) for name in engine_attrs], fresh_values)
+
+    def test_hit_animation_reused(self):
+        # Цели - дроны другой команды, им нужна своя база: сцена с ними с самого начала
+        self.scene = SpaceField(seed=4, field=(1000, 600), can_fight=True, headless=True)
+        self.shooter = Drone()
+        targets = [TargetDrone(), TargetDrone()]
+        self.scene.prepare(asteroids_count=1)
+        self.scene.advance(1)
+        animations = []
+        for target in targets:
+            self.shooter.gun._cooldown = 0
+            with self.scene.active():
+                self.shooter.gun.shot(None)
+            projectile, = self.projectiles()
+            projectile.hit(target)
+            animation = projectile.attached
+            animations.append(animation)
+            self.assertIs(animation.target, target)
+            self.assertEqual(animation.ttl, int(self.scene.config.PROJECTILE_TTL / 4))
+            while projectile in self.scene.objects:
+                self.scene.advance(1)
+            self.assertFalse(animation.is_alive)
+            self.scene.advance(2)
+        self.assertEqual(self.scene.projectile_pool.reused, 1)
+        self.assertIs(animations[1], animations[0])
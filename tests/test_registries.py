@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Asteroid, Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class RedDrone(Drone):
+    pass
+
+
+class BlueDrone(Drone):
+    pass
+
+
+class TestRegistries(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(can_fight=True)
+        self.red = [RedDrone(), RedDrone()]
+        self.blue = [BlueDrone()]
+        self.asteroid = Asteroid(coord=Point(300, 300), elerium=100)
+
+    def test_typed_views(self):
+        self.assertEqual(self.scene.drones, self.red + self.blue)
+        self.assertEqual(self.scene.asteroids, [self.asteroid])
+        self.assertEqual(self.scene.alive_drones_by_team, {'RedDrone': tuple(self.red), 'BlueDrone': tuple(self.blue)})
+        self.assertEqual(self.scene.enemy_drones('RedDrone'), tuple(self.blue))
+        self.assertEqual(self.red[0].teammates, [self.red[1]])
+
+    def test_death(self):
+        self.red[1].damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.assertEqual(self.scene.alive_team_drones('RedDrone'), (self.red[0],))
+        self.assertEqual(self.scene.enemy_drones('BlueDrone'), (self.red[0],))
+        self.assertEqual(self.red[0].teammates, [])
+        self.assertIn(self.red[1], self.scene.drones)
+
+    def test_asteroids_with_payload(self):
+        self.assertEqual(self.scene.asteroids_with_payload, (self.asteroid,))
+        self.red[0].cargo._transfer_payload(100, self.asteroid.cargo)
+        self.assertEqual(self.scene.asteroids_with_payload, ())
+        self.red[0].cargo._clip_payload(10)
+        self.asteroid.cargo._transfer_payload(10, self.red[0].cargo)
+        self.assertEqual(self.scene.asteroids_with_payload, (self.asteroid,))
+
+    def test_remove(self):
+        self.scene.remove_object(self.blue[0])
+        self.assertEqual(self.scene.drones, self.red)
+        self.assertEqual(self.scene.enemy_drones('RedDrone'), ())
+
+    def test_team_totals(self):
+        self.scene.prepare(asteroids_count=1)
+        self.red[0].cargo._transfer_payload(30, self.asteroid.cargo)
+        self.red[1].cargo._transfer_payload(20, self.asteroid.cargo)
+        self.blue[0].damage_taken(40)
+        state = self.scene._get_game_state()
+        self.assertEqual(state['RedDrone']['drones'], 50)
+        self.assertEqual(state['RedDrone']['low_health'], 2 * self.scene.config.DRONE_MAX_SHIELD +
+                         self.scene.get_mothership('RedDrone').health)
+        self.assertEqual(state['BlueDrone']['low_health'], self.scene.config.DRONE_MAX_SHIELD - 40 +
+                         self.scene.get_mothership('BlueDrone').health)
+        self.red[1].damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.red[1].cargo._clip_payload(5)
+        state = self.scene._get_game_state()
+        self.assertEqual(state['RedDrone']['drones'], 30)
+        self.assertEqual(state['RedDrone']['low_health'], self.scene.config.DRONE_MAX_SHIELD +
+                         self.scene.get_mothership('RedDrone').health)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.replay import Replay
+from astrobox.space_field import SpaceField
+
+
+class ReplayDrone(Drone):
+
+    def on_born(self):
+        self.move_at(self.scene.random.choice(self.scene.asteroids))
+
+    def on_stop_at_asteroid(self, asteroid):
+        self.load_from(asteroid)
+
+    def on_load_complete(self):
+        self.move_at(self.my_mothership)
+
+    def on_stop_at_mothership(self, mothership):
+        self.unload_to(mothership)
+
+    def on_unload_complete(self):
+        self.move_at(self.scene.random.choice(self.scene.asteroids))
+
+
+class TestReplay(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'game.abr')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def play(self, seed, steps, replay_path=None, snapshot_at=None):
+        scene = SpaceField(seed=seed, field=(900, 600), replay_path=replay_path)
+        drones = [ReplayDrone() for _ in range(3)]
+        scene.prepare(asteroids_count=7)
+        snapshot = None
+        for _ in range(steps):
+            scene._step += 1
+            scene.game_step()
+            if scene._step == snapshot_at:
+                snapshot = {obj.id: (obj.coord.x, obj.coord.y, obj.payload) for obj in scene.objects}
+        return scene, drones, snapshot
+
+    def test_same_seed_same_game(self):
+        random.seed(1)
+        scene, drones, _ = self.play(seed=42, steps=300)
+        first = [(a.coord.x, a.coord.y, a.payload, a.direction) for a in scene.asteroids]
+        first += [(d.coord.x, d.coord.y, d.payload) for d in drones]
+        random.seed(2)
+        scene, drones, _ = self.play(seed=42, steps=300)
+        second = [(a.coord.x, a.coord.y, a.payload, a.direction) for a in scene.asteroids]
+        second += [(d.coord.x, d.coord.y, d.payload) for d in drones]
+        self.assertEqual(first, second)
+
+    def test_record_and_seek(self):
+        scene, drones, snapshot = self.play(seed=7, steps=250, replay_path=self.path, snapshot_at=123)
+        scene.replay_recorder.close(result={'collected': 1})
+        replay = Replay(self.path)
+        self.assertEqual(replay.seed, 7)
+        self.assertEqual(replay.result, {'collected': 1})
+        self.assertEqual([frame.step for frame in replay], list(range(1, 251)))
+        frame = replay.state_at(123)
+        self.assertEqual(set(frame.objects), set(snapshot))
+        for obj_id, (x, y, payload) in snapshot.items():
+            state = frame.objects[obj_id]
+            self.assertAlmostEqual(state.x, x, places=3)
+            self.assertAlmostEqual(state.y, y, places=3)
+            self.assertEqual(state.payload, payload)
+        self.assertEqual(frame.objects[drones[0].id].kind, 'drone')
+        self.assertEqual(frame.objects[drones[0].id].team, drones[0].team)
+        spawned = [obj_id for name, obj_id in next(iter(replay)).events if name == 'spawned']
+        self.assertEqual(sorted(spawned), sorted(snapshot))
+
+    def test_interrupted_recording(self):
+        scene, _, snapshot = self.play(seed=7, steps=250, replay_path=self.path, snapshot_at=150)
+        # Блоки пишутся на диск по мере игры - последний, незаконченный, пропадет
+        replay = Replay(self.path)
+        self.assertIsNone(replay.result)
+        self.assertEqual(len(list(replay)), 200)
+        frame = replay.state_at(150)
+        self.assertEqual(set(frame.objects), set(snapshot))
+        scene.replay_recorder.close()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from astrobox.results import ResultStore
+
+
+def make_result(uuid, collected, seed=1, dead=None, overrides=None):
+    result = dict(uuid=uuid, happened_at='2026-01-01 00:00:00', game_steps=1000, seed=seed, collected=collected,
+                  teams=dict((team, 'bots.' + team) for team in collected), theme_overrides=overrides or {})
+    if dead is not None:
+        result['dead'] = dead
+    return result
+
+
+class TestResultStore(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'results.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def fill(self, store):
+        store.add(make_result('m1', {'A': 300, 'B': 200, 'C': 100}, dead={'A': 0, 'B': 2, 'C': 5}))
+        store.add(make_result('m2', {'A': 100, 'B': 250}, seed=2, dead={'A': 1, 'B': 1}))
+        store.add(make_result('m3', {'A': 50, 'C': 50}, overrides={'DRONE_SPEED': 5}))
+
+    def test_batched_inserts(self):
+        store = ResultStore(self.path, batch_size=2)
+        self.fill(store)
+        # Третий результат ждет следующей пачки
+        self.assertEqual(len(ResultStore(self.path)), 2)
+        store.add(make_result('m1', {'A': 1}))
+        store.close()
+        # Повтор по uuid не записывается
+        self.assertEqual(len(ResultStore(self.path)), 3)
+
+    def test_leaderboard(self):
+        with ResultStore(self.path) as store:
+            self.fill(store)
+        store = ResultStore(self.path)
+        board = store.leaderboard()
+        self.assertEqual([(row['team_class'], row['matches'], row['wins']) for row in board],
+                         [('bots.A', 3, 2), ('bots.B', 2, 1), ('bots.C', 2, 1)])
+        board = store.leaderboard(theme_overrides={}, limit=1)
+        self.assertEqual([(row['team_class'], row['wins'], row['collected']) for row in board], [('bots.B', 1, 450)])
+
+    def test_head_to_head_and_strategies(self):
+        with ResultStore(self.path) as store:
+            self.fill(store)
+        store = ResultStore(self.path)
+        rows = store.head_to_head(team_class='bots.A')
+        self.assertEqual([(row['opponent'], row['matches'], row['wins'], row['losses'], row['draws']) for row in rows],
+                         [('bots.B', 2, 1, 1, 0), ('bots.C', 2, 1, 0, 1)])
+        stats = dict((row['team_class'], row) for row in store.strategy_stats())
+        self.assertEqual(stats['bots.A']['max_collected'], 300)
+        self.assertAlmostEqual(stats['bots.B']['avg_dead'], 1.5)
+        # Игры без потерь (мирные) в среднем не учитываются
+        self.assertEqual(stats['bots.C']['avg_dead'], 5)
+        self.assertEqual(stats['bots.C']['min_collected'], 50)
+
+    def test_concurrent_stores(self):
+        # Несколько процессов-писателей с одной базой: у каждого свое соединение и свои пачки
+        stores = [ResultStore(self.path, batch_size=3) for _ in range(3)]
+        for i in range(9):
+            stores[i % 3].add(make_result('m{}'.format(i), {'A': i, 'B': 9 - i}))
+        for store in stores:
+            store.close()
+        store = ResultStore(self.path)
+        self.assertEqual(len(store), 9)
+        self.assertEqual(sum(row['matches'] for row in store.leaderboard()), 18)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.cargo import CargoException, CargoTransition
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+
+
+class FirstDrone(Drone):
+    pass
+
+
+class SecondDrone(Drone):
+    pass
+
+
+class TestSceneConfig(TestCase):
+
+    def test_immutable(self):
+        scene = SpaceField(theme_overrides=dict(DRONE_SPEED=5))
+        self.assertEqual(scene.config.DRONE_SPEED, 5)
+        with self.assertRaises(AttributeError):
+            scene.config.DRONE_SPEED = 1
+        faster = scene.config.replace(DRONE_SPEED=7)
+        self.assertEqual(faster.DRONE_SPEED, 7)
+        self.assertEqual(scene.config.DRONE_SPEED, 5)
+
+    def test_unknown_constant(self):
+        with self.assertRaises(ValueError):
+            SpaceField(theme_overrides=dict(DRONE_SPPED=5))
+
+    def test_scenes_in_one_process(self):
+        peaceful = SpaceField(can_fight=False, field=(1000, 500))
+        peaceful_drones = [FirstDrone(), SecondDrone()]
+        fighting = SpaceField(can_fight=True)
+        fighting_drones = [FirstDrone(), SecondDrone()]
+
+        self.assertFalse(peaceful.config.DRONES_CAN_FIGHT)
+        self.assertEqual(peaceful.config.FIELD_WIDTH, 1000)
+        self.assertTrue(fighting.config.DRONES_CAN_FIGHT)
+        for drone in peaceful_drones:
+            self.assertIs(drone.scene, peaceful)
+            self.assertFalse(drone.have_gun)
+        for drone in fighting_drones:
+            self.assertIs(drone.scene, fighting)
+            self.assertTrue(drone.have_gun)
+        self.assertEqual(list(peaceful.teams), ['FirstDrone', 'SecondDrone'])
+
+        with self.assertRaises(CargoException):
+            CargoTransition(cargo_from=peaceful_drones[0].cargo, cargo_to=peaceful_drones[1].cargo)
+        CargoTransition(cargo_from=fighting_drones[0].cargo, cargo_to=fighting_drones[1].cargo)
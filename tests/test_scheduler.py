@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+
+
+class IdleDrone(Drone):
+
+    def __init__(self, **kwargs):
+        super(IdleDrone, self).__init__(**kwargs)
+        self.wake_ups = []
+
+    def on_wake_up(self):
+        self.wake_ups.append(self.scene._step)
+
+
+class TestTickScheduler(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=1, headless=True)
+        self.scheduler = self.scene.scheduler
+
+    def test_order_and_cancel(self):
+        calls = []
+        self.scheduler.call_at(3, calls.append, 'c')
+        self.scheduler.call_at(2, calls.append, 'a')
+        self.scheduler.call_at(2, calls.append, 'b')
+        cancelled = self.scheduler.call_later(2, calls.append, 'x')
+        cancelled.cancel()
+        self.assertEqual((len(self.scheduler), self.scheduler.next_step), (3, 2))
+        self.assertEqual(self.scheduler.run_due(1), 0)
+        self.assertEqual(self.scheduler.run_due(2), 2)
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual(self.scheduler.run_due(10), 1)
+        self.assertEqual(calls, ['a', 'b', 'c'])
+        self.assertIsNone(self.scheduler.next_step)
+
+    def test_callback_scheduled_for_same_step_runs(self):
+        calls = []
+        self.scheduler.call_at(1, lambda: self.scheduler.call_at(1, calls.append, 'nested'))
+        self.scheduler.run_due(1)
+        self.assertEqual(calls, ['nested'])
+
+    def test_idle_drone_wake_ups(self):
+        drone = IdleDrone()
+        self.scene.prepare(asteroids_count=1)
+        self.scene.advance(60)
+        countdown = self.scene.config.SLEEP_COUNTDOWN
+        # Засыпание отсчитывается с первого тика, дальше - раз в SLEEP_COUNTDOWN + 1 тиков
+        expected = list(range(countdown + 2, 61, countdown + 1))
+        self.assertEqual(drone.wake_ups, expected)
+        # Пока дрон ждет, в очереди только его таймер
+        self.assertEqual(len(self.scheduler), 1)
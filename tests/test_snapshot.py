@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.core import Drone
+from astrobox.guns import Projectile
+from astrobox.space_field import SpaceField
+
+
+class ForkDrone(Drone):
+
+    def on_born(self):
+        self.move_at(self.scene.random.choice(self.scene.asteroids))
+
+    def on_stop_at_asteroid(self, asteroid):
+        self.load_from(asteroid)
+
+    def on_load_complete(self):
+        self.move_at(self.my_mothership)
+
+    def on_stop_at_mothership(self, mothership):
+        self.unload_to(mothership)
+
+    def on_unload_complete(self):
+        self.move_at(self.scene.random.choice(self.scene.asteroids))
+
+
+class OtherForkDrone(ForkDrone):
+    pass
+
+
+class TestSceneSnapshot(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=11, field=(900, 600), can_fight=True, headless=True)
+        self.drones = [ForkDrone() for _ in range(3)] + [OtherForkDrone() for _ in range(3)]
+        self.scene.prepare(asteroids_count=7)
+        self.scene.advance(50)
+
+    @staticmethod
+    def state(scene):
+        return sorted(
+            (obj.id, round(obj.coord.x, 6), round(obj.coord.y, 6), obj.payload, getattr(obj, 'health', None))
+            for obj in scene.objects
+        )
+
+    def test_fork_repeats_game(self):
+        fork = self.scene.fork()
+        self.assertTrue(fork.headless)
+        self.assertIsNone(fork.replay_recorder)
+        fork_drones = [obj for obj in fork.objects if isinstance(obj, Drone)]
+        self.assertTrue(all(drone.scene is fork for drone in fork_drones))
+        self.assertTrue(all(drone.scene is self.scene for drone in self.drones))
+        fork.advance(200)
+        self.scene.advance(200)
+        self.assertEqual(self.state(fork), self.state(self.scene))
+
+    def test_fork_is_independent(self):
+        fork = self.scene.fork()
+        before = self.state(self.scene)
+        drone = [obj for obj in fork.objects if isinstance(obj, Drone)][0]
+        with fork.active():
+            drone.gun.shot(drone.my_mothership)
+        fork.advance(1)
+        self.assertTrue(any(isinstance(obj, Projectile) for obj in fork.objects))
+        self.assertFalse(any(isinstance(obj, Projectile) for obj in self.scene.objects))
+        self.assertEqual(self.state(self.scene), before)
+
+    def test_restore(self):
+        snapshot = self.scene.snapshot()
+        self.scene.advance(150)
+        expected = self.state(self.scene)
+        self.scene.restore(snapshot)
+        self.assertEqual(self.scene._step, snapshot.step)
+        self.scene.advance(150)
+        self.assertEqual(self.state(self.scene), expected)
+
+    def test_objects_created_after_restore(self):
+        snapshot = self.scene.snapshot()
+        self.scene.advance(10)
+        self.scene.restore(snapshot)
+        # Объекты, созданные между тиками, движок добавляет в список сцены, привязанный к GameObject
+        self.assertEqual(len(self.scene.projectile_pool), 0)
+        drone = self.drones[0]
+        drone.gun._cooldown = 0
+        drone.gun.shot(drone.my_mothership)
+        self.assertEqual(len([obj for obj in self.scene.objects if isinstance(obj, Projectile)]), 1)
+        newcomer = ForkDrone()
+        self.assertIn(newcomer, self.scene.objects)
+
+    def test_restore_foreign_snapshot(self):
+        fork = self.scene.fork()
+        with self.assertRaises(ValueError):
+            fork.restore(self.scene.snapshot())
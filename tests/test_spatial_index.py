@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest import TestCase
+
+from astrobox.spatial import SpatialGrid
+from robogame_engine.geometry import Point
+
+
+class Dummy(object):
+    radius = 10
+
+    def __init__(self, id, x, y, team=None):
+        self.id = id
+        self.coord = Point(x, y)
+        self.team = team
+
+
+class SmallDummy(Dummy):
+    radius = 1
+
+
+class TestSpatialGrid(TestCase):
+
+    def setUp(self):
+        rnd = random.Random(42)
+        self.grid = SpatialGrid(cell_size=50)
+        self.objects = []
+        for i in range(200):
+            cls = SmallDummy if i % 3 else Dummy
+            obj = cls(i + 1, rnd.uniform(0, 1000), rnd.uniform(0, 500), team='team_{}'.format(i % 4))
+            self.objects.append(obj)
+            self.grid.insert(obj)
+        self.point = Point(420, 260)
+
+    def brute_force(self, radius, touching=False, **filters):
+        found = []
+        for obj in self.objects:
+            distance = obj.coord.distance_to(self.point)
+            limit = radius + obj.radius if touching else radius
+            if distance <= limit and SpatialGrid._match(obj, filters.get('cls'), filters.get('team'),
+                                                        filters.get('exclude_team'), None):
+                found.append((distance, obj.id, obj))
+        return [obj for _, _, obj in sorted(found, key=lambda item: item[:2])]
+
+    def test_query_radius(self):
+        self.assertEqual(self.grid.query_radius(self.point, 120), self.brute_force(120))
+        self.assertEqual(self.grid.query_radius(self.point, 3, touching=True), self.brute_force(3, touching=True))
+
+    def test_filters(self):
+        result = self.grid.query_radius(self.point, 300, cls=SmallDummy, exclude_team='team_1')
+        self.assertEqual(result, self.brute_force(300, cls=SmallDummy, exclude_team='team_1'))
+        self.assertTrue(all(obj.team == 'team_2' for obj in self.grid.query_radius(self.point, 300, team='team_2')))
+
+    def test_nearest(self):
+        expected = self.brute_force(10000)
+        self.assertEqual(self.grid.nearest(self.point, k=15), expected[:15])
+        self.assertEqual(list(self.grid.iter_nearest(self.point)), expected)
+        self.assertEqual(self.grid.nearest(Point(-5000, -5000), k=1), [min(
+            self.objects, key=lambda obj: (obj.coord.distance_to(Point(-5000, -5000)), obj.id))])
+
+    def test_query_rect(self):
+        expected = [obj for obj in self.objects if 100 <= obj.coord.x <= 300 and 50 <= obj.coord.y <= 150]
+        self.assertEqual(self.grid.query_rect(100, 50, 200, 100), expected)
+
+    def test_update_and_remove(self):
+        obj = self.objects[0]
+        obj.coord = Point(self.point.x + 1, self.point.y)
+        self.grid.update(obj)
+        self.assertEqual(self.grid.nearest(self.point, k=1), [obj])
+        self.grid.remove(obj)
+        self.assertNotIn(obj, self.grid)
+        self.assertNotIn(obj, self.grid.query_radius(self.point, 100))
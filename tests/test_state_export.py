@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from astrobox.core import Drone, Unit
+from astrobox.state_export import NO_COUNTER, NO_NAME, StateExportException, StateExporter, StateReader
+from astrobox.space_field import SpaceField
+
+
+class ExportDrone(Drone):
+
+    def on_born(self):
+        self.move_at(self.scene.random.choice(self.scene.asteroids))
+
+
+class TestStateExport(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'scene.state')
+        self.scene = SpaceField(seed=3, field=(900, 600), headless=True, state_export_path=self.path)
+        self.drones = [ExportDrone() for _ in range(3)]
+        self.scene.prepare(asteroids_count=5)
+
+    def tearDown(self):
+        self.scene.state_exporter.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_latest_frame(self):
+        with StateReader(self.path) as reader:
+            self.assertIsNone(reader.latest())
+            # Больше тиков, чем слотов - буфер прошел круг
+            self.scene.advance(20)
+            frame = reader.latest()
+            self.assertEqual(frame.step, 20)
+            units = [obj for obj in self.scene.objects if isinstance(obj, Unit)]
+            self.assertEqual(frame.total, len(units))
+            records = {int(record['id']): record for record in frame.records}
+            self.assertEqual(set(records), set(obj.id for obj in units))
+            for obj in units:
+                record = records[obj.id]
+                self.assertAlmostEqual(float(record['x']), obj.coord.x, places=3)
+                self.assertAlmostEqual(float(record['y']), obj.coord.y, places=3)
+                self.assertAlmostEqual(float(record['direction']), obj.direction, places=3)
+                self.assertAlmostEqual(float(record['meter_1']), obj.meter_1, places=5)
+                self.assertEqual(reader.name(record['sprite']), obj.sprite_filename)
+                self.assertEqual(reader.name(record['team']), obj.team)
+                counter = obj.counter
+                self.assertEqual(int(record['counter']), NO_COUNTER if counter is None else counter)
+            asteroid = self.scene.asteroids[0]
+            self.assertEqual(records[asteroid.id]['team'], NO_NAME)
+
+    def test_fork_does_not_export(self):
+        fork = self.scene.fork()
+        self.assertIsNone(fork.state_exporter)
+        fork.advance(5)
+        with StateReader(self.path) as reader:
+            self.assertIsNone(reader.latest())
+
+    def test_names_table_full(self):
+        self.scene.state_exporter.close()
+        path = os.path.join(self.tmp_dir, 'small.state')
+        exporter = StateExporter(self.scene, path, names_size=200)
+        with StateReader(path) as reader, mock.patch.object(self.scene, 'error') as error:
+            self.scene.advance(5)
+            self.assertEqual(reader.latest().step, 5)
+            sprite = mock.PropertyMock(return_value='teams/1/' + 'x' * 100 + '.png')
+            with mock.patch.object(ExportDrone, 'sprite_filename', new_callable=lambda: sprite):
+                self.scene.advance(25)
+            # Таблица имен переполнилась - выгрузка остановлена, игра идет, записанные кадры читаются
+            self.assertTrue(exporter.closed)
+            self.assertEqual(self.scene._step, 30)
+            self.assertEqual(error.call_count, 1)
+            self.assertIn('Names table is full', error.call_args[0][0])
+            self.assertEqual(reader.latest().step, 5)
+
+    def test_not_a_buffer(self):
+        path = os.path.join(self.tmp_dir, 'other')
+        with open(path, 'wb') as ff:
+            ff.write(b'x' * 100)
+        with self.assertRaises(StateExportException):
+            StateReader(path)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+from astrobox import sweep
+from astrobox.tournament import MatchSpec
+
+TEAMS = ['demo.game.WorkerDrone', 'demo.game.GreedyDrone']
+
+
+class FakeTournament(object):
+    played = []
+
+    def __init__(self, processes=None, preload=()):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def run(self, specs):
+        for index, spec in enumerate(specs):
+            self.played.append((spec.seed, spec.theme_overrides))
+            collected = dict(('team_{}'.format(i), spec.seed * 10 + i) for i in range(len(spec.teams)))
+            teams = dict(('team_{}'.format(i), path) for i, path in enumerate(spec.teams))
+            yield index, dict(collected=collected, teams=teams, seed=spec.seed,
+                              theme_overrides=spec.theme_overrides), None
+
+
+class TestDesigns(TestCase):
+
+    def test_grid(self):
+        variants = sweep.grid({'PROJECTILE_DAMAGE': [10, 20], 'DRONE_SPEED': [3, 5]})
+        self.assertEqual([dict(variant) for variant in variants], [
+            {'DRONE_SPEED': 3, 'PROJECTILE_DAMAGE': 10}, {'DRONE_SPEED': 3, 'PROJECTILE_DAMAGE': 20},
+            {'DRONE_SPEED': 5, 'PROJECTILE_DAMAGE': 10}, {'DRONE_SPEED': 5, 'PROJECTILE_DAMAGE': 20},
+        ])
+        self.assertEqual(sweep.grid({}), [{}])
+
+    def test_random_design(self):
+        ranges = {'DRONE_SPEED': (2.0, 6.0), 'PLASMAGUN_COOLDOWN_TIME': (40, 120), 'MOTHERSHIP_HEALING_RATE': [1, 2]}
+        variants = sweep.random_design(ranges, samples=20, seed=3)
+        self.assertEqual(variants, sweep.random_design(ranges, samples=20, seed=3))
+        for variant in variants:
+            self.assertTrue(2.0 <= variant['DRONE_SPEED'] <= 6.0)
+            self.assertIsInstance(variant['PLASMAGUN_COOLDOWN_TIME'], int)
+            self.assertIn(variant['MOTHERSHIP_HEALING_RATE'], (1, 2))
+
+    def test_match_key(self):
+        def key(seed=1, code='code', **overrides):
+            return sweep.match_key(MatchSpec(teams=TEAMS, seed=seed, theme_overrides=overrides), code)
+
+        self.assertEqual(key(DRONE_SPEED=3), key(DRONE_SPEED=3))
+        self.assertNotEqual(key(DRONE_SPEED=3), key(seed=2, DRONE_SPEED=3))
+        self.assertNotEqual(key(DRONE_SPEED=3), key(DRONE_SPEED=4))
+        self.assertNotEqual(key(DRONE_SPEED=3), key(code='changed code', DRONE_SPEED=3))
+        # Значение по умолчанию, заданное явно, - та же тема
+        default_speed = sweep.theme_values(sweep.DEFAULT_THEME_MOD_PATH, {})['DRONE_SPEED']
+        self.assertEqual(key(), key(DRONE_SPEED=default_speed))
+        with self.assertRaises(ValueError):
+            sweep.theme_values(sweep.DEFAULT_THEME_MOD_PATH, {'NO_SUCH_CONSTANT': 1})
+
+
+@mock.patch.object(sweep, 'Tournament', FakeTournament)
+class TestSweep(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        FakeTournament.played = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def make_sweep(self, seeds):
+        return sweep.Sweep(TEAMS, sweep.grid({'DRONE_SPEED': [3, 5]}), seeds, self.cache_dir)
+
+    def test_resume_from_cache(self):
+        results, played, errors = self.make_sweep([1, 2]).run()
+        self.assertEqual((played, errors), (4, []))
+        # Дополненный перебор доигрывает только новые сиды
+        extended = self.make_sweep([1, 2, 3])
+        results, played, _ = extended.run()
+        self.assertEqual(played, 2)
+        self.assertEqual(FakeTournament.played[4:], [(3, {'DRONE_SPEED': 3}), (3, {'DRONE_SPEED': 5})])
+        self.assertEqual([len(variant_results) for variant_results in results], [3, 3])
+        summary = extended.summary(results)
+        self.assertEqual(summary[0]['avg_collected'], {TEAMS[0]: 20, TEAMS[1]: 21})
+        with mock.patch.object(sweep, 'code_hash', return_value='changed'):
+            _, played, _ = extended.run()
+        self.assertEqual(played, 6)
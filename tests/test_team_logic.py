@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+import mock
+
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from astrobox.team_logic import TeamLogic
+
+
+class HarvestLogic(TeamLogic):
+    """
+        Каждый дрон возит элериум со своего астероида (по номеру), решения запоминаются между тиками.
+    """
+
+    def __init__(self, team):
+        super(HarvestLogic, self).__init__(team)
+        self.targets = {}
+        self.calls = 0
+
+    def think(self, world, orders):
+        self.calls += 1
+        asteroids = [unit for unit in world.asteroids if unit.payload > 0]
+        mothership = world.my_mothership
+        for number, drone in enumerate(world.my_drones):
+            if drone.is_moving:
+                continue
+            if drone.free_space == 0 or (not asteroids and drone.payload):
+                if world.distance(drone, mothership) < 1:
+                    orders.unload_to(drone, mothership)
+                else:
+                    orders.move_at(drone, mothership)
+            elif asteroids:
+                target = world.by_id.get(self.targets.get(drone.id))
+                if target is None or target.payload == 0:
+                    target = world.random.choice(asteroids)
+                    self.targets[drone.id] = target.id
+                if world.distance(drone, target) < 1:
+                    orders.load_from(drone, target)
+                else:
+                    orders.move_at(drone, target)
+
+
+class ForeignOrdersLogic(TeamLogic):
+
+    def think(self, world, orders):
+        for drone in world.drones:
+            if drone.team != world.team:
+                orders.move_at(drone, world.asteroids[0])
+
+
+class BrokenLogic(TeamLogic):
+
+    def think(self, world, orders):
+        orders.move_at(world.my_drones[0], world.asteroids[0])
+        raise ValueError('oops')
+
+
+class LogicDrone(Drone):
+    team_logic = HarvestLogic
+
+
+class OtherLogicDrone(Drone):
+    team_logic = 'tests.test_team_logic.HarvestLogic'
+
+
+class EnemyCommandingDrone(Drone):
+    team_logic = ForeignOrdersLogic
+
+
+class BrokenLogicDrone(Drone):
+    team_logic = BrokenLogic
+
+
+class IdleDrone(Drone):
+    pass
+
+
+class TestTeamLogic(TestCase):
+
+    def play(self, processes, steps=700):
+        scene = SpaceField(seed=21, field=(600, 400), headless=True, team_processes=processes)
+        [LogicDrone() for _ in range(3)]
+        [OtherLogicDrone() for _ in range(3)]
+        scene.prepare(asteroids_count=6)
+        scene.advance(steps)
+        state = [(obj.__class__.__name__, round(obj.coord.x, 6), round(obj.coord.y, 6), obj.payload)
+                 for obj in scene.objects]
+        collected = [ship.payload for ship in scene.motherships]
+        scene.team_logic_runner.close()
+        return state, collected
+
+    def test_logic_collects(self):
+        _, collected = self.play(processes=0)
+        self.assertTrue(all(payload > 0 for payload in collected))
+
+    def test_same_game_with_workers(self):
+        self.assertEqual(self.play(processes=0, steps=150), self.play(processes=2, steps=150))
+
+    def make_scene(self, drone_class):
+        scene = SpaceField(seed=1, field=(900, 600), headless=True)
+        drones = [drone_class() for _ in range(2)]
+        idle = [IdleDrone() for _ in range(2)]
+        scene.prepare(asteroids_count=3)
+        self.addCleanup(scene.team_logic_runner.close)
+        return scene, drones, idle
+
+    def test_foreign_orders_rejected(self):
+        scene, _, enemies = self.make_scene(EnemyCommandingDrone)
+        coords = [(enemy.coord.x, enemy.coord.y) for enemy in enemies]
+        with mock.patch.object(scene, 'error') as error:
+            scene.advance(5)
+        self.assertTrue(error.called)
+        self.assertTrue(all('rejected' in call[0][0] for call in error.call_args_list))
+        self.assertFalse(any(enemy.is_moving for enemy in enemies))
+        self.assertEqual([(enemy.coord.x, enemy.coord.y) for enemy in enemies], coords)
+
+    def test_failed_logic_orders_dropped(self):
+        scene, drones, _ = self.make_scene(BrokenLogicDrone)
+        coords = [(drone.coord.x, drone.coord.y) for drone in drones]
+        with mock.patch.object(scene, 'error') as error:
+            scene.advance(5)
+        # Приказ, отданный до исключения, не исполняется - логика упала целиком
+        self.assertFalse(any(drone.is_moving for drone in drones))
+        self.assertEqual([(drone.coord.x, drone.coord.y) for drone in drones], coords)
+        self.assertEqual(error.call_count, 5)
+        self.assertIn('logic failed: ValueError: oops', error.call_args[0][0])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from astrobox.tournament import MatchSpec, TournamentException, _parse_seeds, round_robin, run_match
+
+TEAMS = ['demo.game.WorkerDrone', 'demo.game.GreedyDrone', 'demo.game.HunterDrone', 'demo.game.DestroyerDrone']
+
+
+class TestTournament(TestCase):
+
+    def test_parse_seeds(self):
+        self.assertEqual(_parse_seeds('1,3-5'), [1, 3, 4, 5])
+        self.assertEqual(_parse_seeds('7'), [7])
+
+    def test_round_robin(self):
+        specs = round_robin(TEAMS, seeds=[1, 2], teams_per_match=2, drones_at_team=3)
+        # C(4, 2) пар на каждом из двух сидов
+        self.assertEqual(len(specs), 12)
+        self.assertEqual(len(set((tuple(spec.teams), spec.seed) for spec in specs)), 12)
+        self.assertTrue(all(spec.drones_at_team == 3 for spec in specs))
+        self.assertEqual(len(round_robin(TEAMS, seeds=[1])), 1)
+        with self.assertRaises(TournamentException):
+            round_robin(TEAMS[:2], seeds=[1], teams_per_match=3)
+
+    def test_unknown_team_class(self):
+        # Опечатка в пути класса - ошибка при составлении турнира, а не в рабочем процессе
+        with self.assertRaises(TournamentException):
+            round_robin(TEAMS[:1] + ['demo.game.Destroyer'], seeds=[1], teams_per_match=2)
+        with self.assertRaises(TournamentException):
+            MatchSpec(teams=['demo.game.WorkerDrone', 'demo.gaem.GreedyDrone'])
+
+    def test_run_match(self):
+        spec = MatchSpec(teams=TEAMS[:2], seed=7, drones_at_team=2, asteroids_count=5, field=(600, 400))
+        result = run_match(spec)
+        for key in ('uuid', 'seed', 'teams', 'collected'):
+            self.assertIn(key, result)
+        self.assertEqual(result['seed'], 7)
+        self.assertEqual(sorted(result['teams'].values()), sorted(TEAMS[:2]))
+        self.assertEqual(set(result['collected']), set(result['teams']))
+        # Игра с другой темой между ними не влияет на повтор: тема и команды сцены сбрасываются на каждую игру
+        run_match(MatchSpec(teams=TEAMS[:2], seed=8, drones_at_team=2, asteroids_count=5, field=(600, 400),
+                            theme_overrides=dict(DRONE_SPEED=5)))
+        again = run_match(spec)
+        self.assertNotEqual(again['uuid'], result['uuid'])
+        for key in ('game_steps', 'seed', 'teams', 'collected'):
+            self.assertEqual(again[key], result[key])
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest import TestCase, skipIf
+
+from astrobox import bulk
+from astrobox.core import Drone
+from astrobox.space_field import SpaceField
+from robogame_engine.geometry import Point
+
+
+class WatchDrone(Drone):
+    pass
+
+
+class TestProximityTriggers(TestCase):
+
+    def setUp(self):
+        self.scene = SpaceField(seed=3, field=(1000, 600), headless=True)
+        self.drone = WatchDrone()
+        self.scene.prepare(asteroids_count=1)
+        self.fired = []
+
+    def place(self, x, ticks=1):
+        self.drone.coord = Point(x, 300)
+        self.scene.advance(ticks)
+
+    def callback(self, trigger):
+        self.fired.append((self.scene._step, 'near' if trigger.near else 'far'))
+
+    def test_fires_only_on_flip(self):
+        target = Point(500, 300)
+        self.drone.when_near(target, 100, self.callback)
+        self.drone.when_far(target, 100, self.callback)
+        self.place(300, ticks=3)
+        # Проверка в конце тика 1, событие - на тике 2
+        self.assertEqual(self.fired, [(2, 'far')])
+        self.place(450, ticks=3)
+        self.place(350, ticks=3)
+        self.place(420, ticks=2)
+        self.assertEqual(self.fired, [(2, 'far'), (5, 'near'), (8, 'far'), (11, 'near')])
+
+    def test_once_key_and_cancel(self):
+        target = Point(500, 300)
+        first = self.drone.when_near(target, 100, self.callback, key='approach')
+        second = self.drone.when_near(target, 100, self.callback, once=True, key='approach')
+        self.assertTrue(first.cancelled)
+        self.assertEqual(self.scene.triggers, [second])
+        self.place(450, ticks=2)
+        self.assertEqual(self.fired, [(2, 'near')])
+        self.assertEqual(self.scene.triggers, [])
+        passive = self.drone.when_far(target, 100)
+        self.place(300, ticks=2)
+        self.assertTrue(passive.is_met)
+        passive.cancel()
+        self.assertEqual(self.scene.triggers, [])
+        self.assertEqual(len(self.fired), 1)
+
+    def test_dead_unit_triggers_dropped(self):
+        trigger = self.drone.when_near(Point(500, 300), 100, self.callback)
+        self.drone.damage_taken(self.scene.config.DRONE_MAX_SHIELD)
+        self.assertTrue(trigger.cancelled)
+        self.assertEqual(self.scene.triggers, [])
+
+    @skipIf(bulk.numpy is None, 'NumPy is not installed')
+    def test_numpy_pass_matches_loop(self):
+        rnd = random.Random(5)
+        triggers = []
+        for i in range(bulk.NUMPY_MIN_TRIGGERS + 10):
+            target = Point(rnd.uniform(0, 1000), rnd.uniform(0, 600))
+            # Часть целей ровно на границе условия
+            distance = self.drone.distance_to(target) if i % 4 == 0 else rnd.uniform(0, 500)
+            triggers.append(self.drone.when_near(target, distance) if i % 2 else self.drone.when_far(target, distance))
+        results = []
+        for use_numpy in (False, True):
+            for trigger in triggers:
+                trigger.is_met = None
+            fired = bulk.TriggerPass(self.scene, use_numpy=use_numpy).evaluate(triggers)
+            results.append((fired, [trigger.is_met for trigger in triggers]))
+        self.assertEqual(results[0], results[1])